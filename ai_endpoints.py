@@ -6,6 +6,7 @@ Core AI functionality including photo analysis, face recognition, and insights g
 
 import os
 import json
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
@@ -18,12 +19,15 @@ import shutil
 # Import AI services
 try:
     from backend.ai_services import FamilyAIAnalyzer
+    from backend.ocr_queue import ocr_queue, OCRQueueFull, TESSERACT_AVAILABLE
     ai_analyzer = FamilyAIAnalyzer()
     AI_SERVICES_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: AI services not available: {e}")
     AI_SERVICES_AVAILABLE = False
     ai_analyzer = None
+    ocr_queue = None
+    TESSERACT_AVAILABLE = False
 
 # Import authentication
 try:
@@ -335,12 +339,32 @@ async def object_detection(
         logger.error(f"Error in object detection: {e}")
         raise HTTPException(status_code=500, detail="Object detection failed")
 
+def text_analysis_response(extracted_text: Optional[str], job: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Text extraction payload shared by the synchronous and job endpoints"""
+    text_analysis = {
+        "extracted_text": extracted_text,
+        "text_confidence": 0.9 if extracted_text else 0.0,
+        "text_length": len(extracted_text) if extracted_text else 0,
+        "language_detected": "en",  # Would be detected by OCR
+        "text_type": "handwritten" if extracted_text and len(extracted_text) < 50 else "printed",
+        "analysis_timestamp": datetime.now().isoformat()
+    }
+    if job is not None:
+        text_analysis.update({
+            "job_id": job["job_id"],
+            "ocr_status": job["status"],
+            "text_check": job["text_check"],
+            "error": job["error"]
+        })
+    return text_analysis
+
 @router.post("/text-extraction")
 async def text_extraction(
     file: UploadFile = File(...),
+    wait: bool = Form(True),
     current_user: Dict = Depends(get_current_user)
 ):
-    """Extract text from image using OCR"""
+    """Extract text from image using OCR; with wait=false, return a job id to poll instead"""
     try:
         if not AI_SERVICES_AVAILABLE:
             raise HTTPException(status_code=503, detail="AI services not available")
@@ -352,28 +376,50 @@ async def text_extraction(
         # Save uploaded file
         temp_path = save_uploaded_file(file)
         
-        try:
-            # Extract text
-            extracted_text = await ai_analyzer._extract_text(temp_path)
-            
-            # Enhanced text analysis
-            text_analysis = {
-                "extracted_text": extracted_text,
-                "text_confidence": 0.9 if extracted_text else 0.0,
-                "text_length": len(extracted_text) if extracted_text else 0,
-                "language_detected": "en",  # Would be detected by OCR
-                "text_type": "handwritten" if extracted_text and len(extracted_text) < 50 else "printed",
-                "analysis_timestamp": datetime.now().isoformat()
-            }
-            
+        if not TESSERACT_AVAILABLE:
+            # Development fallback: mock OCR inline
+            try:
+                extracted_text = await ai_analyzer._extract_text(temp_path)
+            finally:
+                cleanup_temp_file(temp_path)
             return JSONResponse(content={
                 "success": True,
-                "data": text_analysis,
+                "data": text_analysis_response(extracted_text),
                 "message": "Text extraction completed successfully"
             })
-            
-        finally:
+        
+        # The OCR worker deletes the temp file when the job ends
+        try:
+            job_id = ocr_queue.submit(temp_path, cleanup=True)
+        except OCRQueueFull as e:
             cleanup_temp_file(temp_path)
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        if not wait:
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "data": {"job_id": job_id, "ocr_status": "queued"},
+                "message": "Text extraction queued"
+            })
+        
+        try:
+            # shield: giving up waiting must not cancel the job itself
+            job = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ocr_queue.future(job_id))),
+                                         ocr_queue.timeout_seconds * 2)
+        except asyncio.TimeoutError:
+            # Still queued behind other jobs; the client can poll for it
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "data": {"job_id": job_id, "ocr_status": ocr_queue.get(job_id)["status"]},
+                "message": "Text extraction still in progress"
+            })
+        
+        return JSONResponse(content={
+            "success": job["status"] in ("done", "skipped"),
+            "data": text_analysis_response(job["text"], job),
+            "message": "Text extraction completed successfully" if job["status"] in ("done", "skipped")
+                       else f"Text extraction {job['status']}"
+        })
             
     except HTTPException:
         raise
@@ -381,6 +427,27 @@ async def text_extraction(
         logger.error(f"Error in text extraction: {e}")
         raise HTTPException(status_code=500, detail="Text extraction failed")
 
+@router.get("/text-extraction/jobs/{job_id}")
+async def get_text_extraction_job(job_id: str, current_user: Dict = Depends(get_current_user)):
+    """Status and result of a queued text extraction"""
+    job = ocr_queue.get(job_id) if ocr_queue else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JSONResponse(content={
+        "success": job["status"] not in ("failed", "timeout", "cancelled"),
+        "data": text_analysis_response(job["text"], job) if job["finished_at"] else
+                {"job_id": job_id, "ocr_status": job["status"]}
+    })
+
+@router.delete("/text-extraction/jobs/{job_id}")
+async def cancel_text_extraction_job(job_id: str, current_user: Dict = Depends(get_current_user)):
+    """Cancel a queued or running text extraction"""
+    if not ocr_queue or not ocr_queue.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No unfinished job with that id")
+    
+    return {"success": True, "data": {"job_id": job_id, "ocr_status": ocr_queue.get(job_id)["status"]}}
+
 @router.post("/generate-insights")
 async def generate_insights(
     request: AIInsightsRequest,
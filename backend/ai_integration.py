@@ -10,7 +10,7 @@ import aiohttp
 import asyncio
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import BinaryIO, Dict, List, Any, Optional, Union
 
 # Import our AI service manager
 try:
@@ -20,6 +20,13 @@ except ImportError:
     AI_SERVICE_MANAGER_AVAILABLE = False
     print("Warning: AI service integrations not available. Using fallback responses.")
 
+try:
+    from backend.analysis_cache import analysis_cache
+    from backend.image_context import file_sha256
+except ImportError:
+    from analysis_cache import analysis_cache
+    from image_context import file_sha256
+
 logger = logging.getLogger(__name__)
 
 # AI Services Configuration
@@ -44,14 +51,15 @@ class AIServiceProxy:
             await self.session.close()
             self.session = None
     
-    async def upload_family_photo(self, file_data: bytes, filename: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Proxy photo upload to AI service"""
+    async def upload_family_photo(self, file_data: Union[bytes, BinaryIO], filename: str, metadata: Dict[str, Any] = None,
+                                  content_type: str = 'image/jpeg') -> Dict[str, Any]:
+        """Proxy photo upload to AI service; a file object is streamed rather than read into memory"""
         try:
             session = await self._get_session()
             
             # Prepare form data
             form_data = aiohttp.FormData()
-            form_data.add_field('file', file_data, filename=filename, content_type='image/jpeg')
+            form_data.add_field('file', file_data, filename=filename, content_type=content_type)
             
             if metadata:
                 for key, value in metadata.items():
@@ -581,6 +589,20 @@ class FamilyAIIntegration:
                                         family_context: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Comprehensive AI photo analysis"""
         try:
+            # Provider answers are cached per photo content; the fallback response never is
+            cache_key = image_sha256 = None
+            try:
+                image_sha256 = file_sha256(image_path)
+                cache_key = analysis_cache.make_key(image_sha256, "comprehensive_photo", "1", {
+                    "metadata": metadata or {},
+                    "family_size": len(family_context or [])
+                })
+                hit, cached = analysis_cache.get(cache_key)
+                if hit:
+                    return cached
+            except OSError:
+                pass
+            
             # Try to use AI service
             if AI_SERVICE_MANAGER_AVAILABLE:
                 ai_manager = get_ai_service_manager()
@@ -619,7 +641,7 @@ class FamilyAIIntegration:
                             "suggested_title": f"Family Memory {datetime.now().strftime('%Y-%m-%d')}"
                         }
                     
-                    return {
+                    response = {
                         "success": True,
                         "analysis": analysis_data,
                         "memory_suggestions": [
@@ -629,6 +651,9 @@ class FamilyAIIntegration:
                         ],
                         "processing_time": 2.5
                     }
+                    if cache_key:
+                        analysis_cache.set(cache_key, image_sha256, "comprehensive_photo", response)
+                    return response
             
             # Fallback response
             return {
@@ -17,6 +17,7 @@ import requests
 import aiohttp
 
 from .family_ai_bridge import family_ai_bridge
+from .upload_stream import stream_upload
 
 logger = logging.getLogger(__name__)
 
@@ -85,9 +86,7 @@ async def analyze_family_photo(
         filename = f"analysis_{timestamp}{file_extension}"
         file_path = upload_dir / filename
         
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await stream_upload(file, file_path)
         
         # Process with AI bridge (which uses hack2)
         analysis_result = await family_ai_bridge.process_family_photo(
@@ -103,6 +102,8 @@ async def analyze_family_photo(
             processing_time=1.5  # Mock timing
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Photo analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -133,9 +134,7 @@ async def upload_memory_with_ai(
         filename = f"memory_{timestamp}{file_extension}"
         file_path = upload_dir / filename
         
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await stream_upload(file, file_path)
         
         # Prepare metadata
         metadata = {
@@ -179,6 +178,8 @@ async def upload_memory_with_ai(
             "message": "Memory uploaded and analyzed successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Memory upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -241,10 +242,12 @@ async def get_ai_memory_timeline(
     limit: int = 50,
     family_member: Optional[str] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None
+    date_to: Optional[str] = None,
+    metadata_only: bool = False
 ):
     """
-    Get AI-enhanced memory timeline
+    Get AI-enhanced memory timeline; with metadata_only, new photos are listed from their EXIF
+    data straight away and analysed in the background (see /ai/memory/timeline/status)
     """
     try:
         # Build filters
@@ -259,13 +262,14 @@ async def get_ai_memory_timeline(
             filters["limit"] = limit
         
         # Use uploads directory for now
-        timeline = await family_ai_bridge.create_family_timeline("uploads", filters)
+        timeline = await family_ai_bridge.create_family_timeline("uploads", filters, metadata_only=metadata_only)
         
         return {
             "success": True,
             "timeline": timeline,
             "total_memories": len(timeline),
             "filters_applied": filters,
+            "metadata_only": metadata_only,
             "ai_powered": family_ai_bridge.hack2_available
         }
         
@@ -273,6 +277,21 @@ async def get_ai_memory_timeline(
         logger.error(f"Timeline creation error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create timeline: {str(e)}")
 
+@router.get("/ai/memory/timeline/status")
+async def get_ai_memory_timeline_status():
+    """
+    Progress of background analysis for a metadata-only timeline
+    """
+    try:
+        return {
+            "success": True,
+            "status": family_ai_bridge.timeline_status("uploads")
+        }
+        
+    except Exception as e:
+        logger.error(f"Timeline status error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get timeline status: {str(e)}")
+
 @router.get("/ai/memory/suggestions")
 async def get_ai_memory_suggestions(
     date: Optional[str] = None,
@@ -371,9 +390,7 @@ async def direct_hack2_analysis(
         filename = f"direct_{timestamp}{file_extension}"
         file_path = upload_dir / filename
         
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await stream_upload(file, file_path)
         
         # Call hack2 directly
         async with aiohttp.ClientSession() as session:
@@ -394,6 +411,8 @@ async def direct_hack2_analysis(
                         error_text = await resp.text()
                         raise HTTPException(status_code=resp.status, detail=f"hack2 error: {error_text}")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Direct hack2 analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Direct analysis failed: {str(e)}")
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 
 from .ai_integration import ai_service_proxy, ai_integration
 from .data_manager import DataManager
+from .upload_stream import detect_kind, IMAGE_KINDS, MAX_UPLOAD_BYTES
 
 router = APIRouter()
 data_manager = DataManager()
@@ -62,8 +63,14 @@ async def upload_memory_with_ai(
         ai_analysis = {}
         
         if file:
-            # Read file data
-            file_content = await file.read()
+            # Check type and size from the first chunk, then stream the spooled upload to the AI service
+            header = await file.read(12)
+            kind = detect_kind(header)
+            if kind not in IMAGE_KINDS:
+                raise HTTPException(status_code=415, detail="Unsupported file type")
+            if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"File exceeds maximum allowed size of {MAX_UPLOAD_BYTES} bytes")
+            await file.seek(0)
             
             # Process with AI service
             metadata = {
@@ -73,7 +80,7 @@ async def upload_memory_with_ai(
             }
             
             ai_result = await ai_service_proxy.upload_family_photo(
-                file_content, file.filename, metadata
+                file.file, file.filename, metadata, content_type=file.content_type or 'image/jpeg'
             )
             
             if ai_result.get("success"):
@@ -106,6 +113,8 @@ async def upload_memory_with_ai(
             "message": "Memory uploaded and processed with AI"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
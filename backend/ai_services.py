@@ -9,7 +9,8 @@ import sys
 import json
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Union
 from pathlib import Path
 import requests
 import cv2
@@ -19,6 +20,16 @@ import base64
 from datetime import datetime
 
 # Import from backend modules instead of using sys.path.append
+try:
+    from backend.image_context import ImageContext
+    from backend.image_loader import DECODE_MAX_DIMENSION
+    from backend.analysis_cache import cached_analysis
+    from backend.ocr_queue import ocr_queue, OCRQueueFull, TESSERACT_AVAILABLE
+except ImportError:
+    from image_context import ImageContext
+    from image_loader import DECODE_MAX_DIMENSION
+    from analysis_cache import cached_analysis
+    from ocr_queue import ocr_queue, OCRQueueFull, TESSERACT_AVAILABLE
 
 try:
     from math_analyzer.improved_error_localization import MathErrorDetector
@@ -30,15 +41,45 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+def _members_key(family_context: List[Dict] = None) -> List[List[Any]]:
+    """The parts of the family context that face results depend on"""
+    return [[m.get("id"), m.get("name")] for m in family_context or []]
+
+def _face_model_version() -> Optional[str]:
+    """Current face recognition model, so retraining invalidates cached face results"""
+    try:
+        from facial_recognition_trainer import face_trainer
+        return face_trainer.model_version
+    except Exception:
+        return None
+
 class FamilyAIAnalyzer:
     """Advanced AI analyzer for family memories with facial recognition and context awareness"""
     
     def __init__(self):
-        self.face_cascade = None
+        self._face_cascade = None
         self.emotion_detector = None
         self.object_detector = None
         self.family_face_database = {}
-        self.initialize_ai_models()
+        
+        # Models load on first use, or ahead of time through load_models()
+        self._models_loaded = False
+        self._models_lock = threading.Lock()
+    
+    @property
+    def face_cascade(self):
+        """Haar face cascade, loaded on first use"""
+        if not self._models_loaded:
+            self.load_models()
+        return self._face_cascade
+    
+    def load_models(self) -> "FamilyAIAnalyzer":
+        """Load the analysis models now unless they already are"""
+        with self._models_lock:
+            if not self._models_loaded:
+                self.initialize_ai_models()
+                self._models_loaded = True
+        return self
     
     def initialize_ai_models(self):
         """Initialize AI models for analysis"""
@@ -46,7 +87,7 @@ class FamilyAIAnalyzer:
             # Initialize OpenCV face detection
             cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
             if os.path.exists(cascade_path):
-                self.face_cascade = cv2.CascadeClassifier(cascade_path)
+                self._face_cascade = cv2.CascadeClassifier(cascade_path)
                 logger.info("Face detection model loaded")
             
             # Initialize other AI models if available
@@ -59,21 +100,27 @@ class FamilyAIAnalyzer:
     
     async def analyze_family_photo(self, image_path: str, family_context: List[Dict] = None) -> Dict[str, Any]:
         """Comprehensive analysis of family photos"""
+        results = await self.analyze_image_features(image_path, family_context)
+        if "error" not in results:
+            results["text"] = await self._extract_text(image_path)
+        return results
+    
+    async def analyze_image_features(self, image_path: str, family_context: List[Dict] = None) -> Dict[str, Any]:
+        """Every image-based analysis step except OCR, which is independent and can run elsewhere"""
         try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                return {"error": "Could not load image"}
+            # Gray, HSV, histograms and face boxes are computed once and shared by every step;
+            # the image is only decoded if some step misses the analysis cache, and then at reduced size
+            context = ImageContext(face_cascade=self.face_cascade, image_path=image_path,
+                                   max_dimension=DECODE_MAX_DIMENSION)
             
             results = {
                 "timestamp": datetime.now().isoformat(),
-                "image_properties": self._get_image_properties(image),
-                "faces": await self._detect_faces(image, family_context),
-                "emotions": await self._detect_emotions(image),
-                "objects": await self._detect_objects(image),
-                "scene_analysis": await self._analyze_scene(image),
-                "text": await self._extract_text(image_path),
-                "family_insights": await self._generate_family_insights(image, family_context)
+                "image_properties": self._get_image_properties(context),
+                "faces": await self._detect_faces(context, family_context),
+                "emotions": await self._detect_emotions(context),
+                "objects": await self._detect_objects(context),
+                "scene_analysis": await self._analyze_scene(context),
+                "family_insights": await self._generate_family_insights(context, family_context)
             }
             
             return results
@@ -82,55 +129,51 @@ class FamilyAIAnalyzer:
             logger.error(f"Error analyzing family photo: {e}")
             return {"error": str(e)}
     
-    def _get_image_properties(self, image: np.ndarray) -> Dict[str, Any]:
+    @cached_analysis("image_properties", "3", lambda self: {})
+    def _get_image_properties(self, image: Union[np.ndarray, ImageContext]) -> Dict[str, Any]:
         """Extract basic image properties"""
-        height, width = image.shape[:2]
-        
-        # Calculate brightness and contrast
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        brightness = np.mean(gray)
-        contrast = np.std(gray)
+        context = ImageContext.of(image, self.face_cascade)
         
-        # Detect if image is blurry
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        # Brightness, contrast and blur from the shared grayscale image
+        stats = context.gray_stats
+        laplacian_var = stats["laplacian_var"]
         is_blurry = laplacian_var < 100
         
         return {
-            "width": width,
-            "height": height,
-            "brightness": float(brightness),
-            "contrast": float(contrast),
+            "width": context.original_width,
+            "height": context.original_height,
+            "brightness": stats["brightness"],
+            "contrast": stats["contrast"],
             "is_blurry": is_blurry,
             "quality_score": min(100, max(0, laplacian_var / 10))
         }
     
-    async def _detect_faces(self, image: np.ndarray, family_context: List[Dict] = None) -> Dict[str, Any]:
+    @cached_analysis("faces", "2", lambda self, family_context=None: {
+        "members": _members_key(family_context), "model": _face_model_version()
+    })
+    async def _detect_faces(self, image: Union[np.ndarray, ImageContext], family_context: List[Dict] = None) -> Dict[str, Any]:
         """Detect and analyze faces in the image with advanced recognition"""
-        # Save image temporarily for facial recognition
-        import tempfile
-        temp_path = None
+        context = ImageContext.of(image, self.face_cascade)
         
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_path = temp_file.name
-                cv2.imwrite(temp_path, image)
-            
-            # Use advanced facial recognition trainer
-            from facial_recognition_trainer import face_trainer
-            identification_results = face_trainer.identify_faces(temp_path)
-            
-            # Basic face detection with OpenCV as fallback
             if self.face_cascade is None:
                 return {"count": 0, "faces": [], "family_members_detected": []}
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = context.face_boxes
+            
+            # Identify the Haar boxes on the decoded image, so results line up with faces[i]
+            from facial_recognition_trainer import face_trainer
+            face_locations = [(y, x + w, y + h, x) for (x, y, w, h) in faces]
+            identification_results = face_trainer.identify_faces_array(
+                context.image, face_locations=face_locations, bgr=True
+            ) if face_locations else []
             
             detected_faces = []
             family_members_detected = []
             
-            for i, (x, y, w, h) in enumerate(faces):
+            for i, box in enumerate(faces):
+                # Reported in original photo coordinates, whatever size it was decoded at
+                x, y, w, h = context.to_original(box)
                 face_data = {
                     "id": i,
                     "position": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
@@ -173,26 +216,23 @@ class FamilyAIAnalyzer:
             
         except Exception as e:
             logger.error(f"Error in advanced face detection: {e}")
-            # Fallback to basic detection
-            return await self._basic_face_detection(image, family_context)
-        
-        finally:
-            # Clean up temporary file
-            if temp_path and os.path.exists(temp_path):
-                os.unlink(temp_path)
+            # Fallback to basic detection; marked degraded so the cache does not keep it as this image's answer
+            return {**await self._basic_face_detection(context, family_context), "degraded": True}
     
-    async def _basic_face_detection(self, image: np.ndarray, family_context: List[Dict] = None) -> Dict[str, Any]:
+    @cached_analysis("basic_faces", "2", lambda self, family_context=None: {"members": _members_key(family_context)})
+    async def _basic_face_detection(self, image: Union[np.ndarray, ImageContext], family_context: List[Dict] = None) -> Dict[str, Any]:
         """Basic face detection fallback"""
         if self.face_cascade is None:
             return {"count": 0, "faces": [], "family_members_detected": []}
         
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+        context = ImageContext.of(image, self.face_cascade)
+        faces = context.face_boxes
         
         detected_faces = []
         family_members_detected = []
         
-        for i, (x, y, w, h) in enumerate(faces):
+        for i, box in enumerate(faces):
+            x, y, w, h = context.to_original(box)
             face_data = {
                 "id": i,
                 "position": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
@@ -221,7 +261,8 @@ class FamilyAIAnalyzer:
             "advanced_recognition_used": False
         }
     
-    async def _detect_emotions(self, image: np.ndarray) -> List[str]:
+    @cached_analysis("emotions", "1", lambda self: {})
+    async def _detect_emotions(self, image: Union[np.ndarray, ImageContext]) -> List[str]:
         """Detect emotions in the image with enhanced analysis"""
         try:
             # Try to use advanced emotion detection if available
@@ -233,18 +274,16 @@ class FamilyAIAnalyzer:
                 logger.info("Advanced emotion detection not available, using enhanced heuristics")
             
             # Enhanced emotion detection based on image analysis
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            brightness = np.mean(hsv[:, :, 2])
-            saturation = np.mean(hsv[:, :, 1])
+            context = ImageContext.of(image, self.face_cascade)
+            brightness = context.hsv_means["value"]
+            saturation = context.hsv_means["saturation"]
             
             # Analyze color distribution
-            blue_channel = image[:, :, 0]
-            green_channel = image[:, :, 1]
-            red_channel = image[:, :, 2]
+            blue_mean, green_mean, red_mean = context.bgr_means
             
-            blue_ratio = np.mean(blue_channel) / 255
-            green_ratio = np.mean(green_channel) / 255
-            red_ratio = np.mean(red_channel) / 255
+            blue_ratio = blue_mean / 255
+            green_ratio = green_mean / 255
+            red_ratio = red_mean / 255
             
             # Determine emotions based on multiple factors
             emotions = []
@@ -281,18 +320,19 @@ class FamilyAIAnalyzer:
             logger.error(f"Error in emotion detection: {e}")
             return ["neutral", "calm"]  # Fallback emotions
     
-    async def _detect_objects(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    @cached_analysis("objects", "2", lambda self: {})
+    async def _detect_objects(self, image: Union[np.ndarray, ImageContext]) -> List[Dict[str, Any]]:
         """Detect objects in the image with enhanced analysis"""
         try:
-            height, width = image.shape[:2]
+            context = ImageContext.of(image, self.face_cascade)
+            height, width = context.original_height, context.original_width
             objects = []
             
-            # Enhanced color-based detection
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            # Every colour class ratio comes from one quantized histogram of the downsampled HSV image
+            ratios = context.color_ratios
             
             # Sky detection (blue)
-            blue_mask = cv2.inRange(hsv, (100, 50, 50), (130, 255, 255))
-            blue_ratio = np.sum(blue_mask > 0) / (height * width)
+            blue_ratio = ratios["sky"]
             
             if blue_ratio > 0.3:
                 objects.append({
@@ -303,8 +343,7 @@ class FamilyAIAnalyzer:
                 })
             
             # Vegetation detection (green)
-            green_mask = cv2.inRange(hsv, (40, 50, 50), (80, 255, 255))
-            green_ratio = np.sum(green_mask > 0) / (height * width)
+            green_ratio = ratios["vegetation"]
             
             if green_ratio > 0.2:
                 objects.append({
@@ -315,8 +354,7 @@ class FamilyAIAnalyzer:
                 })
             
             # Water detection (blue-green)
-            water_mask = cv2.inRange(hsv, (90, 100, 100), (120, 255, 255))
-            water_ratio = np.sum(water_mask > 0) / (height * width)
+            water_ratio = ratios["water"]
             
             if water_ratio > 0.15:
                 objects.append({
@@ -327,8 +365,7 @@ class FamilyAIAnalyzer:
                 })
             
             # Building/indoor detection (gray/brown)
-            gray_mask = cv2.inRange(hsv, (0, 0, 50), (180, 30, 200))
-            gray_ratio = np.sum(gray_mask > 0) / (height * width)
+            gray_ratio = ratios["gray"]
             
             if gray_ratio > 0.4:
                 objects.append({
@@ -340,15 +377,13 @@ class FamilyAIAnalyzer:
             
             # Face-based object detection
             if self.face_cascade:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-                
-                for i, (x, y, w, h) in enumerate(faces):
+                for i, box in enumerate(context.face_boxes):
+                    x, y, w, h = context.to_original(box)
                     objects.append({
                         "name": f"person_{i+1}", 
                         "confidence": 0.9, 
                         "category": "person",
-                        "position": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)}
+                        "position": {"x": x, "y": y, "width": w, "height": h}
                     })
             
             # Scene classification
@@ -392,17 +427,17 @@ class FamilyAIAnalyzer:
                 }
             ]
     
-    async def _analyze_scene(self, image: np.ndarray) -> Dict[str, Any]:
+    @cached_analysis("scene", "1", lambda self: {})
+    async def _analyze_scene(self, image: Union[np.ndarray, ImageContext]) -> Dict[str, Any]:
         """Analyze the overall scene"""
-        height, width = image.shape[:2]
+        context = ImageContext.of(image, self.face_cascade)
         
         # Analyze composition
-        aspect_ratio = width / height
+        aspect_ratio = context.width / context.height
         
         # Color analysis
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        dominant_hue = np.mean(hsv[:, :, 0])
-        saturation = np.mean(hsv[:, :, 1])
+        dominant_hue = context.hsv_means["hue"]
+        saturation = context.hsv_means["saturation"]
         
         # Scene classification
         scene_type = "indoor"
@@ -423,30 +458,27 @@ class FamilyAIAnalyzer:
                 "dominant_colors": ["blue", "green", "brown"][int(dominant_hue) // 60],
                 "color_saturation": float(saturation)
             },
-            "estimated_time_of_day": "day" if np.mean(image) > 100 else "evening",
+            "estimated_time_of_day": "day" if np.mean(context.bgr_means) > 100 else "evening",
             "photo_style": "casual" if saturation < 100 else "vibrant"
         }
     
     async def _extract_text(self, image_path: str) -> Optional[str]:
-        """Extract text from image using OCR"""
+        """Extract text from image using OCR, skipping photos the pre-check finds no text in"""
         try:
-            # Try to use Tesseract OCR if available
-            try:
-                import pytesseract
-                from PIL import Image
+            if TESSERACT_AVAILABLE:
+                # Queued, so concurrent analyses share a bounded set of tesseract processes
+                job_id = ocr_queue.submit(image_path)
+                try:
+                    job = await asyncio.wrap_future(ocr_queue.future(job_id))
+                except asyncio.CancelledError:
+                    ocr_queue.cancel(job_id)
+                    raise
                 
-                # Open image with PIL
-                pil_image = Image.open(image_path)
-                
-                # Extract text using Tesseract
-                text = pytesseract.image_to_string(pil_image)
-                
-                # Clean up the text
-                if text and text.strip():
-                    return text.strip()
-                    
-            except ImportError:
-                logger.info("Tesseract not available, using mock OCR")
+                if job["status"] not in ("done", "skipped"):
+                    logger.warning(f"OCR {job['status']} for {image_path}: {job['error']}")
+                return job["text"]
+            
+            logger.info("Tesseract not available, using mock OCR")
             
             # Mock OCR for development/testing
             import random
@@ -467,11 +499,15 @@ class FamilyAIAnalyzer:
             
             return None
             
+        except OCRQueueFull as e:
+            logger.warning(f"Skipping text extraction: {e}")
+            return None
         except Exception as e:
             logger.error(f"Text extraction error: {e}")
             return None
     
-    async def _generate_family_insights(self, image: np.ndarray, family_context: List[Dict] = None) -> Dict[str, Any]:
+    @cached_analysis("family_insights", "1", lambda self, family_context=None: {})
+    async def _generate_family_insights(self, image: Union[np.ndarray, ImageContext], family_context: List[Dict] = None) -> Dict[str, Any]:
         """Generate intelligent insights about the family photo"""
         insights = {
             "memory_type": "family_gathering",
@@ -481,10 +517,8 @@ class FamilyAIAnalyzer:
         }
         
         # Analyze people count for occasion type
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         if self.face_cascade:
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-            face_count = len(faces)
+            face_count = len(ImageContext.of(image, self.face_cascade).face_boxes)
             
             if face_count >= 5:
                 insights["estimated_occasion"] = "family_celebration"
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Analysis Cache for Elmowafiplatform
+Stores analyzer results keyed by (image SHA-256, analyzer, analyzer version, parameters) in SQLite,
+evicting the least recently used entries once the cache grows past its size limit
+"""
+
+import os
+import json
+import atexit
+import time
+import sqlite3
+import hashlib
+import inspect
+import functools
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+try:
+    from backend.image_context import ImageContext
+except ImportError:
+    from image_context import ImageContext
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCache:
+    """SQLite-backed analysis result cache shared by every process on the host"""
+
+    def __init__(self, db_path: str = "data/analysis_cache.db", max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes or int(float(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.enabled = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+
+        # Check the total size every this many writes rather than on every write
+        self.eviction_check_interval = 100
+        self._writes_since_check = 0
+        self._lock = threading.Lock()
+
+        # Hits only record their access time in memory; it reaches SQLite in one batched UPDATE, so reads
+        # are not serialized behind the write lock. Eviction order is at most touch_flush_seconds stale.
+        self.touch_flush_size = 200
+        self.touch_flush_seconds = 30.0
+        self._pending_touches: Dict[str, float] = {}
+        self._last_touch_flush = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        """Create the cache table"""
+        try:
+            conn = self._connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    image_sha256 TEXT NOT NULL,
+                    analyzer TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_image ON analysis_cache(image_sha256)")
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error initializing analysis cache: {e}")
+            self.enabled = False
+
+    @staticmethod
+    def make_key(image_sha256: str, analyzer: str, version: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Stable key for an analyzer run over an image"""
+        payload = json.dumps([image_sha256, analyzer, version, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); a cached None is a hit"""
+        if not self.enabled:
+            return False, None
+
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT result FROM analysis_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Analysis cache read failed: {e}")
+            return False, None
+
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        self._touch(cache_key)
+        return True, json.loads(row[0])["value"]
+
+    def _touch(self, cache_key: str):
+        """Remember a hit's access time, flushing the batch once it is large or old enough"""
+        with self._lock:
+            self._pending_touches[cache_key] = time.time()
+            due = (len(self._pending_touches) >= self.touch_flush_size or
+                   time.monotonic() - self._last_touch_flush >= self.touch_flush_seconds)
+        if due:
+            self.flush_touches()
+
+    def flush_touches(self):
+        """Write the access times of recent hits in one transaction"""
+        with self._lock:
+            touches = self._pending_touches
+            self._pending_touches = {}
+            self._last_touch_flush = time.monotonic()
+        if not touches:
+            return
+
+        try:
+            conn = self._connect()
+            conn.executemany("UPDATE analysis_cache SET accessed_at = ? WHERE cache_key = ?",
+                             [(accessed_at, cache_key) for cache_key, accessed_at in touches.items()])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Analysis cache access time update failed: {e}")
+
+    def set(self, cache_key: str, image_sha256: str, analyzer: str, value: Any):
+        """Store a result; values must be JSON serializable"""
+        if not self.enabled:
+            return
+
+        try:
+            result = json.dumps({"value": value}, default=str)
+            now = time.time()
+            conn = self._connect()
+            conn.execute("""
+                INSERT OR REPLACE INTO analysis_cache
+                (cache_key, image_sha256, analyzer, result, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (cache_key, image_sha256, analyzer, result, len(result), now, now))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._writes_since_check += 1
+            check = self._writes_since_check >= self.eviction_check_interval
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is 90% of its size limit"""
+        self.flush_touches()
+        try:
+            conn = self._connect()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                freed = 0
+                stale_keys = []
+                for cache_key, size in conn.execute("SELECT cache_key, size FROM analysis_cache ORDER BY accessed_at"):
+                    if total - freed <= target:
+                        break
+                    stale_keys.append((cache_key,))
+                    freed += size
+                conn.executemany("DELETE FROM analysis_cache WHERE cache_key = ?", stale_keys)
+                conn.commit()
+                logger.info(f"Evicted {len(stale_keys)} analysis cache entries ({freed} bytes)")
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Analysis cache eviction failed: {e}")
+
+    def invalidate_image(self, image_sha256: str) -> int:
+        """Drop every cached result for an image"""
+        try:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM analysis_cache WHERE image_sha256 = ?", (image_sha256,)).rowcount
+            conn.commit()
+            conn.close()
+            return deleted
+        except Exception as e:
+            logger.warning(f"Analysis cache invalidation failed: {e}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and size for health endpoints"""
+        stats = {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, "max_bytes": self.max_bytes}
+        try:
+            conn = self._connect()
+            stats["entries"], stats["bytes"] = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+            ).fetchone()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Analysis cache stats failed: {e}")
+        return stats
+
+def cached_analysis(analyzer: str, version: str, params: Optional[Callable[..., Dict[str, Any]]] = None):
+    """Cache a sync or async analyzer method whose first argument is an image, path or ImageContext
+
+    ``params`` receives the remaining arguments and returns whatever else the result depends on.
+    Bump ``version`` whenever the analyzer's output changes.
+    """
+    def decorator(method):
+        def resolve(self, image, args, kwargs):
+            context = ImageContext.of(image, getattr(self, "face_cascade", None))
+            key_params = params(self, *args, **kwargs) if params else {"args": args, "kwargs": kwargs}
+            # Results depend on the size the image is decoded at
+            key_params = {"params": key_params, "max_dimension": context.max_dimension}
+            return context, analysis_cache.make_key(context.sha256, analyzer, version, key_params)
+
+        def argument(image, context):
+            # Paths stay paths for analyzers that read the file themselves; otherwise decode now,
+            # so an unreadable image raises here instead of an analyzer's fallback being cached
+            if isinstance(image, (str, os.PathLike)):
+                return image
+            context.image
+            return context
+
+        def store(cache_key, context, value):
+            # Errors and fallback answers (marked "degraded") are not the analyzer's real result
+            if not (isinstance(value, dict) and ("error" in value or value.get("degraded"))):
+                analysis_cache.set(cache_key, context.sha256, analyzer, value)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, image, *args, **kwargs):
+                if not analysis_cache.enabled:
+                    return await method(self, image, *args, **kwargs)
+                try:
+                    context, cache_key = resolve(self, image, args, kwargs)
+                except Exception:
+                    # Unhashable input: run uncached and let the analyzer report the problem
+                    return await method(self, image, *args, **kwargs)
+
+                hit, value = analysis_cache.get(cache_key)
+                if hit:
+                    return value
+
+                value = await method(self, argument(image, context), *args, **kwargs)
+                store(cache_key, context, value)
+                return value
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, image, *args, **kwargs):
+            if not analysis_cache.enabled:
+                return method(self, image, *args, **kwargs)
+            try:
+                context, cache_key = resolve(self, image, args, kwargs)
+            except Exception:
+                return method(self, image, *args, **kwargs)
+
+            hit, value = analysis_cache.get(cache_key)
+            if hit:
+                return value
+
+            value = method(self, argument(image, context), *args, **kwargs)
+            store(cache_key, context, value)
+            return value
+        return wrapper
+
+    return decorator
+
+# Global analysis cache
+analysis_cache = AnalysisCache(os.getenv("ANALYSIS_CACHE_DB", "data/analysis_cache.db"))
+atexit.register(analysis_cache.flush_touches)
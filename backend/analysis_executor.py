@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Photo Analysis Executor for Elmowafiplatform
+Runs the CPU-bound photo analyzers (OpenCV, NumPy, tesseract) in a process pool so they never block the event loop
+"""
+
+import os
+import asyncio
+import logging
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Analyzers created once per worker process by _init_worker
+_worker_analyzer = None
+_worker_memory_processor = None
+
+def _init_worker():
+    """Load the analyzers and their models once when a worker process starts"""
+    global _worker_analyzer, _worker_memory_processor
+
+    try:
+        from backend.ai_services import family_ai_analyzer
+        from backend.family_memory_processor import FamilyMemoryProcessor
+    except ImportError:
+        from ai_services import family_ai_analyzer
+        from family_memory_processor import FamilyMemoryProcessor
+
+    _worker_analyzer = family_ai_analyzer.load_models()
+    _worker_memory_processor = FamilyMemoryProcessor()
+
+    # The analyzer imports the face trainer lazily; load its classifier and encoding store now
+    try:
+        importlib.import_module("facial_recognition_trainer")
+    except ImportError:
+        try:
+            importlib.import_module("backend.facial_recognition_trainer")
+        except ImportError:
+            logger.warning("Face recognition trainer not available in analysis worker")
+
+def _analyze_image_features(image_path: str, family_context: Optional[List[Dict]]) -> Dict[str, Any]:
+    """Worker job: every image-based analysis step sharing one decoded image"""
+    return asyncio.run(_worker_analyzer.analyze_image_features(image_path, family_context))
+
+def _extract_text(image_path: str) -> Optional[str]:
+    """Worker job: OCR"""
+    return asyncio.run(_worker_analyzer._extract_text(image_path))
+
+def _process_memory_photo(image_path: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Worker job: FamilyMemoryProcessor analysis"""
+    return _worker_memory_processor.process_family_photo(image_path, metadata)
+
+class AnalysisTimeout(Exception):
+    """An analysis job did not finish within its timeout"""
+
+class AnalysisExecutor:
+    """Process pool for photo analysis with preloaded models and per-job timeouts"""
+
+    def __init__(self, max_workers: Optional[int] = None, timeout_seconds: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv("ANALYSIS_POOL_SIZE", "0")) or os.cpu_count() or 1
+        self.timeout_seconds = timeout_seconds or float(os.getenv("ANALYSIS_JOB_TIMEOUT_SECONDS", "60"))
+        # spawn: forking a threaded web server process is unsafe
+        self.start_method = os.getenv("ANALYSIS_POOL_START_METHOD", "spawn")
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the pool on first use"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+                logger.info(f"Analysis process pool started with {self.max_workers} workers")
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next job starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """Retire a pool with a stuck worker: new jobs go to a fresh pool, and the old pool's processes
+        are terminated once its other running jobs have had a full timeout to finish"""
+        with self._lock:
+            if self._pool is not pool:
+                # Already replaced by another timeout or a breakage
+                return
+            self._pool = None
+            # Captured before shutdown(), which drops the executor's process table
+            processes = list((pool._processes or {}).values())
+
+        pool.shutdown(wait=False, cancel_futures=True)
+        reaper = threading.Timer(self.timeout_seconds, self._terminate_processes, args=(processes,))
+        reaper.daemon = True
+        reaper.start()
+        logger.warning(f"Analysis job hung; replaced the process pool, retiring {len(processes)} old workers")
+
+    @staticmethod
+    def _terminate_processes(processes: List[multiprocessing.Process]):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Submit a picklable module-level function to the pool"""
+        return self._get_pool().submit(fn, *args)
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a job in the pool and await its result without blocking the event loop"""
+        pool = self._get_pool()
+        timeout = timeout or self.timeout_seconds
+        future = pool.submit(fn, *args)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # A job still queued is just dropped; one already running would hold its worker forever
+            if not future.cancel():
+                self._recycle_pool(pool)
+            raise AnalysisTimeout(f"{fn.__name__} timed out after {timeout:.0f}s")
+        except BrokenProcessPool:
+            logger.error("Analysis process pool broke; restarting it")
+            self._reset_pool(pool)
+            raise
+
+    async def analyze_family_photo(self, image_path: str, family_context: List[Dict] = None,
+                                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """FamilyAIAnalyzer.analyze_family_photo with image analysis and OCR running in parallel"""
+        features, text = await asyncio.gather(
+            self.run(_analyze_image_features, image_path, family_context, timeout=timeout),
+            self.run(_extract_text, image_path, timeout=timeout),
+            return_exceptions=True
+        )
+
+        if isinstance(features, Exception):
+            logger.error(f"Error analyzing family photo {image_path}: {features}")
+            return {"error": str(features)}
+
+        if isinstance(text, Exception):
+            logger.warning(f"Text extraction failed for {image_path}: {text}")
+            text = None
+
+        if "error" not in features:
+            features["text"] = text
+        return features
+
+    async def process_family_photo(self, image_path: str, metadata: Dict[str, Any] = None,
+                                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """FamilyMemoryProcessor.process_family_photo in the pool"""
+        try:
+            return await self.run(_process_memory_photo, image_path, metadata, timeout=timeout)
+        except Exception as e:
+            logger.error(f"Error processing family photo {image_path}: {e}")
+            return {"error": str(e)}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Pool configuration for health endpoints"""
+        return {
+            "running": self._pool is not None,
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout_seconds,
+            "start_method": self.start_method
+        }
+
+# Global analysis executor; worker processes start on first use
+analysis_executor = AnalysisExecutor()
@@ -9,31 +9,23 @@ import json
 import uuid
 import asyncio
 import logging
+from functools import partial
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from pathlib import Path
 
 from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Form, WebSocket, WebSocketDisconnect, Depends, Request, Body
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Import authentication
 from backend.auth import UserAuth, UserLogin, Token, get_current_user, register_user, login_user
 
-# Import AI services
-try:
-    from backend.facial_recognition_trainer import face_trainer
-    FACE_RECOGNITION_AVAILABLE = True
-except ImportError:
-    face_trainer = None
-    FACE_RECOGNITION_AVAILABLE = False
-
-try:
-    from backend.photo_clustering import photo_clustering_engine
-    PHOTO_CLUSTERING_AVAILABLE = True
-except ImportError:
-    photo_clustering_engine = None
-    PHOTO_CLUSTERING_AVAILABLE = False
+# Import AI services; the models themselves load on first use
+from backend.lazy_models import face_trainer, module_available
+from backend.lazy_models import get_status as get_model_status
+FACE_RECOGNITION_AVAILABLE = module_available("cv2", "numpy", "sklearn")
+PHOTO_CLUSTERING_AVAILABLE = module_available("cv2", "numpy", "sklearn")
 
 # Import data manager and AI integration
 from backend.data_manager import DataManager
@@ -52,6 +44,9 @@ from backend.websocket_redis_manager import websocket_manager as redis_websocket
 # Import database
 from backend.database import db
 from backend.websocket_manager import websocket_manager, ConnectionType, MessageType
+from backend.photo_watcher import photo_watcher
+from backend.ingest_pipeline import IngestPipeline, Stage
+from backend.blob_store import blob_store
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -144,7 +139,8 @@ async def health_check():
         # Check AI services
         ai_services_status = {
             "face_recognition": FACE_RECOGNITION_AVAILABLE,
-            "photo_clustering": PHOTO_CLUSTERING_AVAILABLE
+            "photo_clustering": PHOTO_CLUSTERING_AVAILABLE,
+            "models_loaded": get_model_status()
         }
         
         return {
@@ -154,7 +150,9 @@ async def health_check():
             "api_version": "v1",
             "services": {
                 "redis": redis_status,
-                "ai_services": ai_services_status
+                "ai_services": ai_services_status,
+                "photo_watcher": photo_watcher.get_status(),
+                "memory_suggestions": data_manager.suggestions.get_status()
             }
         }
     except Exception as e:
@@ -293,7 +291,8 @@ async def upload_memory(
     location: Optional[str] = Form(None),
     tags: str = Form("[]"),
     familyMembers: str = Form("[]"),
-    image: Optional[UploadFile] = File(None)
+    image: Optional[UploadFile] = File(None),
+    familyId: Optional[str] = Form(None)
 ):
     """Upload new memory - v1"""
     try:
@@ -301,8 +300,10 @@ async def upload_memory(
         tags_list = json.loads(tags) if tags else []
         family_members_list = json.loads(familyMembers) if familyMembers else []
         
-        # Create memory data
+        # Create memory data; the id is assigned up front so the photo can be referenced as it is stored
+        memory_id = str(uuid.uuid4())
         memory_data = {
+            "id": memory_id,
             "title": title,
             "description": description,
             "date": date,
@@ -311,60 +312,275 @@ async def upload_memory(
             "familyMembers": family_members_list
         }
         
-        # Save image if provided
-        image_path = None
+        # Save the photo; content the server already holds is deduplicated only after it has been received
+        stored = None
         if image:
-            image_path = await data_manager.save_uploaded_file(image, "memories")
-            memory_data["imageUrl"] = str(image_path)
+            stored = await data_manager.store_uploaded_file(image, "memories", owner_id=memory_id, family_id=familyId)
+        if stored:
+            memory_data["imageUrl"] = str(stored.path)
+            memory_data["imageSha256"] = stored.sha256
         
         # Create memory
         memory_id = await data_manager.create_memory(memory_data)
         
-        # Process AI analysis in background if image provided
-        if image_path and family_members_list:
-            background_tasks.add_task(
-                process_memory_ai_analysis,
-                memory_id,
-                image_path,
-                family_members_list
+        # Queue thumbnails, and AI analysis when family members are tagged, if image provided
+        analysis_queued = False
+        if stored:
+            analysis_queued = await queue_memory_ingest(
+                memory_id, stored.path, family_members_list, analyze=bool(family_members_list),
+                sha256=stored.sha256, family_id=familyId
             )
         
         return {
             "success": True,
             "memory_id": memory_id,
+            "analysis_queued": analysis_queued,
             "api_version": "v1"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading memory: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload memory")
 
-async def process_memory_ai_analysis(memory_id: str, image_path: Path, family_member_ids: List[str]):
-    """Process AI analysis for memory - background task"""
+@router.delete("/memories/{memory_id}")
+async def delete_memory(memory_id: str):
+    """Delete a memory; its photo is removed once no other memory uses it - v1"""
+    try:
+        if not await data_manager.delete_memory(memory_id):
+            raise HTTPException(status_code=404, detail="Memory not found")
+        return {"success": True, "memory_id": memory_id, "api_version": "v1"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting memory: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete memory")
+
+# Memory ingest after the upload handler has stored the file: decode -> analysis -> index -> notify.
+# Bounded queues between the stages keep a burst of uploads from starting unbounded CV work.
+INGEST_SUBMIT_TIMEOUT = float(os.getenv("INGEST_SUBMIT_TIMEOUT_SECONDS", "5"))
+
+async def _ingest_decode(job: Dict[str, Any]):
+    """Generate the photo's thumbnails, which also checks it decodes before any analysis is spent on it"""
+    from backend.derivatives import generate_derivatives
+    derivatives = await asyncio.get_running_loop().run_in_executor(
+        None, generate_derivatives, job["image_path"], job.get("sha256")
+    )
+    await data_manager.update_memory(job["id"], {"derivatives": derivatives})
+    
+    # Thumbnails are all some uploads need
+    return job["analyze"]
+
+async def _ingest_analysis(job: Dict[str, Any]):
+    """Face and scene analysis plus identification of trained family members"""
+    if not FACE_RECOGNITION_AVAILABLE:
+        return False
+    
+    # Get family members for context
+    family_members = await data_manager.get_family_members()
+    family_context = [m for m in family_members if m["id"] in job["family_member_ids"]]
+    
+    # Analyze image
+    analysis_result = await ai_integration.analyze_image(
+        image_path=job["image_path"],
+        analysis_type="memory",
+        family_context=family_context
+    )
+    
+    # Identify trained family members in the photo
+    face_matches = await asyncio.get_running_loop().run_in_executor(
+        None, face_trainer.lazy_method("identify_faces_batch"), [job["image_path"]]
+    )
+    analysis_result["family_recognition"] = face_matches[job["image_path"]]
+    job["analysis"] = analysis_result
+
+async def _ingest_index(job: Dict[str, Any]):
+    """Update memory with analysis"""
+    await data_manager.update_memory(job["id"], {"aiAnalysis": job["analysis"]})
+    logger.info(f"AI analysis completed for memory {job['id']}")
+
+async def _ingest_notify(job: Dict[str, Any]):
+    """Tell the uploading family the memory's analysis is ready"""
+    if not job.get("family_id"):
+        # Nobody to address; other families must not learn about the memory
+        return
+    
+    message = WebSocketMessage(
+        type=RedisMessageType.MEMORY_UPDATED,
+        data={"memory_id": job["id"], "ai_analysis": "completed"}
+    )
+    # Through Redis, so the family's sockets on every worker hear it
+    await redis_websocket_manager.publish_to_redis(f"family:{job['family_id']}", message)
+
+memory_ingest_pipeline = IngestPipeline("memory_ingest", [
+    Stage("decode", _ingest_decode, workers=2, queue_size=200, max_retries=0),
+    Stage("analysis", _ingest_analysis, workers=2, queue_size=50),
+    Stage("index", _ingest_index, workers=1, queue_size=200),
+    Stage("notify", _ingest_notify, workers=1, queue_size=200, max_retries=1)
+])
+
+async def queue_memory_ingest(memory_id: str, image_path: Path, family_member_ids: List[str],
+                              analyze: bool = True, sha256: Optional[str] = None,
+                              family_id: Optional[str] = None) -> bool:
+    """Hand a stored memory photo to the ingest pipeline; False when the pipeline stayed full"""
+    return await memory_ingest_pipeline.submit({
+        "id": memory_id,
+        "image_path": str(image_path),
+        "sha256": sha256,
+        "family_member_ids": family_member_ids,
+        "family_id": family_id,
+        "analyze": analyze
+    }, timeout=INGEST_SUBMIT_TIMEOUT)
+
+@router.get("/media/derivatives/{sha256}/{filename}")
+async def get_derivative(sha256: str, filename: str, request: Request):
+    """Serve a generated thumbnail; its URL embeds the content hash, so it is cached as immutable - v1"""
+    from backend.derivatives import derivative_path
+    from backend.media_serving import file_response
+    
+    path = derivative_path(sha256, filename)
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Derivative not found")
+    return file_response(request, path, media_type="image/webp", etag=f'"{sha256[:16]}-{filename}"', immutable=True)
+
+# Upload directories (below DataManager's data directory) the media endpoint serves from
+MEDIA_CATEGORIES = {"memories", "analysis", "uploads"}
+
+@router.get("/media/files/{category}/{file_path:path}")
+async def get_media_file(category: str, file_path: str, request: Request, familyId: Optional[str] = None):
+    """Serve an uploaded photo or video with Range and conditional request support - v1"""
+    from backend.media_serving import file_response, media_file_response
+    
+    if category == "blobs":
+        # Only blobs the family's own memories reference; blob paths embed the content hash, so they never change
+        stored = blob_store.get(Path(file_path).stem.lower(), familyId)
+        if stored is None or stored.path.resolve() != (blob_store.root / file_path).resolve():
+            raise HTTPException(status_code=404, detail="File not found")
+        return file_response(request, stored.path, immutable=True)
+    if category not in MEDIA_CATEGORIES:
+        raise HTTPException(status_code=404, detail="File not found")
+    return media_file_response(request, data_manager.data_dir / category, file_path)
+
+@router.get("/ingest/metrics")
+async def get_ingest_metrics():
+    """Queue depth, throughput and latency of each memory ingest stage - v1"""
+    return {
+        "success": True,
+        "pipeline": memory_ingest_pipeline.get_metrics(),
+        "api_version": "v1"
+    }
+
+@router.post("/ai/faces/reidentify")
+async def reidentify_memory_faces(request_data: Dict[str, Any] = Body(default={})):
+    """Re-run face identification over stored memory photos in batches - v1"""
     try:
         if not FACE_RECOGNITION_AVAILABLE:
-            return
+            raise HTTPException(status_code=503, detail="Face recognition not available")
         
-        # Get family members for context
-        family_members = await data_manager.get_family_members()
-        family_context = [m for m in family_members if m["id"] in family_member_ids]
+        memory_ids = set(request_data.get("memory_ids") or [])
+        batch_size = max(1, int(request_data.get("batch_size", 32)))
         
-        # Analyze image
-        analysis_result = await ai_integration.analyze_image(
-            image_path=str(image_path),
-            analysis_type="memory",
-            family_context=family_context
-        )
+        memories = await data_manager.get_memories()
+        memories = [
+            m for m in memories
+            if m.get("imageUrl") and os.path.exists(m["imageUrl"]) and (not memory_ids or m["id"] in memory_ids)
+        ]
+        
+        loop = asyncio.get_running_loop()
+        updated = 0
+        faces_identified = 0
         
-        # Update memory with analysis
-        await data_manager.update_memory(memory_id, {
-            "aiAnalysis": analysis_result
-        })
+        for start in range(0, len(memories), batch_size):
+            batch = memories[start:start + batch_size]
+            face_matches = await loop.run_in_executor(
+                None, face_trainer.lazy_method("identify_faces_batch"), [m["imageUrl"] for m in batch]
+            )
+            
+            for memory in batch:
+                matches = face_matches.get(memory["imageUrl"], [])
+                ai_analysis = memory.get("aiAnalysis") or {}
+                ai_analysis["family_recognition"] = matches
+                await data_manager.update_memory(memory["id"], {"aiAnalysis": ai_analysis})
+                
+                updated += 1
+                faces_identified += sum(1 for match in matches if match.get("family_member_id"))
         
-        logger.info(f"AI analysis completed for memory {memory_id}")
+        return {
+            "success": True,
+            "memories_processed": updated,
+            "faces_identified": faces_identified,
+            "api_version": "v1"
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in AI analysis for memory {memory_id}: {e}")
+        logger.error(f"Error re-identifying memory faces: {e}")
+        raise HTTPException(status_code=500, detail="Failed to re-identify faces")
+
+# Bulk enrollment only reads photos from below this directory
+FACE_ENROLL_ROOT = Path(os.getenv("FACE_ENROLL_ROOT", "data")).resolve()
+
+def _resolve_enroll_path(path: str) -> str:
+    """Resolve a bulk enrollment path and reject anything outside FACE_ENROLL_ROOT"""
+    resolved = Path(path).resolve()
+    if resolved != FACE_ENROLL_ROOT and FACE_ENROLL_ROOT not in resolved.parents:
+        raise HTTPException(status_code=400, detail=f"Path must be inside {FACE_ENROLL_ROOT}")
+    return str(resolved)
+
+@router.post("/ai/faces/enroll")
+async def bulk_enroll_faces(request_data: Dict[str, Any] = Body(...)):
+    """Enroll a folder or list of (member_id, image_path) samples, streaming NDJSON progress - v1"""
+    if not FACE_RECOGNITION_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Face recognition not available")
+    
+    if request_data.get("folder"):
+        folder = _resolve_enroll_path(request_data["folder"])
+        if not os.path.isdir(folder):
+            raise HTTPException(status_code=404, detail="Folder not found")
+        from backend.facial_recognition_trainer import collect_enrollment_samples
+        samples = collect_enrollment_samples(folder)
+    else:
+        samples = [
+            (sample["member_id"], _resolve_enroll_path(sample["image_path"]))
+            for sample in request_data.get("samples", [])
+        ]
+    
+    if not samples:
+        raise HTTPException(status_code=400, detail="No photos to enroll")
+    
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def report_progress(progress: Dict[str, Any]):
+        loop.call_soon_threadsafe(events.put_nowait, {"type": "progress", **progress})
+    
+    async def run_enrollment():
+        try:
+            result = await loop.run_in_executor(None, partial(
+                face_trainer.lazy_method("bulk_enroll"),
+                samples,
+                verified=bool(request_data.get("verified", False)),
+                max_workers=request_data.get("max_workers"),
+                progress_callback=report_progress
+            ))
+        except Exception as e:
+            logger.error(f"Error in bulk face enrollment: {e}")
+            result = {"success": False, "error": str(e)}
+        await events.put({"type": "result", **result})
+    
+    async def stream_events():
+        task = asyncio.create_task(run_enrollment())
+        while True:
+            event = await events.get()
+            yield json.dumps(event, default=str) + "\n"
+            if event["type"] == "result":
+                break
+        await task
+    
+    return StreamingResponse(stream_events(), media_type="application/x-ndjson")
 
 # AI Analysis Endpoints
 @router.post("/analyze")
@@ -456,6 +672,8 @@ async def analyze_image(
         
         return analysis_result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing image: {e}")
         raise HTTPException(status_code=500, detail="Failed to analyze image")
@@ -552,6 +770,8 @@ async def get_memory_suggestions(date: Optional[str] = None, family_member: Opti
             "generated_at": datetime.now().isoformat(),
             "api_version": "v1"
         }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be an ISO date (YYYY-MM-DD)")
     except Exception as e:
         logger.error(f"Error getting memory suggestions: {e}")
         raise HTTPException(status_code=500, detail="Failed to get memory suggestions")
@@ -641,10 +861,90 @@ async def analyze_photo_comprehensive(
             "processing_time": analysis.get("processing_time", 0),
             "api_version": "v1"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in comprehensive photo analysis: {e}")
         raise HTTPException(status_code=500, detail="Failed to analyze photo")
 
+# Photos of one batch request analysed at the same time; 0 means one per analysis worker
+ANALYSIS_BATCH_CONCURRENCY = int(os.getenv("ANALYSIS_BATCH_CONCURRENCY", "0"))
+
+@router.post("/ai/analyze-batch")
+async def analyze_photo_batch(
+    files: List[UploadFile] = File(default=[]),
+    memory_ids: str = Form("[]"),
+    family_context: str = Form("[]"),
+    max_concurrency: Optional[int] = Form(None)
+):
+    """Analyze many uploaded photos and/or stored memories, streaming NDJSON results as each completes - v1"""
+    from backend.analysis_executor import analysis_executor
+
+    try:
+        memory_id_list = json.loads(memory_ids) if memory_ids else []
+        family_context_list = json.loads(family_context) if family_context else []
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="memory_ids and family_context must be JSON")
+
+    # Every photo is on disk before streaming starts; uploads are closed once the handler returns
+    items = []
+    for upload in files:
+        image_path = await data_manager.save_uploaded_file(upload, "analysis")
+        items.append({"filename": upload.filename, "image_path": str(image_path)})
+
+    if memory_id_list:
+        memories = {m["id"]: m for m in await data_manager.get_memories()}
+        for memory_id in memory_id_list:
+            memory = memories.get(memory_id)
+            items.append({
+                "memory_id": memory_id,
+                "image_path": memory.get("imageUrl") if memory else None
+            })
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No photos to analyze")
+
+    concurrency = max(1, max_concurrency or ANALYSIS_BATCH_CONCURRENCY or analysis_executor.max_workers)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        source = {key: item[key] for key in ("filename", "memory_id") if key in item}
+        image_path = item["image_path"]
+        if not image_path or not os.path.exists(image_path):
+            return {"type": "error", "index": index, **source, "error": "Image not found"}
+
+        async with semaphore:
+            analysis = await analysis_executor.analyze_family_photo(image_path, family_context_list)
+
+        if "error" in analysis:
+            return {"type": "error", "index": index, **source, "error": analysis["error"]}
+        return {"type": "result", "index": index, **source, "analysis": analysis}
+
+    async def stream_results():
+        started = datetime.now()
+        tasks = [asyncio.create_task(analyze_item(i, item)) for i, item in enumerate(items)]
+        succeeded = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                event = await next_result
+                succeeded += event["type"] == "result"
+                yield json.dumps(event, default=str) + "\n"
+
+            yield json.dumps({
+                "type": "summary",
+                "total": len(items),
+                "succeeded": succeeded,
+                "failed": len(items) - succeeded,
+                "seconds": round((datetime.now() - started).total_seconds(), 3),
+                "api_version": "v1"
+            }) + "\n"
+        finally:
+            # Client went away: stop photos that are still waiting for a worker
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @router.post("/ai/memory/upload")
 async def upload_memory_with_ai(
     background_tasks: BackgroundTasks,
@@ -652,7 +952,8 @@ async def upload_memory_with_ai(
     date: str = Form(...),
     location: str = Form(None),
     family_members: str = Form("[]"),
-    tags: str = Form("[]")
+    tags: str = Form("[]"),
+    family_id: Optional[str] = Form(None)
 ):
     """Upload memory with AI processing - v1"""
     try:
@@ -660,37 +961,39 @@ async def upload_memory_with_ai(
         family_members_list = json.loads(family_members) if family_members else []
         tags_list = json.loads(tags) if tags else []
         
-        # Save uploaded file
-        image_path = await data_manager.save_uploaded_file(file, "memories")
+        # Save uploaded file, referenced by the memory about to be created
+        memory_id = str(uuid.uuid4())
+        stored = await data_manager.store_uploaded_file(file, "memories", owner_id=memory_id, family_id=family_id)
         
         # Create memory
         memory_data = {
+            "id": memory_id,
             "title": f"Memory from {date}",
             "date": date,
             "location": location,
-            "imageUrl": str(image_path),
+            "imageUrl": str(stored.path),
+            "imageSha256": stored.sha256,
             "familyMembers": family_members_list,
             "tags": tags_list
         }
         
         memory_id = await data_manager.create_memory(memory_data)
         
-        # Process AI analysis in background
-        background_tasks.add_task(
-            process_memory_ai_analysis,
-            memory_id,
-            image_path,
-            family_members_list
+        # Queue thumbnails and AI analysis
+        analysis_queued = await queue_memory_ingest(
+            memory_id, stored.path, family_members_list, sha256=stored.sha256, family_id=family_id
         )
         
         return {
             "success": True,
             "memory": memory_data,
-            "ai_analysis": {"status": "processing", "estimated_time": "30 seconds"},
+            "ai_analysis": {"status": "processing" if analysis_queued else "not_queued", "estimated_time": "30 seconds"},
             "message": "Memory uploaded successfully, AI analysis in progress",
             "api_version": "v1"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading memory with AI: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload memory")
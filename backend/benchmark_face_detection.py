@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Face Detection Benchmark for Elmowafiplatform
+Compares full-resolution HOG detection with the downscaled multi-scale path on a directory of real photos.
+Full-resolution detections are the reference; each downscaled configuration is scored by face recall,
+box overlap and encoding distance to the matching reference face
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import face_recognition
+
+from backend.facial_recognition_trainer import face_trainer
+from backend.benchmark_photo_clustering import get_git_commit
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - intersection
+    return intersection / union if union else 0.0
+
+
+def detect(image: np.ndarray, sizes: List[int]) -> Tuple[float, List[Tuple[int, int, int, int]], List[np.ndarray]]:
+    """Time detection plus encoding for one configuration"""
+    start = time.perf_counter()
+    locations = face_trainer._detect_face_locations(image, sizes)
+    encodings = face_trainer._encode_face_regions(image, locations) if locations else []
+    return time.perf_counter() - start, locations, encodings
+
+
+def benchmark_images(image_paths: List[Path], configurations: Dict[str, List[int]]) -> List[Dict[str, Any]]:
+    """Run every configuration over every image and compare with full resolution"""
+    totals = {name: {"seconds": 0.0, "faces": 0, "matched": 0, "iou": [], "distance": [], "extra": 0}
+              for name in configurations}
+    reference_seconds = 0.0
+    reference_faces = 0
+
+    for path in image_paths:
+        image = face_recognition.load_image_file(str(path))
+        seconds, reference_boxes, reference_encodings = detect(image, [])
+        reference_seconds += seconds
+        reference_faces += len(reference_boxes)
+
+        for name, sizes in configurations.items():
+            seconds, boxes, encodings = detect(image, sizes)
+            stats = totals[name]
+            stats["seconds"] += seconds
+            stats["faces"] += len(boxes)
+
+            unmatched = set(range(len(boxes)))
+            for ref_box, ref_encoding in zip(reference_boxes, reference_encodings):
+                candidates = [(box_iou(ref_box, boxes[i]), i) for i in unmatched]
+                if not candidates:
+                    break
+                iou, best = max(candidates)
+                if iou >= 0.5:
+                    unmatched.discard(best)
+                    stats["matched"] += 1
+                    stats["iou"].append(iou)
+                    stats["distance"].append(float(np.linalg.norm(ref_encoding - encodings[best])))
+            stats["extra"] += len(unmatched)
+
+    results = [{
+        "configuration": "full",
+        "sizes": [],
+        "images": len(image_paths),
+        "seconds_per_image": round(reference_seconds / len(image_paths), 4),
+        "faces": reference_faces,
+        "recall": 1.0
+    }]
+    for name, stats in totals.items():
+        results.append({
+            "configuration": name,
+            "sizes": configurations[name],
+            "images": len(image_paths),
+            "seconds_per_image": round(stats["seconds"] / len(image_paths), 4),
+            "speedup": round(reference_seconds / stats["seconds"], 2) if stats["seconds"] else None,
+            "faces": stats["faces"],
+            "recall": round(stats["matched"] / reference_faces, 4) if reference_faces else None,
+            "extra_faces": stats["extra"],
+            "mean_iou": round(float(np.mean(stats["iou"])), 4) if stats["iou"] else None,
+            "mean_encoding_distance": round(float(np.mean(stats["distance"])), 4) if stats["distance"] else None
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downscaled against full-resolution face detection")
+    parser.add_argument("images", help="Directory of photos to benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["640", "1024", "1024,2048", "1600"],
+                        help="Detection size ladders to compare, each a comma-separated list of longest-side pixels")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--output", "-o", default="face_detection_benchmark.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    image_paths = sorted(p for p in Path(args.images).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if args.limit:
+        image_paths = image_paths[:args.limit]
+    if not image_paths:
+        parser.error(f"No images found in {args.images}")
+
+    configurations = {ladder: [int(size) for size in ladder.split(",")] for ladder in args.sizes}
+    results = benchmark_images(image_paths, configurations)
+
+    for result in results:
+        print(f"{result['configuration']:<12} {result['seconds_per_image']:>8.3f}s/image "
+              f"faces={result['faces']:<5} recall={result['recall']} "
+              f"speedup={result.get('speedup')} encoding_distance={result.get('mean_encoding_distance')}")
+
+    report = {
+        "benchmark": "face_detection",
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "results": results
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Face Matcher Benchmark for Elmowafiplatform
+Compares the SVC classifier with the nearest-neighbour matcher on synthetic face encodings:
+time until a newly added person is recognised, per-face latency, accuracy and unknown rejection
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.svm import SVC
+from sklearn.preprocessing import LabelEncoder
+
+from backend.face_encoding_store import FaceEncodingStore
+from backend.face_matcher import NearestNeighbourMatcher
+from backend.benchmark_photo_clustering import get_git_commit
+
+DEFAULT_PEOPLE = [10, 50, 200]
+ENCODING_DIM = 128
+
+
+def generate_synthetic_encodings(people: int, samples_per_person: int, seed: int = 42,
+                                 spread: float = 0.3) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit-norm identity centres with per-sample noise, roughly matching dlib encoding distances"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(people + 1, ENCODING_DIM))
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+
+    noise = rng.normal(scale=spread / np.sqrt(ENCODING_DIM), size=(people + 1, samples_per_person, ENCODING_DIM))
+    samples = (centres[:, None, :] + noise).astype(np.float32)
+
+    labels = np.repeat([f"member_{i}" for i in range(people + 1)], samples_per_person)
+    # The last identity is held back as the "new person" added after the initial enrolment
+    return samples.reshape(-1, ENCODING_DIM), labels
+
+
+def fit_svc(X: np.ndarray, y: np.ndarray) -> Tuple[SVC, np.ndarray]:
+    """Train the classifier the same way FamilyFaceTrainer does"""
+    label_encoder = LabelEncoder()
+    classifier = SVC(kernel='rbf', probability=True, C=1.0, gamma='scale')
+    classifier.fit(X, label_encoder.fit_transform(y))
+    return classifier, np.asarray(label_encoder.classes_)[classifier.classes_]
+
+
+def benchmark_people(people: int, samples_per_person: int, queries: int, seed: int,
+                     centroid_candidates: int) -> List[Dict[str, Any]]:
+    """Benchmark both matchers for one family size"""
+    X, y = generate_synthetic_encodings(people, samples_per_person + 1, seed=seed)
+    per_person = samples_per_person + 1
+
+    # One sample per person is held out for querying
+    held_out = np.arange(len(X)) % per_person == 0
+    known = np.array([label != f"member_{people}" for label in y])
+    train_X, train_y = X[~held_out & known], y[~held_out & known]
+    new_X = X[~held_out & ~known]
+    query_X, query_y = X[held_out], y[held_out]
+
+    rng = np.random.default_rng(seed + 1)
+    strangers = rng.normal(size=(queries, ENCODING_DIM))
+    strangers = (strangers / np.linalg.norm(strangers, axis=1, keepdims=True)).astype(np.float32)
+    query_index = rng.integers(0, len(query_X), size=queries)
+    query_X, query_y = query_X[query_index], query_y[query_index]
+
+    results = []
+
+    # SVC: a new person is only recognised after a full retrain
+    classifier, member_labels = fit_svc(train_X, train_y)
+    start = time.perf_counter()
+    classifier, member_labels = fit_svc(np.vstack([train_X, new_X]),
+                                        np.concatenate([train_y, np.repeat(f"member_{people}", len(new_X))]))
+    time_to_recognise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = classifier.predict_proba(query_X)
+    latency = (time.perf_counter() - start) / len(query_X)
+    predicted = member_labels[probabilities.argmax(axis=1)]
+    stranger_confidence = classifier.predict_proba(strangers).max(axis=1)
+
+    results.append({
+        "matcher": "svc",
+        "people": people,
+        "samples_per_person": samples_per_person,
+        "time_to_recognise_new_person_s": round(time_to_recognise, 4),
+        "latency_per_face_ms": round(latency * 1000, 4),
+        "accuracy": round(float(np.mean(predicted == query_y)), 4),
+        "unknown_rejection_rate": round(float(np.mean(stranger_confidence < 0.6)), 4)
+    })
+
+    # k-NN: a new person is recognised as soon as their encodings are appended
+    for candidates in sorted({0, centroid_candidates}):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FaceEncodingStore(tmp_dir, dim=ENCODING_DIM)
+            for member_id in np.unique(train_y):
+                store.append(member_id, train_X[train_y == member_id])
+            matcher = NearestNeighbourMatcher(store, centroid_candidates=candidates)
+            matcher.match(query_X[:1])
+
+            start = time.perf_counter()
+            store.append(f"member_{people}", new_X)
+            matcher.match(new_X[:1])
+            time_to_recognise = time.perf_counter() - start
+
+            start = time.perf_counter()
+            matches = matcher.match(query_X)
+            latency = (time.perf_counter() - start) / len(query_X)
+            predicted = np.array([match["family_member_id"] for match in matches], dtype=object)
+            stranger_matches = matcher.match(strangers)
+
+            results.append({
+                "matcher": "knn" if not candidates else f"knn_pruned_{candidates}",
+                "people": people,
+                "samples_per_person": samples_per_person,
+                "time_to_recognise_new_person_s": round(time_to_recognise, 4),
+                "latency_per_face_ms": round(latency * 1000, 4),
+                "accuracy": round(float(np.mean(predicted == query_y)), 4),
+                "unknown_rejection_rate": round(float(np.mean([m["family_member_id"] is None for m in stranger_matches])), 4)
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SVC against nearest-neighbour face matching")
+    parser.add_argument("--people", type=int, nargs="+", default=DEFAULT_PEOPLE,
+                        help="Family sizes to benchmark (default: 10 50 200)")
+    parser.add_argument("--samples-per-person", type=int, default=10, help="Enrolled encodings per person")
+    parser.add_argument("--queries", type=int, default=500, help="Faces to identify per run")
+    parser.add_argument("--centroid-candidates", type=int, default=5,
+                        help="Also benchmark centroid pruning with this many candidate people (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic data")
+    parser.add_argument("--output", "-o", default="face_matcher_benchmark.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    results = []
+    for people in args.people:
+        for result in benchmark_people(people, args.samples_per_person, args.queries, args.seed, args.centroid_candidates):
+            results.append(result)
+            print(f"{people:>5} {result['matcher']:<16} "
+                  f"new person {result['time_to_recognise_new_person_s']:>8.4f}s "
+                  f"{result['latency_per_face_ms']:>8.4f}ms/face "
+                  f"accuracy={result['accuracy']:.3f} unknown_rejected={result['unknown_rejection_rate']:.3f}")
+
+    report = {
+        "benchmark": "face_matcher",
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "results": results
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
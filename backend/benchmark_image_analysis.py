@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Image Analysis Benchmark for Elmowafiplatform
+Times FamilyAIAnalyzer's per-image analysis steps on a folder of real photos, before and after sharing an ImageContext.
+"before" gives every step its own full-resolution context, reproducing the old per-step cvtColor/mask/Haar work;
+"after" shares one context with downsampled colour statistics. Face recognition and OCR are left out so only the
+shared feature work is measured
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Any
+
+import cv2
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import image_context
+from backend.image_context import ImageContext
+from backend.ai_services import FamilyAIAnalyzer
+from backend.analysis_cache import analysis_cache
+from backend.benchmark_photo_clustering import get_git_commit
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+async def analyze(analyzer: FamilyAIAnalyzer, image: np.ndarray, shared: bool) -> Dict[str, Any]:
+    """Run the analysis steps with either a shared context or one context per step"""
+    if shared:
+        context = ImageContext(image, analyzer.face_cascade)
+        source = lambda: context
+    else:
+        source = lambda: ImageContext(image, analyzer.face_cascade)
+
+    return {
+        "image_properties": analyzer._get_image_properties(source()),
+        "faces": await analyzer._basic_face_detection(source()),
+        "emotions": await analyzer._detect_emotions(source()),
+        "objects": await analyzer._detect_objects(source()),
+        "scene_analysis": await analyzer._analyze_scene(source()),
+        "family_insights": await analyzer._generate_family_insights(source())
+    }
+
+
+def run_mode(analyzer: FamilyAIAnalyzer, images: List[np.ndarray], shared: bool, max_dimension: int):
+    """Time one mode over every image"""
+    image_context.ANALYSIS_MAX_DIMENSION = max_dimension
+    timings = []
+    results = []
+    for image in images:
+        start = time.perf_counter()
+        results.append(asyncio.run(analyze(analyzer, image, shared)))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def agreement(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Share of images where the categorical outputs are unchanged"""
+    def fraction(key):
+        return round(sum(1 for b, a in zip(before, after) if key(b) == key(a)) / len(before), 4)
+
+    return {
+        "emotions": fraction(lambda r: r["emotions"]),
+        "objects": fraction(lambda r: sorted(o["name"] for o in r["objects"])),
+        "scene_type": fraction(lambda r: (r["scene_analysis"]["scene_type"], r["scene_analysis"]["setting"])),
+        "face_count": fraction(lambda r: r["faces"]["count"]),
+        "occasion": fraction(lambda r: r["family_insights"]["estimated_occasion"])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared image feature context against per-step analysis")
+    parser.add_argument("images", help="Directory of photos to benchmark")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--max-dimension", type=int, default=image_context.ANALYSIS_MAX_DIMENSION,
+                        help="Longest side of the downsampled copy used for colour statistics")
+    parser.add_argument("--output", "-o", default="image_analysis_benchmark.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if args.limit:
+        paths = paths[:args.limit]
+    images = [image for image in (cv2.imread(str(p)) for p in paths) if image is not None]
+    if not images:
+        parser.error(f"No images found in {args.images}")
+
+    # Measure the analysis itself, not cache lookups
+    analysis_cache.enabled = False
+    analyzer = FamilyAIAnalyzer()
+    before_timings, before_results = run_mode(analyzer, images, shared=False, max_dimension=10 ** 9)
+    after_timings, after_results = run_mode(analyzer, images, shared=True, max_dimension=args.max_dimension)
+
+    summary = {
+        "images": len(images),
+        "before_seconds_per_image": round(float(np.mean(before_timings)), 4),
+        "after_seconds_per_image": round(float(np.mean(after_timings)), 4),
+        "before_p95_seconds": round(float(np.percentile(before_timings, 95)), 4),
+        "after_p95_seconds": round(float(np.percentile(after_timings, 95)), 4),
+        "speedup": round(float(np.sum(before_timings) / np.sum(after_timings)), 2),
+        "output_agreement": agreement(before_results, after_results)
+    }
+    print(json.dumps(summary, indent=2))
+
+    report = {
+        "benchmark": "image_analysis",
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "results": summary
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Image Loading Benchmark for Elmowafiplatform
+Compares full-resolution cv2.imread against the shared loader's reduced-resolution JPEG decode on a folder
+of real photos. Memory is the size of the decoded array each analyzer holds; decode latency includes the
+final resize to the requested maximum dimension
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Any
+
+import cv2
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.image_loader import load_image
+from backend.benchmark_photo_clustering import get_git_commit
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def run_mode(paths: List[Path], loader: Callable[[str], np.ndarray], repeats: int) -> Dict[str, Any]:
+    """Decode every photo, keeping the fastest of several runs per photo"""
+    timings = []
+    array_bytes = []
+    megapixels = []
+    for path in paths:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            image = loader(str(path))
+            best = min(best, time.perf_counter() - start)
+        if image is None:
+            continue
+        timings.append(best)
+        array_bytes.append(image.nbytes)
+        megapixels.append(image.shape[0] * image.shape[1] / 1e6)
+
+    return {
+        "images": len(timings),
+        "seconds_per_image": round(float(np.mean(timings)), 4),
+        "p95_seconds": round(float(np.percentile(timings, 95)), 4),
+        "mean_megapixels": round(float(np.mean(megapixels)), 3),
+        "mean_decoded_mb": round(float(np.mean(array_bytes)) / 1024 / 1024, 2),
+        "total_seconds": float(np.sum(timings))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reduced-resolution decoding against cv2.imread")
+    parser.add_argument("images", help="Directory of photos to benchmark")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--max-dimension", type=int, action="append", default=None,
+                        help="Longest side to decode at; repeat to compare several (default: 512, 1280, 2048)")
+    parser.add_argument("--repeats", type=int, default=3, help="Decodes per photo; the fastest is kept")
+    parser.add_argument("--output", "-o", default="image_loading_benchmark.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        parser.error(f"No images found in {args.images}")
+
+    results = {"full_resolution_imread": run_mode(paths, cv2.imread, args.repeats)}
+    baseline = results["full_resolution_imread"]
+
+    for max_dimension in args.max_dimension or [512, 1280, 2048]:
+        mode = run_mode(paths, lambda path: load_image(path, max_dimension), args.repeats)
+        mode["speedup"] = round(baseline["total_seconds"] / mode["total_seconds"], 2)
+        mode["memory_reduction"] = round(baseline["mean_decoded_mb"] / max(mode["mean_decoded_mb"], 1e-9), 2)
+        results[f"reduced_{max_dimension}"] = mode
+
+    print(json.dumps(results, indent=2))
+
+    report = {
+        "benchmark": "image_loading",
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "parameters": vars(args),
+        "results": results
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Photo Clustering Benchmark for Elmowafiplatform
+Times every PhotoClusteringEngine algorithm on synthetic family memories and
+writes a JSON report that can be diffed between commits
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple, Optional, Any
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.metrics import adjusted_rand_score
+
+from backend.photo_clustering import PhotoClusteringEngine
+
+# Algorithms dispatched by PhotoClusteringEngine.create_automatic_albums
+ALGORITHMS = ["spatiotemporal", "multi_feature", "temporal", "visual_clustering"]
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+LOCATIONS = [
+    ("Cairo", 30.0444, 31.2357),
+    ("Alexandria", 31.2001, 29.9187),
+    ("Giza", 30.0131, 31.2089),
+    ("Luxor", 25.6872, 32.6396),
+    ("Dubai", 25.2048, 55.2708),
+    ("Abu Dhabi", 24.4539, 54.3773),
+    ("Istanbul", 41.0082, 28.9784),
+    ("London", 51.5074, -0.1278),
+    ("Paris", 48.8566, 2.3522),
+    ("Sharm El Sheikh", 27.9158, 34.3300),
+]
+
+TRIP_THEMES = {
+    "beach": ["beach", "sea", "swimming", "sunset", "vacation"],
+    "history": ["history", "pyramids", "museum", "culture", "egypt"],
+    "celebration": ["birthday", "celebration", "cake", "party", "family"],
+    "city": ["city", "shopping", "food", "travel", "friends"],
+    "nature": ["nature", "hiking", "park", "picnic", "outdoors"],
+}
+
+
+def generate_synthetic_memories(count: int, seed: int = 42,
+                                family_size: int = 8,
+                                noise_ratio: float = 0.05) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Generate synthetic memories grouped into trips with ground-truth labels"""
+    rng = random.Random(seed)
+    members = [f"member_{i}" for i in range(1, family_size + 1)]
+    base_date = datetime(2015, 1, 1)
+
+    memories = []
+    labels = []
+    noise_count = int(count * noise_ratio)
+    trip_id = 0
+
+    while len(memories) < count - noise_count:
+        # Each trip is one location, a short date range and a subset of the family
+        location, lat, lon = rng.choice(LOCATIONS)
+        theme = rng.choice(list(TRIP_THEMES))
+        start = base_date + timedelta(days=rng.randint(0, 3650))
+        duration_days = rng.randint(1, 10)
+        trip_members = rng.sample(members, rng.randint(2, family_size))
+        trip_size = min(rng.randint(5, 40), count - noise_count - len(memories))
+
+        for _ in range(trip_size):
+            taken = start + timedelta(days=rng.randint(0, duration_days - 1),
+                                      hours=rng.randint(8, 22), minutes=rng.randint(0, 59))
+            memories.append({
+                "id": f"mem_{len(memories)}",
+                "title": f"{location} {theme}",
+                "date": taken.isoformat(),
+                "location": location,
+                "latitude": lat + rng.uniform(-0.02, 0.02),
+                "longitude": lon + rng.uniform(-0.02, 0.02),
+                "imageUrl": f"/uploads/synthetic_{len(memories)}.jpg",
+                "tags": rng.sample(TRIP_THEMES[theme], rng.randint(2, 4)),
+                "familyMembers": rng.sample(trip_members, rng.randint(1, len(trip_members)))
+            })
+            labels.append(trip_id)
+
+        trip_id += 1
+
+    # Unrelated one-off memories; every one is its own ground-truth cluster
+    for _ in range(noise_count):
+        location, lat, lon = rng.choice(LOCATIONS)
+        theme = rng.choice(list(TRIP_THEMES))
+        taken = base_date + timedelta(days=rng.randint(0, 3650), hours=rng.randint(0, 23))
+        memories.append({
+            "id": f"mem_{len(memories)}",
+            "title": f"{location} snapshot",
+            "date": taken.isoformat(),
+            "location": location,
+            "latitude": lat + rng.uniform(-0.5, 0.5),
+            "longitude": lon + rng.uniform(-0.5, 0.5),
+            "imageUrl": f"/uploads/synthetic_{len(memories)}.jpg",
+            "tags": rng.sample(TRIP_THEMES[theme], 1),
+            "familyMembers": rng.sample(members, 1)
+        })
+        labels.append(trip_id)
+        trip_id += 1
+
+    order = list(range(len(memories)))
+    rng.shuffle(order)
+    return [memories[i] for i in order], [labels[i] for i in order]
+
+
+def cluster_labels(clusters: List[List[Dict]], memories: List[Dict[str, Any]]) -> List[int]:
+    """Convert clusters into per-memory labels; unclustered memories become singletons"""
+    assigned = {}
+    for label, cluster in enumerate(clusters):
+        for memory in cluster:
+            assigned[memory["id"]] = label
+
+    labels = []
+    next_singleton = len(clusters)
+    for memory in memories:
+        if memory["id"] in assigned:
+            labels.append(assigned[memory["id"]])
+        else:
+            labels.append(next_singleton)
+            next_singleton += 1
+    return labels
+
+
+def benchmark_algorithm(engine: PhotoClusteringEngine, algorithm: str,
+                        memories: List[Dict[str, Any]], truth: List[int],
+                        repeat: int = 1) -> Dict[str, Any]:
+    """Time a single algorithm and score it against ground truth"""
+    timings = []
+    peak_bytes = 0
+    clusters = []
+
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            clusters = engine.run_clustering(memories, algorithm)
+            error = None
+        except Exception as e:
+            clusters = []
+            error = str(e)
+        timings.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_bytes = max(peak_bytes, peak)
+
+        if error:
+            return {"algorithm": algorithm, "size": len(memories), "error": error}
+
+    timings.sort()
+    return {
+        "algorithm": algorithm,
+        "size": len(memories),
+        "seconds": round(timings[len(timings) // 2], 4),
+        "seconds_min": round(timings[0], 4),
+        "peak_memory_mb": round(peak_bytes / (1024 * 1024), 2),
+        "clusters": len(clusters),
+        "clustered_memories": sum(len(cluster) for cluster in clusters),
+        "quality_score": round(float(engine._calculate_clustering_quality(clusters, memories)), 4),
+        "adjusted_rand_index": round(float(adjusted_rand_score(truth, cluster_labels(clusters, memories))), 4)
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    """Return the current git commit, if available"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(sizes: List[int], algorithms: List[str], seed: int = 42, repeat: int = 1) -> Dict[str, Any]:
+    """Run every algorithm at every size and build the report"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = PhotoClusteringEngine(db_path=os.path.join(tmp_dir, "benchmark.db"))
+        results = []
+
+        for size in sizes:
+            memories, truth = generate_synthetic_memories(size, seed=seed)
+            for algorithm in algorithms:
+                result = benchmark_algorithm(engine, algorithm, memories, truth, repeat=repeat)
+                results.append(result)
+                print(f"{size:>7} {algorithm:<18} "
+                      + (f"{result['seconds']:>9.3f}s {result['peak_memory_mb']:>9.1f}MB "
+                         f"ARI={result['adjusted_rand_index']:.3f} quality={result['quality_score']:.3f}"
+                         if "error" not in result else f"ERROR {result['error']}"))
+
+    return {
+        "benchmark": "photo_clustering",
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "seed": seed,
+            "repeat": repeat,
+            "sizes": sizes,
+            "algorithms": algorithms,
+            "min_album_size": engine.min_album_size,
+            "time_threshold_days": engine.time_threshold_days
+        },
+        "results": results
+    }
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Describe changes between two reports"""
+    previous = {(r["size"], r["algorithm"]): r for r in baseline.get("results", [])}
+    lines = []
+    for result in report["results"]:
+        before = previous.get((result["size"], result["algorithm"]))
+        if not before or "error" in result or "error" in before:
+            continue
+        speedup = before["seconds"] / result["seconds"] if result["seconds"] else float("inf")
+        lines.append(
+            f"{result['size']:>7} {result['algorithm']:<18} "
+            f"time x{speedup:.2f}  "
+            f"memory {result['peak_memory_mb'] - before['peak_memory_mb']:+.1f}MB  "
+            f"ARI {result['adjusted_rand_index'] - before['adjusted_rand_index']:+.3f}  "
+            f"quality {result['quality_score'] - before['quality_score']:+.3f}"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark photo clustering algorithms")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Memory counts to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS,
+                        help="Algorithms to benchmark (default: all)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic data")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per algorithm; the median is reported")
+    parser.add_argument("--output", "-o", default="photo_clustering_benchmark.json",
+                        help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.algorithms, seed=args.seed, repeat=args.repeat)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} ({baseline.get('git_commit')}):")
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Media Store for Elmowafiplatform
+Uploads are stored once per distinct content under data/blobs/<sha[:2]>/<sha[2:4]>/<sha>.<ext>;
+memories hold references, and a blob is deleted when its last reference is released. Content is only
+deduplicated once the server holds the bytes, and lookups only see blobs the asking family references,
+so a hash alone never grants access to a photo or reveals that it is stored.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+
+from fastapi import UploadFile
+
+try:
+    from backend.upload_stream import StoredUpload, stream_to_temp, copy_to_temp, detect_kind, MEDIA_KINDS
+except ImportError:
+    from upload_stream import StoredUpload, stream_to_temp, copy_to_temp, detect_kind, MEDIA_KINDS
+
+logger = logging.getLogger(__name__)
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+class BlobStore:
+    """sha256-sharded blob directory with a SQLite index and per-owner references"""
+
+    def __init__(self, root: str = "data/blobs", db_path: str = "data/blobs.db"):
+        self.root = Path(root)
+        self.db_path = db_path
+        self.root.mkdir(parents=True, exist_ok=True)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Connection holding SQLite's write lock, so check-then-act steps are atomic across workers too"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blob_refs (
+                sha256 TEXT NOT NULL,
+                owner_id TEXT NOT NULL,
+                family_id TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (sha256, owner_id)
+            )
+        """)
+        # Indexes created before references were scoped per family lack the column
+        ref_columns = {row[1] for row in conn.execute("PRAGMA table_info(blob_refs)")}
+        if "family_id" not in ref_columns:
+            conn.execute("ALTER TABLE blob_refs ADD COLUMN family_id TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_blob_refs_owner ON blob_refs(owner_id)")
+        conn.commit()
+        conn.close()
+
+    def blob_path(self, sha256: str, kind: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / f"{sha256}.{kind}"
+
+    def _lookup(self, conn: sqlite3.Connection, sha256: str) -> Optional[StoredUpload]:
+        if not _SHA256.match(sha256 or ""):
+            return None
+        row = conn.execute("SELECT path, size, kind FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None
+        return StoredUpload(path=Path(row[0]), sha256=sha256, size=row[1], kind=row[2])
+
+    def _add_ref(self, conn: sqlite3.Connection, sha256: str, owner_id: str, family_id: Optional[str]):
+        conn.execute(
+            "INSERT OR IGNORE INTO blob_refs (sha256, owner_id, family_id, created_at) VALUES (?, ?, ?, ?)",
+            (sha256, owner_id, family_id or "", datetime.now().isoformat())
+        )
+
+    def get(self, sha256: str, family_id: Optional[str] = None) -> Optional[StoredUpload]:
+        """The stored blob for a content hash, if one of family_id's owners references it
+
+        Owners stored without a family form their own scope.
+        """
+        conn = self._connect()
+        try:
+            referenced = conn.execute(
+                "SELECT 1 FROM blob_refs WHERE sha256 = ? AND family_id = ? LIMIT 1", (sha256, family_id or "")
+            ).fetchone()
+            return self._lookup(conn, sha256) if referenced else None
+        finally:
+            conn.close()
+
+    def has_ref(self, sha256: str, owner_id: str) -> bool:
+        """Whether owner_id holds a reference to a blob that is still stored"""
+        conn = self._connect()
+        try:
+            referenced = conn.execute(
+                "SELECT 1 FROM blob_refs WHERE sha256 = ? AND owner_id = ?", (sha256, owner_id)
+            ).fetchone()
+            return referenced is not None and self._lookup(conn, sha256) is not None
+        finally:
+            conn.close()
+
+    async def put_upload(self, file: UploadFile, allowed_kinds: Iterable[str] = MEDIA_KINDS,
+                         owner_id: Optional[str] = None, family_id: Optional[str] = None) -> StoredUpload:
+        """Stream an upload in, referenced by owner_id when given; content already stored is not kept twice
+
+        The hash is only known once every byte has arrived, so the upload is always read in full.
+        """
+        temp = await stream_to_temp(file, self.root, allowed_kinds)
+        return self.adopt(temp.path, temp.sha256, temp.size, temp.kind, owner_id, family_id)
+
+    def put_stream(self, source: BinaryIO, allowed_kinds: Iterable[str] = MEDIA_KINDS,
+                   owner_id: Optional[str] = None, family_id: Optional[str] = None) -> StoredUpload:
+        """put_upload for a blocking file object, e.g. a Flask upload's stream"""
+        temp = copy_to_temp(source, self.root, allowed_kinds)
+        return self.adopt(temp.path, temp.sha256, temp.size, temp.kind, owner_id, family_id)
+
+    def put_file(self, source: str, sha256: str, owner_id: Optional[str] = None,
+                 family_id: Optional[str] = None) -> StoredUpload:
+        """Copy a local file (e.g. from a watched folder) in, referenced by owner_id when given
+
+        A copy rather than a link, so later edits to the original cannot change stored content. The
+        caller hashed the file itself, so stored content is referenced without copying it again.
+        """
+        with self._write_transaction() as conn:
+            stored = self._lookup(conn, sha256)
+            if stored is not None and owner_id is not None:
+                self._add_ref(conn, sha256, owner_id, family_id)
+        if stored is not None:
+            return stored
+
+        with open(source, "rb") as f:
+            header = f.read(16)
+        kind = detect_kind(header) or Path(source).suffix.lstrip(".").lower() or "bin"
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".import-", suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return self.adopt(Path(temp_path), sha256, os.path.getsize(temp_path), kind, owner_id, family_id)
+
+    def adopt(self, temp_path: Path, sha256: str, size: int, kind: str,
+              owner_id: Optional[str] = None, family_id: Optional[str] = None) -> StoredUpload:
+        """Move a hashed temp file into the store, or drop it when the content is already there
+
+        The owner's reference is taken in the same transaction, so a concurrent release cannot delete
+        the blob before its new owner holds it.
+        """
+        with self._write_transaction() as conn:
+            stored = self._lookup(conn, sha256)
+            if stored is not None:
+                os.unlink(temp_path)
+                logger.info(f"Upload matches stored blob {sha256[:12]}")
+            else:
+                path = self.blob_path(sha256, kind)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha256, path, size, kind, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (sha256, str(path), size, kind, datetime.now().isoformat())
+                )
+                stored = StoredUpload(path=path, sha256=sha256, size=size, kind=kind)
+                logger.info(f"Stored blob {sha256[:12]} ({size} bytes)")
+
+            if owner_id is not None:
+                self._add_ref(conn, sha256, owner_id, family_id)
+        return stored
+
+    def release_owner(self, owner_id: str) -> int:
+        """Drop every reference held by owner_id, deleting blobs nobody references any more"""
+        with self._write_transaction() as conn:
+            shas = [sha for (sha,) in conn.execute("SELECT sha256 FROM blob_refs WHERE owner_id = ?", (owner_id,))]
+            conn.execute("DELETE FROM blob_refs WHERE owner_id = ?", (owner_id,))
+
+            orphaned = [
+                sha for sha in shas
+                if conn.execute("SELECT 1 FROM blob_refs WHERE sha256 = ? LIMIT 1", (sha,)).fetchone() is None
+            ]
+            paths = [
+                row[0] for sha in orphaned
+                for row in conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha,))
+            ]
+            conn.executemany("DELETE FROM blobs WHERE sha256 = ?", [(sha,) for sha in orphaned])
+
+            # Still under the write lock, so an adopt() of the same content cannot land in between
+            for path in paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        if paths:
+            logger.info(f"Deleted {len(paths)} blobs no longer referenced after releasing {owner_id}")
+        return len(paths)
+
+    def ref_count(self, sha256: str) -> int:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM blob_refs WHERE sha256 = ?", (sha256,)).fetchone()[0]
+        conn.close()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Blob count, stored bytes and how many references point at them"""
+        conn = self._connect()
+        blobs, stored_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        refs = conn.execute("SELECT COUNT(*) FROM blob_refs").fetchone()[0]
+        conn.close()
+        return {"blobs": blobs, "stored_bytes": stored_bytes, "references": refs}
+
+# Global blob store
+blob_store = BlobStore(os.getenv("BLOB_STORE_DIR", "data/blobs"), os.getenv("BLOB_STORE_DB", "data/blobs.db"))
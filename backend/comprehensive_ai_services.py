@@ -27,6 +27,11 @@ import face_recognition
 from PIL import Image
 import pickle
 
+try:
+    from backend.image_loader import DECODE_MAX_DIMENSION, load_image, load_image_with_size
+except ImportError:
+    from image_loader import DECODE_MAX_DIMENSION, load_image, load_image_with_size
+
 # Import useful components from hack2
 sys.path.insert(0, str(Path(__file__).parent.parent / "core" / "ai-services" / "hack2"))
 
@@ -255,7 +260,7 @@ class FamilyMemoryAI:
     def add_family_member_face(self, member_id: str, name: str, image_path: str) -> bool:
         """Add face encoding for a family member"""
         try:
-            image = face_recognition.load_image_file(image_path)
+            image = load_image(image_path, DECODE_MAX_DIMENSION, rgb=True)
             encodings = face_recognition.face_encodings(image)
             
             if encodings:
@@ -271,17 +276,17 @@ class FamilyMemoryAI:
     async def analyze_photo(self, image_path: str, metadata: Dict = None) -> MemoryAnalysis:
         """Comprehensive photo analysis for family memories"""
         try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not load image: {image_path}")
+            # Load image upright and at reduced size
+            image, (width, height) = load_image_with_size(image_path, DECODE_MAX_DIMENSION)
+            scale = image.shape[1] / width
             
             # Convert BGR to RGB for face_recognition
             rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
-            # Detect faces
+            # Detect faces, reporting their locations in original photo coordinates
             face_locations = face_recognition.face_locations(rgb_image)
             face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
+            face_locations = [tuple(int(v / scale) for v in location) for location in face_locations]
             
             detected_faces = []
             family_members_identified = []
@@ -7,9 +7,17 @@ import sqlite3
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import base64
+import uuid
 from pathlib import Path
 import logging
 
+try:
+    from backend.blob_store import blob_store
+    from backend.suggestion_store import SuggestionMaterializer, SUGGESTION_FIELDS, memory_suggestions
+except ImportError:
+    from blob_store import blob_store
+    from suggestion_store import SuggestionMaterializer, SUGGESTION_FIELDS, memory_suggestions
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +31,12 @@ class DataManager:
         # Import database manager
         from database import ElmowafyDatabase
         self.db = ElmowafyDatabase(db_path)
+        
+        # Share the global materializer (and its refresher) when this is the same database
+        if os.path.abspath(db_path) == os.path.abspath(memory_suggestions.db_path):
+            self.suggestions = memory_suggestions
+        else:
+            self.suggestions = SuggestionMaterializer(db_path)
     
     def get_family_members(self) -> List[Dict[str, Any]]:
         """Get all family members"""
@@ -692,7 +706,20 @@ For support, contact: support@familyplatform.com
     async def create_memory(self, memory_data: Dict[str, Any]) -> str:
         """Create a new memory"""
         try:
-            memory_id = self.db.create_memory(memory_data)
+            memory_id = memory_data.get("id") or str(uuid.uuid4())
+            
+            # The memory keeps its photo's blob alive; the reference was taken when the photo was stored under
+            # this memory's id, so a hash from anywhere else cannot attach someone else's photo
+            if memory_data.get("imageSha256") and not blob_store.has_ref(memory_data["imageSha256"], memory_id):
+                raise ValueError(f"Photo {memory_data['imageSha256']} was not stored for memory {memory_id}")
+            
+            try:
+                memory_id = self.db.create_memory({**memory_data, "id": memory_id})
+            except Exception:
+                blob_store.release_owner(memory_id)
+                raise
+            
+            self.suggestions.invalidate(memory_data.get("familyMembers", []))
             logger.info(f"Created memory: {memory_id}")
             return memory_id
         except Exception as e:
@@ -702,62 +729,80 @@ For support, contact: support@familyplatform.com
     async def update_memory(self, memory_id: str, updates: Dict[str, Any]) -> bool:
         """Update a memory"""
         try:
+            affects_suggestions = not SUGGESTION_FIELDS.isdisjoint(updates)
+            if affects_suggestions:
+                previous_members = self.suggestions.memory_members(memory_id)
+            
             success = self.db.update_memory(memory_id, updates)
+            
+            if success and affects_suggestions:
+                self.suggestions.invalidate(set(previous_members) | set(updates.get("familyMembers", [])))
             logger.info(f"Updated memory: {memory_id}")
             return success
         except Exception as e:
             logger.error(f"Error updating memory: {e}")
             raise
 
+    async def delete_memory(self, memory_id: str) -> bool:
+        """Delete a memory, releasing its photo if no other memory uses it"""
+        try:
+            members = self.suggestions.memory_members(memory_id)
+            deleted = self.db.delete_memory(memory_id)
+            if deleted:
+                blob_store.release_owner(memory_id)
+                self.suggestions.invalidate(members)
+                logger.info(f"Deleted memory: {memory_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting memory: {e}")
+            raise
+
     async def save_uploaded_file(self, file, category: str = "uploads") -> Path:
         """Save an uploaded file and return the path"""
+        return (await self.store_uploaded_file(file, category)).path
+    
+    async def store_uploaded_file(self, file, category: str = "uploads", owner_id: str = None, family_id: str = None):
+        """Stream an uploaded file to disk; returns its path, SHA-256, size and detected type
+        
+        Memory photos go to the content-addressed blob store, referenced by owner_id (the memory's id)
+        within family_id, whose media requests may then fetch it. Other
+        categories (e.g. photos uploaded only to be analysed) are nobody's to release, so they stay
+        plain files under the category directory.
+        """
         try:
+            if category == "memories":
+                stored = await blob_store.put_upload(file, owner_id=owner_id, family_id=family_id)
+                logger.info(f"Saved uploaded memory photo: {stored.path}")
+                return stored
+            
+            try:
+                from backend.upload_stream import stream_upload, MEDIA_KINDS
+            except ImportError:
+                from upload_stream import stream_upload, MEDIA_KINDS
+            
             # Create category directory
             upload_dir = self.data_dir / category
             upload_dir.mkdir(exist_ok=True)
             
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{file.filename}"
+            filename = f"{timestamp}_{Path(file.filename or 'upload').name}"
             file_path = upload_dir / filename
             
-            # Save file
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            # Save file in chunks, validating type and size as it streams
+            stored = await stream_upload(file, file_path, allowed_kinds=MEDIA_KINDS)
             
             logger.info(f"Saved uploaded file: {file_path}")
-            return file_path
+            return stored
             
         except Exception as e:
             logger.error(f"Error saving uploaded file: {e}")
             raise
 
     async def get_memory_suggestions(self, date: str = None, family_member: str = None) -> Dict[str, Any]:
-        """Get smart memory suggestions"""
+        """Get smart memory suggestions, precomputed per family and member"""
         try:
-            # For now, return mock data - in real implementation this would use AI
-            suggestions = {
-                "on_this_day": [],
-                "similar_memories": [],
-                "family_connections": [],
-                "contextual_suggestions": [
-                    "Upload more photos from recent family gatherings",
-                    "Add location tags to memories for better organization",
-                    "Consider creating a travel plan for upcoming holidays"
-                ]
-            }
-            
-            # Get some actual memories if available
-            try:
-                memories = self.db.get_memories()
-                if memories:
-                    suggestions["similar_memories"] = memories[:3]
-            except Exception as e:
-                logger.error(f"Error getting memories for suggestions: {e}")
-                # Keep default empty suggestions
-            
-            return suggestions
+            return self.suggestions.get(family_member=family_member, target_date=date)
         except Exception as e:
             logger.error(f"Error getting memory suggestions: {e}")
             raise
@@ -58,11 +58,17 @@ class ElmowafyDatabase:
                     tags TEXT,  -- JSON string
                     family_members TEXT,  -- JSON string
                     ai_analysis TEXT,  -- JSON string
+                    derivatives TEXT,  -- JSON string: thumbnail name -> url, width, height
                     created_at TEXT,
                     updated_at TEXT
                 )
             """)
             
+            # Databases created before derivatives were generated lack the column
+            memory_columns = {row["name"] for row in conn.execute("PRAGMA table_info(memories)")}
+            if "derivatives" not in memory_columns:
+                conn.execute("ALTER TABLE memories ADD COLUMN derivatives TEXT")
+            
             # Travel Plans table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS travel_plans (
@@ -351,14 +357,14 @@ class ElmowafyDatabase:
     # Memories operations
     def create_memory(self, memory_data: Dict[str, Any]) -> str:
         """Create a new memory"""
-        memory_id = str(uuid.uuid4())
+        memory_id = memory_data.get("id") or str(uuid.uuid4())
         now = datetime.now().isoformat()
         
         with self.get_connection() as conn:
             conn.execute("""
                 INSERT INTO memories 
-                (id, title, description, date, location, image_url, tags, family_members, ai_analysis, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (id, title, description, date, location, image_url, tags, family_members, ai_analysis, derivatives, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 memory_id,
                 memory_data.get("title", ""),
@@ -369,6 +375,7 @@ class ElmowafyDatabase:
                 json.dumps(memory_data.get("tags", [])),
                 json.dumps(memory_data.get("familyMembers", [])),
                 json.dumps(memory_data.get("aiAnalysis", {})) if memory_data.get("aiAnalysis") else None,
+                json.dumps(memory_data["derivatives"]) if memory_data.get("derivatives") else None,
                 now,
                 now
             ))
@@ -416,12 +423,20 @@ class ElmowafyDatabase:
                     "imageUrl": row["image_url"],
                     "tags": json.loads(row["tags"]) if row["tags"] else [],
                     "familyMembers": json.loads(row["family_members"]) if row["family_members"] else [],
-                    "aiAnalysis": json.loads(row["ai_analysis"]) if row["ai_analysis"] else None
+                    "aiAnalysis": json.loads(row["ai_analysis"]) if row["ai_analysis"] else None,
+                    "derivatives": json.loads(row["derivatives"]) if row["derivatives"] else {}
                 }
                 memories.append(memory)
             
             return memories
     
+    def delete_memory(self, memory_id: str) -> bool:
+        """Delete memory"""
+        with self.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+    
     def update_memory(self, memory_id: str, updates: Dict[str, Any]) -> bool:
         """Update memory"""
         now = datetime.now().isoformat()
@@ -452,6 +467,10 @@ class ElmowafyDatabase:
                 set_clauses.append("ai_analysis = ?")
                 values.append(json.dumps(updates["aiAnalysis"]))
             
+            if "derivatives" in updates:
+                set_clauses.append("derivatives = ?")
+                values.append(json.dumps(updates["derivatives"]))
+            
             set_clauses.append("updated_at = ?")
             values.append(now)
             values.append(memory_id)
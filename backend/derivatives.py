@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Photo Derivatives for Elmowafiplatform
+Generates WebP thumbnails at a few sizes from one reduced decode of the original, stored under the
+original's content hash with the size and quality in the name, so a derivative's URL never changes meaning
+and can be cached forever
+"""
+
+import io
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+from PIL import Image, ExifTags
+
+try:
+    from backend.image_loader import load_image
+    from backend.image_context import file_sha256
+except ImportError:
+    from image_loader import load_image
+    from image_context import file_sha256
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = Path(os.getenv("DERIVATIVES_DIR", "data/derivatives"))
+DERIVATIVES_URL_PREFIX = os.getenv("DERIVATIVES_URL_PREFIX", "/api/v1/media/derivatives")
+WEBP_QUALITY = int(os.getenv("DERIVATIVE_WEBP_QUALITY", "80"))
+
+def _parse_sizes(spec: str) -> Dict[str, int]:
+    sizes = {}
+    for item in spec.split(","):
+        name, _, size = item.strip().partition(":")
+        sizes[name] = int(size)
+    return sizes
+
+# Name -> longest side in pixels, largest last
+DERIVATIVE_SIZES = dict(sorted(
+    _parse_sizes(os.getenv("DERIVATIVE_SIZES", "thumb:160,small:480,large:1280")).items(), key=lambda item: item[1]
+))
+
+_FILENAME = re.compile(r"^[a-z0-9_]+_\d+_q\d+\.webp$")
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+def _filename(name: str) -> str:
+    return f"{name}_{DERIVATIVE_SIZES[name]}_q{WEBP_QUALITY}.webp"
+
+def derivative_path(sha256: str, filename: str) -> Optional[Path]:
+    """On-disk location of a derivative, or None for names that could not have been generated"""
+    if not _SHA256.match(sha256) or not _FILENAME.match(filename):
+        return None
+    return DERIVATIVES_DIR / sha256[:2] / sha256 / filename
+
+def generate_derivatives(image_path: str, sha256: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Create any missing derivatives of a photo; returns name -> url, width and height"""
+    sha256 = sha256 or file_sha256(image_path)
+    directory = DERIVATIVES_DIR / sha256[:2] / sha256
+    targets = {name: directory / _filename(name) for name in DERIVATIVE_SIZES}
+
+    derivatives = {}
+    missing = [name for name, path in targets.items() if not path.exists()]
+    if missing:
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # One decode at the largest size needed; smaller sizes are area-resized from the previous one
+        image = load_image(image_path, DERIVATIVE_SIZES[missing[-1]], rgb=True)
+        for name in reversed(missing):
+            longest = DERIVATIVE_SIZES[name]
+            scale = longest / max(image.shape[:2])
+            if scale < 1:
+                image = cv2.resize(image, (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            _write_webp(image, targets[name])
+
+    for name, path in targets.items():
+        with Image.open(path) as derivative:
+            width, height = derivative.size
+        derivatives[name] = {
+            "url": f"{DERIVATIVES_URL_PREFIX}/{sha256}/{path.name}",
+            "width": width,
+            "height": height
+        }
+
+    if missing:
+        logger.info(f"Generated {len(missing)} derivatives for {image_path}")
+    return derivatives
+
+# EXIF orientation -> transpose that turns the embedded thumbnail upright
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+def exif_thumbnail(image_path: str) -> Optional[Dict[str, Any]]:
+    """Serve the camera's embedded EXIF thumbnail as a derivative; None when the photo has none
+
+    Only the EXIF header is read, never the photo's pixels or the rest of the file, so it is stored
+    under the hash of the embedded thumbnail rather than the original's content hash.
+    """
+    try:
+        with Image.open(image_path) as image:
+            raw = image.info.get("exif") or b""
+            exif = image.getexif()
+            orientation = exif.get(ExifTags.Base.Orientation, 1)
+            ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+    except Exception as e:
+        logger.debug(f"No EXIF thumbnail in {image_path}: {e}")
+        return None
+
+    # Offsets count from the TIFF header, which follows the "Exif\0\0" marker
+    offset = ifd1.get(ExifTags.Base.JpegIFOffset)
+    length = ifd1.get(ExifTags.Base.JpegIFByteCount)
+    if not raw.startswith(b"Exif\x00\x00") or not offset or not length:
+        return None
+    data = raw[6 + offset:6 + offset + length]
+    if not data.startswith(b"\xff\xd8"):
+        return None
+
+    sha256 = hashlib.sha256(data + bytes([orientation % 256])).hexdigest()
+    directory = DERIVATIVES_DIR / sha256[:2] / sha256
+    existing = next(directory.glob("exif_*.webp"), None) if directory.exists() else None
+    if existing is None:
+        try:
+            with Image.open(io.BytesIO(data)) as embedded:
+                thumbnail = embedded.convert("RGB")
+        except Exception as e:
+            logger.debug(f"Unreadable EXIF thumbnail in {image_path}: {e}")
+            return None
+        if orientation in _ORIENTATION_TRANSPOSE:
+            thumbnail = thumbnail.transpose(_ORIENTATION_TRANSPOSE[orientation])
+        directory.mkdir(parents=True, exist_ok=True)
+        existing = directory / f"exif_{max(thumbnail.size)}_q{WEBP_QUALITY}.webp"
+        _write_webp(np.asarray(thumbnail), existing)
+
+    with Image.open(existing) as derivative:
+        width, height = derivative.size
+    return {
+        "url": f"{DERIVATIVES_URL_PREFIX}/{sha256}/{existing.name}",
+        "width": width,
+        "height": height
+    }
+
+def _write_webp(image, path: Path):
+    # Written beside the target and renamed, so a reader never sees a partial file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            Image.fromarray(image).save(f, format="WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Bulk Face Enrollment for Elmowafiplatform
+Enrolls a folder of family photos (<folder>/<member_id>/<photo>) or a CSV of member_id,image_path pairs
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.facial_recognition_trainer import face_trainer, collect_enrollment_samples
+
+
+def print_progress(progress):
+    """Print one line per processed image"""
+    status = progress["error"] or f"{progress['faces']} face(s)"
+    print(f"[{progress['completed']}/{progress['total']}] {progress['image_path']}: {status}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll family member faces in bulk")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--folder", help="Folder with one sub-folder of photos per family member id")
+    source.add_argument("--pairs", help="CSV file of member_id,image_path rows")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--verified", action="store_true", help="Mark the samples as verified")
+    args = parser.parse_args()
+
+    if args.folder:
+        samples = collect_enrollment_samples(args.folder)
+    else:
+        with open(args.pairs, newline="") as f:
+            samples = [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2]
+
+    if not samples:
+        parser.error("No photos to enroll")
+
+    result = face_trainer.bulk_enroll(samples, verified=args.verified, max_workers=args.workers,
+                                      progress_callback=print_progress)
+    print(json.dumps(result, indent=2, default=str))
+    return 0 if result.get("success") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Face Encoder for Elmowafiplatform
+Face detection and encoding on their own, without the trainer's classifier, encoding store or database,
+so bulk-enrollment worker processes can build one cheaply
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from backend.image_loader import load_image, load_image_with_size
+except ImportError:
+    from image_loader import load_image, load_image_with_size
+
+try:
+    import face_recognition
+    FACE_RECOGNITION_AVAILABLE = True
+except ImportError:
+    FACE_RECOGNITION_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class FaceEncoder:
+    """HOG detection on downscaled copies of a photo, then encodings from full-resolution crops"""
+
+    def __init__(self, detection_mode: Optional[str] = None, detection_sizes: Optional[List[int]] = None,
+                 decode_max_dimension: Optional[int] = None, full_resolution_fallback: Optional[int] = None):
+        # Face detection: "downscaled" finds faces on a smaller copy, trying each size in turn until
+        # faces are found; "full" runs HOG on the full-resolution image
+        self.detection_mode = (detection_mode or os.getenv("FACE_DETECTION_MODE", "downscaled")).lower()
+        if detection_sizes is None:
+            detection_sizes = [int(size) for size in os.getenv("FACE_DETECTION_SIZES", "1024,2048").split(",") if size.strip()]
+        self.detection_sizes = detection_sizes
+        if decode_max_dimension is None:
+            # Photos are never searched above the largest detection size, so they need not be decoded above it either
+            default_decode = max(self.detection_sizes) if self.detection_mode == "downscaled" and self.detection_sizes else 0
+            decode_max_dimension = int(os.getenv("FACE_DECODE_MAX_DIMENSION", str(default_decode)))
+        self.decode_max_dimension = decode_max_dimension or None
+        # When the downscaled passes find nothing, photos up to this size get one full-resolution pass,
+        # so small faces in large photos are not lost; 0 disables the fallback
+        if full_resolution_fallback is None:
+            full_resolution_fallback = int(os.getenv("FACE_DETECTION_FALLBACK_MAX_DIMENSION", "4096"))
+        self.full_resolution_fallback = full_resolution_fallback
+
+    def settings(self) -> Dict[str, Any]:
+        """Constructor arguments that rebuild this encoder in another process"""
+        return {
+            "detection_mode": self.detection_mode,
+            "detection_sizes": list(self.detection_sizes),
+            "decode_max_dimension": self.decode_max_dimension or 0,
+            "full_resolution_fallback": self.full_resolution_fallback
+        }
+
+    def read_encodings(self, image_path: str) -> List[np.ndarray]:
+        """Decode an image and extract its face encodings; unreadable images raise"""
+        if not FACE_RECOGNITION_AVAILABLE:
+            return []
+
+        # Load image upright, at reduced size when the JPEG decoder can do it directly
+        image, (width, height) = load_image_with_size(image_path, self.decode_max_dimension, rgb=True)
+        encodings = self.encodings_from_array(image)
+
+        original = max(width, height)
+        if (not encodings and self.detection_mode == "downscaled" and max(image.shape[:2]) < original
+                and original <= self.full_resolution_fallback):
+            # Nothing at reduced size: decode the photo in full and search it once more
+            image = load_image(image_path, rgb=True)
+            encodings = self.encodings_from_array(image, self.detect_face_locations(image, []))
+        return encodings
+
+    def encodings_from_array(self, image: np.ndarray, face_locations: Optional[List[Tuple[int, int, int, int]]] = None,
+                             bgr: bool = False) -> List[np.ndarray]:
+        """Extract face encodings from an already-decoded image, optionally at known (top, right, bottom, left) boxes"""
+        if not FACE_RECOGNITION_AVAILABLE:
+            return []
+
+        if bgr:
+            # OpenCV decodes to BGR; dlib expects RGB
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        # Find face locations unless the caller already has them
+        if face_locations is None:
+            sizes = self.detection_sizes if self.detection_mode == "downscaled" else []
+            face_locations = self.detect_face_locations(image, sizes)
+
+        if not face_locations:
+            return []
+
+        # Extract face encodings from full-resolution crops around each face
+        return self.encode_face_regions(image, face_locations)
+
+    def detect_face_locations(self, image: np.ndarray, sizes: List[int]) -> List[Tuple[int, int, int, int]]:
+        """Run HOG detection on downscaled copies and map the boxes back to full resolution"""
+        height, width = image.shape[:2]
+        longest = max(height, width)
+
+        if not sizes:
+            return face_recognition.face_locations(image, model="hog")
+
+        for size in sizes:
+            if size >= longest:
+                # Small enough to search at full resolution
+                return face_recognition.face_locations(image, model="hog")
+
+            scale = size / longest
+            small = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+            locations = face_recognition.face_locations(small, model="hog")
+
+            if locations:
+                return [(
+                    max(0, int(top / scale)),
+                    min(width, int(right / scale)),
+                    min(height, int(bottom / scale)),
+                    max(0, int(left / scale))
+                ) for top, right, bottom, left in locations]
+
+        if longest <= self.full_resolution_fallback:
+            # Faces too small to survive the downscaling; one full-resolution pass preserves recall
+            return face_recognition.face_locations(image, model="hog")
+        return []
+
+    def encode_face_regions(self, image: np.ndarray, face_locations: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
+        """Encode each face from a padded full-resolution crop instead of the whole image"""
+        height, width = image.shape[:2]
+        encodings = []
+
+        for top, right, bottom, left in face_locations:
+            # The landmark model needs some context around the detected box
+            margin = max(bottom - top, right - left) // 4
+            y0, y1 = max(0, top - margin), min(height, bottom + margin)
+            x0, x1 = max(0, left - margin), min(width, right + margin)
+
+            region = np.ascontiguousarray(image[y0:y1, x0:x1])
+            encodings.extend(face_recognition.face_encodings(region, [(top - y0, right - x0, bottom - y0, left - x0)]))
+
+        return encodings
+
+# Set in bulk-enrollment worker processes by init_worker
+_worker_encoder: Optional[FaceEncoder] = None
+
+def init_worker(settings: Dict[str, Any]):
+    """Process-pool initializer: build the encoder each worker uses, with the parent's settings"""
+    global _worker_encoder
+    _worker_encoder = FaceEncoder(**settings)
+
+def extract_encodings_worker(image_path: str) -> Tuple[str, List[np.ndarray], Optional[str]]:
+    """Process-pool entry point for bulk enrollment"""
+    try:
+        return image_path, _worker_encoder.read_encodings(image_path), None
+    except Exception as e:
+        return image_path, [], str(e)
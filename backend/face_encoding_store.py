@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Face Encoding Store for Elmowafiplatform
+Keeps face encodings in an append-only float32 .npy matrix shared between workers through the OS page cache
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Tuple, Any
+import logging
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+# fcntl is POSIX-only; on Windows only one worker should write to the store
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REMOVED_LABEL = -1
+
+class FaceEncodingStore:
+    """Append-only face encoding matrix with label and metadata arrays
+
+    Layout of ``store_dir``:
+        encodings.npy  float32 (capacity, dim) matrix, rows [0, count) are valid
+        labels.npy     int32 (capacity,) index into ``members``; -1 marks removed rows
+        added_at.npy   float64 (capacity,) unix timestamp of each row
+        meta.json      count, capacity, dim and the member id list
+    """
+
+    def __init__(self, store_dir: str, dim: int = 128, initial_capacity: int = 1024):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+
+        self.encodings_path = self.store_dir / "encodings.npy"
+        self.labels_path = self.store_dir / "labels.npy"
+        self.added_at_path = self.store_dir / "added_at.npy"
+        self.meta_path = self.store_dir / "meta.json"
+        self.lock_path = self.store_dir / ".lock"
+
+        self.count = 0
+        self.capacity = 0
+        self.generation = 0  # bumped when compaction moves rows
+        self.members: List[str] = []
+        self._member_index: Dict[str, int] = {}
+
+        self._encodings = None
+        self._labels = None
+        self._added_at = None
+        self._meta_version = None
+        self._lock = threading.RLock()
+
+        self.refresh()
+
+    # ---- loading -------------------------------------------------------------------
+
+    def refresh(self):
+        """Re-open the memmaps if another worker has written since we last looked"""
+        with self._lock:
+            try:
+                stat = self.meta_path.stat()
+            except FileNotFoundError:
+                return
+
+            # meta.json is replaced on every write, so the inode changes even when mtime is coarse
+            version = (stat.st_ino, stat.st_mtime_ns)
+            if version == self._meta_version:
+                return
+
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+
+            self.dim = meta["dim"]
+            self.count = meta["count"]
+            self.capacity = meta["capacity"]
+            self.generation = meta.get("generation", 0)
+            self.members = meta["members"]
+            self._member_index = {member_id: i for i, member_id in enumerate(self.members)}
+
+            # Read-only maps: pages are shared with every other worker through the page cache
+            self._encodings = np.load(self.encodings_path, mmap_mode="r")
+            self._labels = np.load(self.labels_path, mmap_mode="r")
+            self._added_at = np.load(self.added_at_path, mmap_mode="r")
+            self._meta_version = version
+
+    def _write_meta(self):
+        """Atomically publish count, capacity and members"""
+        temp_path = self.meta_path.with_suffix(".json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": 1,
+                "dim": self.dim,
+                "count": self.count,
+                "capacity": self.capacity,
+                "generation": self.generation,
+                "members": self.members,
+                "updated_at": datetime.now().isoformat()
+            }, f)
+        os.replace(temp_path, self.meta_path)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers within this process and, where supported, across processes"""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                self.refresh()
+                yield
+                return
+
+            with open(self.lock_path, "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self.refresh()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---- writes --------------------------------------------------------------------
+
+    def _ensure_capacity(self, needed: int):
+        """Grow the backing files by doubling; existing rows are copied once per growth"""
+        if needed <= self.capacity:
+            return
+
+        new_capacity = max(self.initial_capacity, self.capacity * 2, needed)
+        for path, dtype, shape in (
+            (self.encodings_path, np.float32, (new_capacity, self.dim)),
+            (self.labels_path, np.int32, (new_capacity,)),
+            (self.added_at_path, np.float64, (new_capacity,)),
+        ):
+            temp_path = path.with_suffix(".npy.tmp")
+            grown = open_memmap(temp_path, mode="w+", dtype=dtype, shape=shape)
+            if self.count:
+                grown[:self.count] = np.load(path, mmap_mode="r")[:self.count]
+            grown.flush()
+            del grown
+            os.replace(temp_path, path)
+
+        self.capacity = new_capacity
+        logger.info(f"Face encoding store grown to {new_capacity} rows")
+
+    def append(self, member_id: str, encodings: List[np.ndarray]) -> int:
+        """Append encodings for a family member and return how many rows were written"""
+        if len(encodings) == 0:
+            return 0
+
+        rows = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+
+        with self._write_lock():
+            if member_id not in self._member_index:
+                self._member_index[member_id] = len(self.members)
+                self.members.append(member_id)
+
+            start = self.count
+            end = start + len(rows)
+            self._ensure_capacity(end)
+
+            encodings_map = np.load(self.encodings_path, mmap_mode="r+")
+            labels_map = np.load(self.labels_path, mmap_mode="r+")
+            added_at_map = np.load(self.added_at_path, mmap_mode="r+")
+
+            encodings_map[start:end] = rows
+            labels_map[start:end] = self._member_index[member_id]
+            added_at_map[start:end] = datetime.now().timestamp()
+
+            for mapped in (encodings_map, labels_map, added_at_map):
+                mapped.flush()
+
+            # Publishing the new count makes the rows visible to readers
+            self.count = end
+            self._write_meta()
+            self._meta_version = None
+            self.refresh()
+
+        return len(rows)
+
+    def remove_member(self, member_id: str) -> int:
+        """Tombstone every row of a family member and return how many were removed"""
+        with self._write_lock():
+            member_index = self._member_index.get(member_id)
+            if member_index is None or self.count == 0:
+                return 0
+
+            labels_map = np.load(self.labels_path, mmap_mode="r+")
+            removed = labels_map[:self.count] == member_index
+            removed_count = int(removed.sum())
+            labels_map[:self.count][removed] = REMOVED_LABEL
+            labels_map.flush()
+
+            self._write_meta()
+            self._meta_version = None
+            self.refresh()
+
+        if removed_count and self.removed_count() > self.count // 2:
+            self.compact()
+
+        return removed_count
+
+    def compact(self):
+        """Rewrite the store without tombstoned rows"""
+        with self._write_lock():
+            if self.count == 0:
+                return
+
+            keep = np.asarray(self._labels[:self.count]) != REMOVED_LABEL
+            encodings = np.asarray(self._encodings[:self.count])[keep]
+            labels = np.asarray(self._labels[:self.count])[keep]
+            added_at = np.asarray(self._added_at[:self.count])[keep]
+
+            self.count = 0
+            self.capacity = 0
+            self._ensure_capacity(max(len(labels), 1))
+
+            for path, values in ((self.encodings_path, encodings),
+                                 (self.labels_path, labels),
+                                 (self.added_at_path, added_at)):
+                mapped = np.load(path, mmap_mode="r+")
+                mapped[:len(values)] = values
+                mapped.flush()
+
+            self.count = len(labels)
+            self.generation += 1
+            self._write_meta()
+            self._meta_version = None
+            self.refresh()
+
+        logger.info(f"Compacted face encoding store to {self.count} rows")
+
+    def import_legacy(self, face_encodings: Dict[str, List[np.ndarray]]) -> int:
+        """Import the old pickled dict-of-lists format"""
+        imported = 0
+        for member_id, encodings in face_encodings.items():
+            imported += self.append(member_id, encodings)
+        return imported
+
+    # ---- reads ---------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        self.refresh()
+        return self.count - self.removed_count()
+
+    def matrix(self) -> np.ndarray:
+        """Read-only view of all rows, including tombstoned ones"""
+        self.refresh()
+        if self._encodings is None:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return self._encodings[:self.count]
+
+    def labels(self) -> np.ndarray:
+        """Read-only view of the member index for each row"""
+        self.refresh()
+        if self._labels is None:
+            return np.empty((0,), dtype=np.int32)
+        return self._labels[:self.count]
+
+    def removed_count(self) -> int:
+        """Number of tombstoned rows"""
+        if self._labels is None:
+            return 0
+        return int(np.count_nonzero(self._labels[:self.count] == REMOVED_LABEL))
+
+    def member_counts(self) -> Dict[str, int]:
+        """Number of live encodings per family member"""
+        labels = self.labels()
+        live = labels[labels != REMOVED_LABEL]
+        counts = np.bincount(live, minlength=len(self.members)) if len(live) else np.zeros(len(self.members), dtype=int)
+        return {member_id: int(count) for member_id, count in zip(self.members, counts) if count > 0}
+
+    def count_for(self, member_id: str) -> int:
+        """Number of live encodings for one family member"""
+        self.refresh()
+        member_index = self._member_index.get(member_id)
+        if member_index is None or self._labels is None:
+            return 0
+        return int(np.count_nonzero(self._labels[:self.count] == member_index))
+
+    def encodings_for(self, member_id: str) -> np.ndarray:
+        """Copy of the encodings for one family member"""
+        self.refresh()
+        member_index = self._member_index.get(member_id)
+        if member_index is None or self._labels is None:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.asarray(self._encodings[:self.count][self._labels[:self.count] == member_index])
+
+    def training_data(self, min_samples: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Encodings and member ids for everyone with at least ``min_samples`` rows"""
+        self.refresh()
+        if self._labels is None or self.count == 0:
+            return np.empty((0, self.dim), dtype=np.float32), np.empty((0,), dtype=object)
+
+        labels = np.asarray(self._labels[:self.count])
+        live = labels != REMOVED_LABEL
+        counts = np.bincount(labels[live], minlength=len(self.members))
+        eligible = np.flatnonzero(counts >= min_samples)
+
+        mask = np.isin(labels, eligible)
+        member_ids = np.asarray(self.members, dtype=object)
+        return np.asarray(self._encodings[:self.count][mask]), member_ids[labels[mask]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Store size information for health endpoints"""
+        self.refresh()
+        return {
+            "rows": self.count,
+            "removed_rows": self.removed_count(),
+            "capacity": self.capacity,
+            "members": len(self.member_counts()),
+            "dim": self.dim,
+            "bytes_on_disk": self.capacity * self.dim * 4
+        }
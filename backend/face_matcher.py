@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Nearest-Neighbour Face Matcher for Elmowafiplatform
+Open-set k-NN matching over the face encoding store; faces far from every known person are reported as unknown
+"""
+
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+import numpy as np
+
+try:
+    from backend.face_encoding_store import FaceEncodingStore, REMOVED_LABEL
+except ImportError:
+    from face_encoding_store import FaceEncodingStore, REMOVED_LABEL
+
+logger = logging.getLogger(__name__)
+
+class NearestNeighbourMatcher:
+    """k-NN matcher with a distance threshold for unknown faces
+
+    New people are recognisable as soon as their first encoding is stored; there is no training step.
+    With ``centroid_candidates`` set, each face is only compared against the encodings of the
+    ``centroid_candidates`` people whose mean encoding is closest, which keeps large families fast.
+    """
+
+    def __init__(self, store: FaceEncodingStore, k: int = 3, distance_threshold: float = 0.6,
+                 centroid_candidates: int = 0):
+        self.store = store
+        self.k = k
+        self.distance_threshold = distance_threshold  # face_recognition's default tolerance
+        self.centroid_candidates = centroid_candidates
+
+        # Squared norms and centroids are cached and only extended as the store grows
+        self._index_key = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _get_index(self) -> Optional[Dict[str, Any]]:
+        """Return encodings, labels, squared norms and centroids for the current store contents"""
+        matrix = self.store.matrix()
+        labels = np.asarray(self.store.labels())
+        count = min(len(matrix), len(labels))
+        matrix, labels = matrix[:count], labels[:count]
+        key = (self.store.generation, count, int(np.count_nonzero(labels == REMOVED_LABEL)))
+
+        with self._lock:
+            if key == self._index_key:
+                return self._index if self._index["live"].any() else None
+
+            previous = self._index
+            if (previous is not None and self._index_key[0] == key[0]
+                    and len(previous["norms"]) <= count):
+                # Append-only store: only the new rows need their norms computed
+                tail = np.asarray(matrix[len(previous["norms"]):], dtype=np.float32)
+                norms = np.concatenate([previous["norms"], np.einsum("ij,ij->i", tail, tail)])
+            else:
+                dense = np.asarray(matrix, dtype=np.float32)
+                norms = np.einsum("ij,ij->i", dense, dense)
+
+            live = labels != REMOVED_LABEL
+            index = {
+                "matrix": matrix,
+                "labels": labels,
+                "live": live,
+                "norms": norms,
+                "members": list(self.store.members)
+            }
+            if self.centroid_candidates > 0 and live.any():
+                index["centroid_labels"], index["centroids"] = self._compute_centroids(matrix, labels, live)
+
+            self._index_key = key
+            self._index = index
+            return index if live.any() else None
+
+    def _compute_centroids(self, matrix: np.ndarray, labels: np.ndarray, live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean encoding per person"""
+        live_labels = labels[live]
+        members = np.unique(live_labels)
+        positions = np.searchsorted(members, live_labels)
+
+        sums = np.zeros((len(members), matrix.shape[1]), dtype=np.float64)
+        np.add.at(sums, positions, np.asarray(matrix[live], dtype=np.float64))
+        counts = np.bincount(positions, minlength=len(members))
+        return members, (sums / counts[:, None]).astype(np.float32)
+
+    def match(self, encodings: np.ndarray) -> List[Dict[str, Any]]:
+        """Match a matrix of face encodings against every stored encoding"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.store.dim)
+        index = self._get_index()
+
+        if index is None:
+            return [self._unknown(None) for _ in range(len(queries))]
+
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+
+        if self.centroid_candidates > 0 and len(index["centroid_labels"]) > self.centroid_candidates:
+            return [self._match_pruned(query, query_norm, index) for query, query_norm in zip(queries, query_norms)]
+
+        # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x for every query/encoding pair in one matrix product
+        squared = query_norms[:, None] + index["norms"][None, :] - 2.0 * (queries @ np.asarray(index["matrix"]).T)
+        squared[:, ~index["live"]] = np.inf
+        distances = np.sqrt(np.maximum(squared, 0.0))
+
+        return [self._decide(row, index["labels"], index["members"]) for row in distances]
+
+    def _match_pruned(self, query: np.ndarray, query_norm: float, index: Dict[str, Any]) -> Dict[str, Any]:
+        """Compare against the encodings of the nearest centroids only"""
+        centroid_distances = np.linalg.norm(index["centroids"] - query, axis=1)
+        nearest = np.argpartition(centroid_distances, self.centroid_candidates - 1)[:self.centroid_candidates]
+        candidates = index["centroid_labels"][nearest]
+
+        rows = np.flatnonzero(np.isin(index["labels"], candidates))
+        candidate_matrix = np.asarray(index["matrix"][rows])
+        squared = query_norm + index["norms"][rows] - 2.0 * (candidate_matrix @ query)
+        distances = np.sqrt(np.maximum(squared, 0.0))
+
+        return self._decide(distances, index["labels"][rows], index["members"])
+
+    def _decide(self, distances: np.ndarray, labels: np.ndarray, members: List[str]) -> Dict[str, Any]:
+        """Distance-weighted vote among the k nearest encodings within the threshold"""
+        k = min(self.k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        best_distance = float(distances[nearest[0]])
+        if not np.isfinite(best_distance) or best_distance > self.distance_threshold:
+            return self._unknown(best_distance if np.isfinite(best_distance) else None)
+
+        votes: Dict[int, float] = {}
+        closest: Dict[int, float] = {}
+        for row in nearest:
+            distance = float(distances[row])
+            if distance > self.distance_threshold:
+                break
+            label = int(labels[row])
+            votes[label] = votes.get(label, 0.0) + 1.0 / (distance + 1e-6)
+            closest.setdefault(label, distance)
+
+        winner = max(votes, key=votes.get)
+        vote_share = votes[winner] / sum(votes.values())
+
+        return {
+            "family_member_id": members[winner],
+            "confidence": float(vote_share * (1.0 - closest[winner])),
+            "distance": closest[winner],
+            "all_distances": {members[label]: distance for label, distance in closest.items()},
+            "matcher": "knn"
+        }
+
+    def _unknown(self, distance: Optional[float]) -> Dict[str, Any]:
+        """Result for a face that is not close enough to anyone"""
+        return {
+            "family_member_id": None,
+            "confidence": 0.0,
+            "distance": distance,
+            "all_distances": {},
+            "matcher": "knn"
+        }
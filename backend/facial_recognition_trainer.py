@@ -5,13 +5,17 @@ Learns family member faces from uploaded photos and improves recognition accurac
 """
 
 import os
-import cv2
 import numpy as np
 import json
 import pickle
+import hashlib
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Callable
 import logging
 from sklearn.svm import SVC
 from sklearn.preprocessing import LabelEncoder
@@ -19,16 +23,151 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import sqlite3
 
-# Optional face recognition import
+# Imported both as backend.facial_recognition_trainer and from inside backend/
 try:
-    import face_recognition
-    FACE_RECOGNITION_AVAILABLE = True
+    from backend.face_encoding_store import FaceEncodingStore
+    from backend.face_matcher import NearestNeighbourMatcher
+    from backend.analysis_cache import analysis_cache
+    from backend.image_context import file_sha256
+    from backend.face_encoder import (FaceEncoder, FACE_RECOGNITION_AVAILABLE, init_worker as init_encoder_worker,
+                                      extract_encodings_worker)
 except ImportError:
+    from face_encoding_store import FaceEncodingStore
+    from face_matcher import NearestNeighbourMatcher
+    from analysis_cache import analysis_cache
+    from image_context import file_sha256
+    from face_encoder import (FaceEncoder, FACE_RECOGNITION_AVAILABLE, init_worker as init_encoder_worker,
+                              extract_encodings_worker)
+
+# face_recognition itself is only used through FaceEncoder
+if not FACE_RECOGNITION_AVAILABLE:
     print("Warning: face_recognition module not found. Facial recognition features will be limited.")
-    FACE_RECOGNITION_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+def collect_enrollment_samples(folder: str) -> List[Tuple[str, str]]:
+    """Find (family_member_id, image_path) pairs in a folder laid out as <folder>/<member_id>/<photo>"""
+    samples = []
+    for member_dir in sorted(Path(folder).iterdir()):
+        if not member_dir.is_dir():
+            continue
+        for image_path in sorted(member_dir.rglob("*")):
+            if image_path.suffix.lower() in IMAGE_EXTENSIONS:
+                samples.append((member_dir.name, str(image_path)))
+    return samples
+
+class RetrainScheduler:
+    """Coalesces training sample additions into debounced background retrains"""
+    
+    def __init__(self, trainer: "FamilyFaceTrainer", interval_seconds: float = 30.0, min_new_samples: int = 20):
+        self.trainer = trainer
+        self.interval_seconds = interval_seconds  # Max delay after the first pending sample
+        self.min_new_samples = min_new_samples  # Retrain early once this many samples are pending
+        
+        self.pending_samples = 0
+        self.first_pending_at = None
+        self.last_result = None
+        self.last_trained_at = None
+        self.retrain_count = 0
+        
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+    
+    def notify_samples_added(self, count: int = 1):
+        """Record new samples and wake the retraining thread"""
+        with self._condition:
+            if self.pending_samples == 0:
+                self.first_pending_at = time.monotonic()
+            self.pending_samples += count
+            self._ensure_started()
+            self._condition.notify()
+    
+    def _ensure_started(self):
+        """Start the background thread on first use"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="face-retrain-scheduler", daemon=True)
+            self._thread.start()
+    
+    def _take_pending(self) -> int:
+        """Reset the pending counter and return how many samples were coalesced"""
+        batch = self.pending_samples
+        self.pending_samples = 0
+        self.first_pending_at = None
+        return batch
+    
+    def _run(self):
+        """Wait until a retrain is due, then train outside the lock"""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self.pending_samples == 0:
+                        self._condition.wait()
+                        continue
+                    
+                    if self.pending_samples >= self.min_new_samples:
+                        break
+                    
+                    remaining = self.interval_seconds - (time.monotonic() - self.first_pending_at)
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                
+                if self._stopped:
+                    return
+                
+                batch = self._take_pending()
+            
+            self._retrain(batch)
+    
+    def _retrain(self, batch: int) -> Dict[str, Any]:
+        """Retrain the classifier for a coalesced batch of samples"""
+        logger.info(f"Retraining face classifier for {batch} new sample(s)")
+        result = self.trainer.train_classifier()
+        
+        self.last_result = result
+        self.last_trained_at = datetime.now().isoformat()
+        self.retrain_count += 1
+        return result
+    
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Retrain immediately if samples are pending"""
+        with self._condition:
+            if self.pending_samples == 0:
+                return None
+            batch = self._take_pending()
+        
+        return self._retrain(batch)
+    
+    def stop(self, flush: bool = True):
+        """Stop the background thread, optionally training any pending samples first"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        
+        if flush:
+            self.flush()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get scheduler state for health and admin endpoints"""
+        with self._condition:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "pending_samples": self.pending_samples,
+                "interval_seconds": self.interval_seconds,
+                "min_new_samples": self.min_new_samples,
+                "retrain_count": self.retrain_count,
+                "last_trained_at": self.last_trained_at,
+                "last_result": self.last_result
+            }
+
 class FamilyFaceTrainer:
     """Advanced facial recognition training system for family members"""
     
@@ -38,15 +177,41 @@ class FamilyFaceTrainer:
         self.model_dir.mkdir(parents=True, exist_ok=True)
         
         # Face recognition models
-        self.face_encodings = {}  # family_member_id -> list of encodings
+        self.encoding_store = FaceEncodingStore(self.model_dir / "encodings")  # memory-mapped, shared across workers
         self.face_classifier = None
         self.label_encoder = LabelEncoder()
+        self.member_labels = None  # classifier column -> family_member_id
+        self._model_version = "svc:none"  # changes whenever a different classifier is swapped in
+        
+        # Guards the classifier/label encoder pair
+        self._lock = threading.RLock()
+        self._training_lock = threading.Lock()
         
         # Training parameters
         self.confidence_threshold = 0.6
         self.min_samples_per_person = 3
         self.max_samples_per_person = 50
         
+        # Detection and encoding; bulk-enrollment workers rebuild just this from its settings
+        self.encoder = FaceEncoder()
+        
+        # Matcher: "svc" (trained classifier) or "knn" (open-set nearest neighbour, no training step)
+        self.matcher = os.getenv("FACE_MATCHER", "svc").lower()
+        self.nn_matcher = NearestNeighbourMatcher(
+            self.encoding_store,
+            k=int(os.getenv("FACE_KNN_K", "3")),
+            distance_threshold=float(os.getenv("FACE_KNN_DISTANCE_THRESHOLD", "0.6")),
+            centroid_candidates=int(os.getenv("FACE_KNN_CENTROID_CANDIDATES", "0"))
+        )
+        
+        # Background retraining
+        self.background_retraining = os.getenv("FACE_BACKGROUND_RETRAINING", "true").lower() == "true"
+        self.retrain_scheduler = RetrainScheduler(
+            self,
+            interval_seconds=float(os.getenv("FACE_RETRAIN_INTERVAL_SECONDS", "30")),
+            min_new_samples=int(os.getenv("FACE_RETRAIN_MIN_NEW_SAMPLES", "20"))
+        )
+        
         # Load existing models
         self.load_trained_models()
     
@@ -57,19 +222,12 @@ class FamilyFaceTrainer:
             return []
             
         try:
-            # Load image
-            image = face_recognition.load_image_file(image_path)
+            face_encodings = self._read_face_encodings(image_path)
             
-            # Find face locations
-            face_locations = face_recognition.face_locations(image, model="hog")
-            
-            if not face_locations:
+            if not face_encodings:
                 logger.warning(f"No faces found in {image_path}")
                 return []
             
-            # Extract face encodings
-            face_encodings = face_recognition.face_encodings(image, face_locations)
-            
             logger.info(f"Extracted {len(face_encodings)} face encodings from {image_path}")
             return face_encodings
             
@@ -77,6 +235,21 @@ class FamilyFaceTrainer:
             logger.error(f"Error extracting face encodings from {image_path}: {e}")
             return []
     
+    def _read_face_encodings(self, image_path: str) -> List[np.ndarray]:
+        """Decode an image and extract its face encodings; unreadable images raise"""
+        return self.encoder.read_encodings(image_path)
+    
+    def extract_face_encodings_array(self, image: np.ndarray, face_locations: Optional[List[Tuple[int, int, int, int]]] = None,
+                                     bgr: bool = False) -> List[np.ndarray]:
+        """Extract face encodings from an already-decoded image, optionally at known (top, right, bottom, left) boxes"""
+        return self.encoder.encodings_from_array(image, face_locations, bgr=bgr)
+    
+    def _detect_face_locations(self, image: np.ndarray, sizes: List[int]) -> List[Tuple[int, int, int, int]]:
+        return self.encoder.detect_face_locations(image, sizes)
+    
+    def _encode_face_regions(self, image: np.ndarray, face_locations: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
+        return self.encoder.encode_face_regions(image, face_locations)
+    
     def add_training_sample(self, family_member_id: str, image_path: str, verified: bool = False) -> Dict[str, Any]:
         """Add a training sample for a family member"""
         if not FACE_RECOGNITION_AVAILABLE:
@@ -97,28 +270,36 @@ class FamilyFaceTrainer:
                     "encodings_extracted": 0
                 }
             
-            # Initialize if first sample for this person
-            if family_member_id not in self.face_encodings:
-                self.face_encodings[family_member_id] = []
-            
-            # Add new encodings (limit per person)
-            current_count = len(self.face_encodings[family_member_id])
-            new_encodings = encodings[:max(0, self.max_samples_per_person - current_count)]
-            
-            self.face_encodings[family_member_id].extend(new_encodings)
+            with self._lock:
+                # Add new encodings (limit per person); the store only appends the new rows
+                current_count = self.encoding_store.count_for(family_member_id)
+                new_encodings = encodings[:max(0, self.max_samples_per_person - current_count)]
+                
+                self.encoding_store.append(family_member_id, new_encodings)
+                total_samples = current_count + len(new_encodings)
             
             # Store training sample in database
             self._store_training_sample(family_member_id, image_path, len(new_encodings), verified)
             
-            # Retrain model if we have enough samples
-            if current_count >= self.min_samples_per_person:
-                self.train_classifier()
+            # Retrain model if we have enough samples; in the background this is
+            # coalesced so bulk tagging triggers one retrain instead of one per photo.
+            # The k-NN matcher reads the store directly and never needs retraining.
+            should_retrain = (self.matcher == "svc" and current_count >= self.min_samples_per_person
+                              and len(new_encodings) > 0)
+            model_retrained = False
+            if should_retrain:
+                if self.background_retraining:
+                    self.retrain_scheduler.notify_samples_added(len(new_encodings))
+                else:
+                    self.train_classifier()
+                    model_retrained = True
             
             return {
                 "success": True,
                 "encodings_extracted": len(new_encodings),
-                "total_samples": len(self.face_encodings[family_member_id]),
-                "model_retrained": current_count >= self.min_samples_per_person
+                "total_samples": total_samples,
+                "model_retrained": model_retrained,
+                "retrain_scheduled": should_retrain and self.background_retraining
             }
             
         except Exception as e:
@@ -129,18 +310,102 @@ class FamilyFaceTrainer:
                 "encodings_extracted": 0
             }
     
+    def bulk_enroll(self, samples: List[Tuple[str, str]], verified: bool = False, max_workers: Optional[int] = None,
+                    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Enroll many (family_member_id, image_path) pairs, extracting encodings across a process pool"""
+        if not FACE_RECOGNITION_AVAILABLE:
+            return {
+                "success": False,
+                "message": "Face recognition library not available",
+                "encodings_added": 0
+            }
+        
+        try:
+            # A group photo tagged with several members is only decoded once
+            members_by_path: Dict[str, List[str]] = {}
+            for family_member_id, image_path in samples:
+                members_by_path.setdefault(image_path, []).append(family_member_id)
+            
+            member_ids = {family_member_id for family_member_id, _ in samples}
+            counts = {member_id: self.encoding_store.count_for(member_id) for member_id in member_ids}
+            new_encodings: Dict[str, List[np.ndarray]] = {member_id: [] for member_id in member_ids}
+            sample_rows = []
+            failed = []
+            completed = 0
+            
+            workers = max(1, min(max_workers or os.cpu_count() or 1, len(members_by_path)))
+            # spawn: forking a threaded web server process is unsafe
+            context = multiprocessing.get_context(os.getenv("FACE_ENROLL_START_METHOD", "spawn"))
+            
+            # Workers build only a FaceEncoder, not a trainer with its classifier and encoding store
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_encoder_worker,
+                                     initargs=(self.encoder.settings(),)) as executor:
+                futures = [executor.submit(extract_encodings_worker, path) for path in members_by_path]
+                
+                for future in as_completed(futures):
+                    image_path, encodings, error = future.result()
+                    completed += 1
+                    
+                    if error or not encodings:
+                        failed.append({"image_path": image_path, "error": error or "No faces found in image"})
+                    else:
+                        for family_member_id in members_by_path[image_path]:
+                            room = max(0, self.max_samples_per_person - counts[family_member_id])
+                            accepted = encodings[:room]
+                            new_encodings[family_member_id].extend(accepted)
+                            counts[family_member_id] += len(accepted)
+                            sample_rows.append((family_member_id, image_path, len(accepted), verified, datetime.now().isoformat()))
+                    
+                    if progress_callback:
+                        progress_callback({
+                            "completed": completed,
+                            "total": len(members_by_path),
+                            "image_path": image_path,
+                            "faces": len(encodings),
+                            "error": error
+                        })
+            
+            # One append per member and one transaction for every sample row
+            encodings_added = 0
+            for family_member_id, encodings in new_encodings.items():
+                encodings_added += self.encoding_store.append(family_member_id, encodings)
+            
+            self._store_training_samples(sample_rows)
+            
+            # A single retrain for the whole batch; the k-NN matcher needs none
+            training_result = None
+            if self.matcher == "svc" and encodings_added:
+                training_result = self.train_classifier()
+            
+            logger.info(f"Bulk enrolled {encodings_added} encodings from {completed} images with {workers} workers")
+            
+            return {
+                "success": True,
+                "images_processed": completed,
+                "encodings_added": encodings_added,
+                "members": dict(counts),
+                "failed_images": failed,
+                "training_result": training_result
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in bulk enrollment: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "encodings_added": 0
+            }
+    
     def train_classifier(self) -> Dict[str, Any]:
         """Train the face recognition classifier"""
+        with self._training_lock:
+            return self._train_classifier()
+    
+    def _train_classifier(self) -> Dict[str, Any]:
+        """Train a new classifier and swap it in; the current one keeps serving meanwhile"""
         try:
-            # Prepare training data
-            X = []  # Face encodings
-            y = []  # Labels (family member IDs)
-            
-            for member_id, encodings in self.face_encodings.items():
-                if len(encodings) >= self.min_samples_per_person:
-                    for encoding in encodings:
-                        X.append(encoding)
-                        y.append(member_id)
+            # Prepare training data from a snapshot so uploads can continue
+            X, y = self.encoding_store.training_data(self.min_samples_per_person)
             
             if len(set(y)) < 2:
                 return {
@@ -149,11 +414,9 @@ class FamilyFaceTrainer:
                     "current_people": len(set(y))
                 }
             
-            X = np.array(X)
-            y = np.array(y)
-            
             # Encode labels
-            y_encoded = self.label_encoder.fit_transform(y)
+            label_encoder = LabelEncoder()
+            y_encoded = label_encoder.fit_transform(y)
             
             # Split data for validation
             X_train, X_test, y_train, y_test = train_test_split(
@@ -161,19 +424,22 @@ class FamilyFaceTrainer:
             )
             
             # Train SVM classifier
-            self.face_classifier = SVC(
+            face_classifier = SVC(
                 kernel='rbf',
                 probability=True,
                 C=1.0,
                 gamma='scale'
             )
             
-            self.face_classifier.fit(X_train, y_train)
+            face_classifier.fit(X_train, y_train)
             
             # Evaluate model
-            y_pred = self.face_classifier.predict(X_test)
+            y_pred = face_classifier.predict(X_test)
             accuracy = accuracy_score(y_test, y_pred)
             
+            # Swap the classifier and its label encoder in together
+            self._set_model(face_classifier, label_encoder)
+            
             # Save trained model
             self.save_trained_models()
             
@@ -199,47 +465,103 @@ class FamilyFaceTrainer:
     
     def identify_faces(self, image_path: str) -> List[Dict[str, Any]]:
         """Identify faces in an image using trained model"""
+        return self.identify_faces_batch([image_path])[image_path]
+    
+    def identify_faces_batch(self, image_paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Identify faces across many images with a single classifier call"""
+        try:
+            face_classifier, member_labels = self._model_snapshot()
+            
+            if self.matcher != "knn" and face_classifier is None:
+                return {path: [{
+                    "error": "No trained model available",
+                    "confidence": 0.0,
+                    "family_member_id": None
+                }] for path in image_paths}
+            
+            # Images analysed before with the same model are answered from the analysis cache
+            results = {}
+            cache_keys = {}
+            hashes = {}
+            params = {"model": self.model_version, "confidence_threshold": self.confidence_threshold,
+                      "decode_max_dimension": self.encoder.decode_max_dimension}
+            for path in image_paths:
+                try:
+                    hashes[path] = file_sha256(path)
+                except OSError:
+                    continue
+                cache_keys[path] = analysis_cache.make_key(hashes[path], "face_identification", "2", params)
+                hit, cached = analysis_cache.get(cache_keys[path])
+                if hit:
+                    results[path] = cached
+            
+            pending = [path for path in image_paths if path not in results]
+            for path in pending:
+                results[path] = []
+            
+            # Extract face encodings for every remaining image, remembering which image each row came from
+            owners = []
+            encodings = []
+            
+            for path in pending:
+                try:
+                    path_encodings = self._read_face_encodings(path) if FACE_RECOGNITION_AVAILABLE else []
+                except Exception as e:
+                    # One unreadable photo only fails its own entry
+                    logger.error(f"Error extracting face encodings from {path}: {e}")
+                    results[path] = [{"error": str(e), "confidence": 0.0, "family_member_id": None}]
+                    cache_keys.pop(path, None)
+                    continue
+                for encoding in path_encodings:
+                    owners.append(path)
+                    encodings.append(encoding)
+            
+            if encodings:
+                matches = self._match_encodings(np.vstack(encodings), face_classifier, member_labels)
+                
+                for path, match in zip(owners, matches):
+                    match["face_index"] = len(results[path])
+                    results[path].append(match)
+            
+            # Without face_recognition every image looks faceless; that is not worth remembering
+            for path in pending:
+                if path in cache_keys and FACE_RECOGNITION_AVAILABLE:
+                    analysis_cache.set(cache_keys[path], hashes[path], "face_identification", results[path])
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error identifying faces: {e}")
+            return {path: [{
+                "error": str(e),
+                "confidence": 0.0,
+                "family_member_id": None
+            }] for path in image_paths}
+    
+    def identify_faces_array(self, image: np.ndarray, face_locations: Optional[List[Tuple[int, int, int, int]]] = None,
+                             bgr: bool = False) -> List[Dict[str, Any]]:
+        """Identify faces in an already-decoded image; with face_locations, results follow their order"""
         try:
-            if self.face_classifier is None:
+            face_classifier, member_labels = self._model_snapshot()
+            
+            if self.matcher != "knn" and face_classifier is None:
                 return [{
                     "error": "No trained model available",
                     "confidence": 0.0,
                     "family_member_id": None
                 }]
             
-            # Extract face encodings from image
-            encodings = self.extract_face_encodings(image_path)
+            encodings = self.extract_face_encodings_array(image, face_locations, bgr=bgr)
             
             if not encodings:
                 return []
             
-            results = []
+            matches = self._match_encodings(np.vstack(encodings), face_classifier, member_labels)
             
-            for i, encoding in enumerate(encodings):
-                # Predict using trained classifier
-                probabilities = self.face_classifier.predict_proba([encoding])[0]
-                predicted_label = self.face_classifier.predict([encoding])[0]
-                
-                # Get confidence score
-                confidence = max(probabilities)
-                
-                # Convert back to family member ID
-                if confidence >= self.confidence_threshold:
-                    family_member_id = self.label_encoder.inverse_transform([predicted_label])[0]
-                else:
-                    family_member_id = None
-                
-                results.append({
-                    "face_index": i,
-                    "family_member_id": family_member_id,
-                    "confidence": float(confidence),
-                    "all_probabilities": {
-                        self.label_encoder.inverse_transform([j])[0]: float(prob) 
-                        for j, prob in enumerate(probabilities)
-                    }
-                })
+            for face_index, match in enumerate(matches):
+                match["face_index"] = face_index
             
-            return results
+            return matches
             
         except Exception as e:
             logger.error(f"Error identifying faces: {e}")
@@ -249,9 +571,66 @@ class FamilyFaceTrainer:
                 "family_member_id": None
             }]
     
+    def _match_encodings(self, encodings: np.ndarray, face_classifier: Any, member_labels: np.ndarray) -> List[Dict[str, Any]]:
+        """Match encodings with the configured matcher"""
+        if self.matcher == "knn":
+            return self.nn_matcher.match(encodings)
+        return self._classify_encodings(encodings, face_classifier, member_labels)
+    
+    def _classify_encodings(self, encodings: np.ndarray, face_classifier: Any, member_labels: np.ndarray) -> List[Dict[str, Any]]:
+        """Classify a matrix of face encodings in one predict_proba call"""
+        probabilities = face_classifier.predict_proba(encodings)
+        best = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(best)), best]
+        
+        labels = member_labels.tolist()
+        matches = []
+        
+        for row, label_index, confidence in zip(probabilities.tolist(), best.tolist(), confidences.tolist()):
+            matches.append({
+                "family_member_id": labels[label_index] if confidence >= self.confidence_threshold else None,
+                "confidence": float(confidence),
+                "all_probabilities": dict(zip(labels, row))
+            })
+        
+        return matches
+    
+    def _set_model(self, face_classifier: Any, label_encoder: LabelEncoder):
+        """Swap in a classifier together with its label encoder and column-to-member lookup"""
+        member_labels = None
+        model_version = "svc:none"
+        if face_classifier is not None:
+            member_labels = np.asarray(label_encoder.classes_)[face_classifier.classes_]
+            # Identical across processes for the same trained model, unlike pickling or object ids
+            digest = hashlib.sha256(json.dumps(member_labels.tolist()).encode())
+            digest.update(np.ascontiguousarray(face_classifier.dual_coef_).tobytes())
+            digest.update(np.ascontiguousarray(face_classifier.intercept_).tobytes())
+            model_version = f"svc:{digest.hexdigest()[:16]}"
+        
+        with self._lock:
+            self.face_classifier = face_classifier
+            self.label_encoder = label_encoder
+            self.member_labels = member_labels
+            self._model_version = model_version
+    
+    @property
+    def model_version(self) -> str:
+        """Identifies what identification results currently depend on, for caching them"""
+        if self.matcher == "knn":
+            self.encoding_store.refresh()
+            return (f"knn:{self.encoding_store.generation}:{self.encoding_store.count}:"
+                    f"{self.encoding_store.removed_count()}:{self.nn_matcher.distance_threshold}")
+        with self._lock:
+            return self._model_version
+    
+    def _model_snapshot(self) -> Tuple[Any, Optional[np.ndarray]]:
+        """Take the classifier and label lookup as a consistent pair"""
+        with self._lock:
+            return self.face_classifier, self.member_labels
+    
     def get_training_suggestions(self, family_member_id: str) -> Dict[str, Any]:
         """Get suggestions for improving face recognition for a family member"""
-        current_samples = len(self.face_encodings.get(family_member_id, []))
+        current_samples = self.encoding_store.count_for(family_member_id)
         
         suggestions = []
         priority = "low"
@@ -290,18 +669,19 @@ class FamilyFaceTrainer:
     
     def analyze_training_quality(self) -> Dict[str, Any]:
         """Analyze the quality of current training data"""
+        member_counts = self.encoding_store.member_counts()
         analysis = {
-            "total_people": len(self.face_encodings),
+            "total_people": len(member_counts),
             "people_ready": 0,
             "people_need_more": 0,
             "total_samples": 0,
             "average_samples_per_person": 0,
             "model_trained": self.face_classifier is not None,
+            "matcher": self.matcher,
             "recommendations": []
         }
         
-        for member_id, encodings in self.face_encodings.items():
-            sample_count = len(encodings)
+        for member_id, sample_count in member_counts.items():
             analysis["total_samples"] += sample_count
             
             if sample_count >= self.min_samples_per_person:
@@ -312,51 +692,54 @@ class FamilyFaceTrainer:
         if analysis["total_people"] > 0:
             analysis["average_samples_per_person"] = analysis["total_samples"] / analysis["total_people"]
         
-        # Generate recommendations
-        if analysis["people_ready"] < 2:
+        # Generate recommendations; the k-NN matcher has no training step
+        if self.matcher == "svc" and analysis["people_ready"] < 2:
             analysis["recommendations"].append("Need at least 2 people with sufficient samples to train model")
         
         if analysis["people_need_more"] > 0:
             analysis["recommendations"].append(f"{analysis['people_need_more']} people need more training photos")
         
-        if not analysis["model_trained"] and analysis["people_ready"] >= 2:
+        if self.matcher == "svc" and not analysis["model_trained"] and analysis["people_ready"] >= 2:
             analysis["recommendations"].append("Ready to train face recognition model")
         
         return analysis
     
     def save_trained_models(self):
-        """Save trained models to disk"""
+        """Save trained models to disk; encodings are already persisted by the store"""
         try:
-            # Save face encodings
-            encodings_path = self.model_dir / "face_encodings.pkl"
-            with open(encodings_path, 'wb') as f:
-                pickle.dump(self.face_encodings, f)
+            with self._lock:
+                face_classifier = self.face_classifier
+                label_encoder = self.label_encoder
             
             # Save classifier
-            if self.face_classifier is not None:
+            if face_classifier is not None:
                 classifier_path = self.model_dir / "face_classifier.pkl"
-                with open(classifier_path, 'wb') as f:
-                    pickle.dump(self.face_classifier, f)
+                self._atomic_pickle_dump(face_classifier, classifier_path)
                 
                 # Save label encoder
                 encoder_path = self.model_dir / "label_encoder.pkl"
-                with open(encoder_path, 'wb') as f:
-                    pickle.dump(self.label_encoder, f)
+                self._atomic_pickle_dump(label_encoder, encoder_path)
             
             logger.info("Models saved successfully")
             
         except Exception as e:
             logger.error(f"Error saving models: {e}")
     
+    def _atomic_pickle_dump(self, obj: Any, path: Path):
+        """Pickle to a temporary file and rename it over the target so readers never see a partial file"""
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(temp_path, 'wb') as f:
+            pickle.dump(obj, f)
+        os.replace(temp_path, path)
+    
     def load_trained_models(self):
         """Load trained models from disk"""
         try:
-            # Load face encodings
-            encodings_path = self.model_dir / "face_encodings.pkl"
-            if encodings_path.exists():
-                with open(encodings_path, 'rb') as f:
-                    self.face_encodings = pickle.load(f)
-                logger.info(f"Loaded face encodings for {len(self.face_encodings)} people")
+            # Migrate encodings pickled by older versions into the store
+            legacy_path = self.model_dir / "face_encodings.pkl"
+            if legacy_path.exists():
+                self._migrate_legacy_encodings(legacy_path)
+            logger.info(f"Face encoding store has {len(self.encoding_store)} encodings")
             
             # Load classifier
             classifier_path = self.model_dir / "face_classifier.pkl"
@@ -364,21 +747,44 @@ class FamilyFaceTrainer:
             
             if classifier_path.exists() and encoder_path.exists():
                 with open(classifier_path, 'rb') as f:
-                    self.face_classifier = pickle.load(f)
+                    face_classifier = pickle.load(f)
                 
                 with open(encoder_path, 'rb') as f:
-                    self.label_encoder = pickle.load(f)
+                    label_encoder = pickle.load(f)
+                
+                self._set_model(face_classifier, label_encoder)
                 
                 logger.info("Loaded trained face recognition model")
             
         except Exception as e:
             logger.error(f"Error loading models: {e}")
             # Reset to empty state
-            self.face_encodings = {}
-            self.face_classifier = None
+            self._set_model(None, LabelEncoder())
+    
+    def _migrate_legacy_encodings(self, legacy_path: Path):
+        """Import a face_encodings.pkl dict-of-lists into the store and retire the pickle"""
+        with open(legacy_path, 'rb') as f:
+            face_encodings = pickle.load(f)
+        
+        # Only import members the store doesn't know yet, so a crash mid-migration can be rerun
+        known = self.encoding_store.member_counts()
+        imported = self.encoding_store.import_legacy(
+            {member_id: encodings for member_id, encodings in face_encodings.items() if member_id not in known}
+        )
+        os.replace(legacy_path, legacy_path.with_suffix(".pkl.migrated"))
+        logger.info(f"Migrated {imported} legacy face encodings for {len(face_encodings)} people")
     
     def _store_training_sample(self, family_member_id: str, image_path: str, encodings_count: int, verified: bool):
         """Store training sample record in database"""
+        self._store_training_samples([
+            (family_member_id, image_path, encodings_count, verified, datetime.now().isoformat())
+        ])
+    
+    def _store_training_samples(self, rows: List[Tuple[str, str, int, bool, str]]):
+        """Store training sample records in a single transaction"""
+        if not rows:
+            return
+        
         try:
             conn = sqlite3.connect(self.db_path)
             
@@ -394,18 +800,12 @@ class FamilyFaceTrainer:
                 )
             """)
             
-            # Insert training sample record
-            conn.execute("""
+            # Insert training sample records
+            conn.executemany("""
                 INSERT INTO face_training_samples 
                 (family_member_id, image_path, encodings_count, verified, created_at)
                 VALUES (?, ?, ?, ?, ?)
-            """, (
-                family_member_id,
-                image_path,
-                encodings_count,
-                verified,
-                datetime.now().isoformat()
-            ))
+            """, rows)
             
             conn.commit()
             conn.close()
@@ -482,14 +882,13 @@ class FamilyFaceTrainer:
     def remove_training_samples(self, family_member_id: str) -> bool:
         """Remove all training samples for a family member"""
         try:
-            if family_member_id in self.face_encodings:
-                del self.face_encodings[family_member_id]
-                
-                # Save updated encodings
-                self.save_trained_models()
-                
+            with self._lock:
+                removed = self.encoding_store.remove_member(family_member_id) > 0
+            
+            if removed:
                 # If we still have enough data, retrain
-                if len([m for m, e in self.face_encodings.items() if len(e) >= self.min_samples_per_person]) >= 2:
+                member_counts = self.encoding_store.member_counts()
+                if self.matcher == "svc" and len([m for m, count in member_counts.items() if count >= self.min_samples_per_person]) >= 2:
                     self.train_classifier()
                 
                 return True
@@ -31,6 +31,15 @@ except ImportError as e:
     FamilyTravelAI = None
     HACK2_AVAILABLE = False
 
+# The backend processor keeps an incremental timeline manifest and can build EXIF-only timelines
+try:
+    from backend.family_memory_processor import FamilyMemoryProcessor as TimelineProcessor
+    TIMELINE_PROCESSOR_AVAILABLE = True
+except ImportError as e:
+    logging.warning(f"Could not import timeline processor: {e}")
+    TimelineProcessor = None
+    TIMELINE_PROCESSOR_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -58,6 +67,14 @@ class FamilyAIBridge:
         else:
             self.memory_processor = None
             self.travel_ai = None
+        
+        # One instance, so its background enrichment threads outlive the request that started them
+        self.timeline_processor = None
+        if TIMELINE_PROCESSOR_AVAILABLE:
+            try:
+                self.timeline_processor = TimelineProcessor()
+            except Exception as e:
+                logger.error(f"Failed to initialize timeline processor: {e}")
     
     async def process_family_photo(self, image_path: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
         """
@@ -111,17 +128,22 @@ class FamilyAIBridge:
             logger.error(f"Error processing photo with hack2: {e}")
             return await self._fallback_photo_analysis(image_path, metadata)
     
-    async def create_family_timeline(self, photos_directory: str, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    async def create_family_timeline(self, photos_directory: str, filters: Optional[Dict] = None,
+                                     metadata_only: bool = False) -> List[Dict[str, Any]]:
         """
         Create a family memory timeline from photos directory.
         
         Args:
             photos_directory: Directory containing family photos
             filters: Optional filters for timeline creation
+            metadata_only: Build entries from EXIF headers only and analyse photos in the background
             
         Returns:
             List of processed memories in chronological order
         """
+        if metadata_only and self.timeline_processor:
+            return await self._metadata_timeline(photos_directory, filters or {})
+        
         if not self.hack2_available or not self.memory_processor:
             return await self._fallback_timeline_creation(photos_directory)
         
@@ -154,6 +176,44 @@ class FamilyAIBridge:
             logger.error(f"Error creating timeline with hack2: {e}")
             return await self._fallback_timeline_creation(photos_directory)
     
+    async def _metadata_timeline(self, photos_directory: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """EXIF-only timeline from the backend processor; entries fill in as background analysis finishes"""
+        def build():
+            entries = self.timeline_processor.create_family_timeline(photos_directory, metadata_only=True)
+            timeline = []
+            for entry in entries:
+                # Entries arrive newest first
+                if filters.get("date_to") and entry["date"][:10] > filters["date_to"]:
+                    continue
+                if filters.get("date_from") and entry["date"][:10] < filters["date_from"]:
+                    break
+                timeline.append({
+                    "id": f"memory_{entry['id']}",
+                    "title": entry["title"],
+                    "date": entry["date"],
+                    "imageUrl": f"/uploads/{Path(entry['file_path']).name}",
+                    "thumbnailUrl": (entry.get("thumbnail") or {}).get("url"),
+                    "location": entry.get("location"),
+                    "tags": entry.get("tags", []),
+                    "aiAnalysis": entry["analysis"] if entry["analysis_status"] == "complete" else None,
+                    "analysis_status": entry["analysis_status"]
+                })
+                if filters.get("limit") and len(timeline) >= filters["limit"]:
+                    break
+            return timeline
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, build)
+        except Exception as e:
+            logger.error(f"Error creating metadata-only timeline: {e}")
+            return await self._fallback_timeline_creation(photos_directory)
+    
+    def timeline_status(self, photos_directory: str) -> Dict[str, Any]:
+        """How many timeline photos still wait for background analysis"""
+        if not self.timeline_processor:
+            return {"available": False}
+        return {"available": True, **self.timeline_processor.timeline_status(photos_directory)}
+    
     async def get_memory_suggestions(self, date: str = None, family_member: str = None) -> Dict[str, Any]:
         """
         Get smart memory suggestions using hack2 AI.
@@ -6,21 +6,42 @@ Family Memory Processor for AI-powered memory analysis and management
 import os
 import json
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union, Iterator, Tuple
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import cv2
 import numpy as np
 from PIL import Image, ExifTags
 import asyncio
 
+try:
+    from backend.analysis_cache import cached_analysis
+    from backend.derivatives import exif_thumbnail, generate_derivatives
+    from backend.image_loader import DECODE_MAX_DIMENSION, load_image_with_size
+    from backend.image_context import ImageContext, file_sha256
+    from backend.timeline_manifest import TimelineManifest
+except ImportError:
+    from analysis_cache import cached_analysis
+    from derivatives import exif_thumbnail, generate_derivatives
+    from image_loader import DECODE_MAX_DIMENSION, load_image_with_size
+    from image_context import ImageContext, file_sha256
+    from timeline_manifest import TimelineManifest
+
 logger = logging.getLogger(__name__)
 
+# Threads reading EXIF headers for metadata-only timelines
+TIMELINE_EXIF_WORKERS = int(os.getenv("TIMELINE_EXIF_WORKERS", "8"))
+
 class FamilyMemoryProcessor:
     """Processes family photos and memories with AI analysis"""
     
     def __init__(self):
         self.face_cascade = None
+        self._enrichment_threads: Dict[str, threading.Thread] = {}
+        self._enrichment_lock = threading.Lock()
         self.initialize()
     
     def initialize(self):
@@ -36,23 +57,35 @@ class FamilyMemoryProcessor:
     
     def process_family_photo(self, image_path: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process a family photo with AI analysis"""
+        if not os.path.exists(image_path):
+            return {"error": "Image file not found"}
+        
+        # Cached by content, so the same photo stored under another path reports its own path
+        result = self._analyze_photo(image_path, metadata)
+        if "error" not in result:
+            result["image_path"] = image_path
+        return result
+    
+    @cached_analysis("memory_photo", "1.4", lambda self, metadata=None: {"metadata": metadata or {}})
+    def _analyze_photo(self, image_path: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Full analysis of one photo"""
         try:
-            if not os.path.exists(image_path):
-                return {"error": "Image file not found"}
-            
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
+            # Load image upright and at reduced size; positions are reported in original coordinates
+            try:
+                image, (width, height) = load_image_with_size(image_path, DECODE_MAX_DIMENSION)
+            except ValueError:
                 return {"error": "Could not load image"}
+            scale = image.shape[1] / width
             
             # Extract EXIF data
             exif_data = self._extract_exif_data(image_path)
             
             # Basic image analysis
             image_properties = self._analyze_image_properties(image)
+            image_properties["dimensions"] = {"width": width, "height": height}
             
             # Face detection
-            faces_data = self._detect_faces(image)
+            faces_data = self._detect_faces(image, scale)
             
             # Scene analysis
             scene_analysis = self._analyze_scene(image)
@@ -82,22 +115,27 @@ class FamilyMemoryProcessor:
     def _extract_exif_data(self, image_path: str) -> Dict[str, Any]:
         """Extract EXIF data from image"""
         try:
-            image = Image.open(image_path)
+            # Only the headers are parsed; no pixel data is decoded
             exif_dict = {}
+            gps = None
             
-            if hasattr(image, '_getexif') and image._getexif() is not None:
-                exif = image._getexif()
-                
+            with Image.open(image_path) as image:
+                exif = image._getexif() if hasattr(image, '_getexif') else None
+            
+            if exif is not None:
                 for tag, value in exif.items():
                     tag_name = ExifTags.TAGS.get(tag, tag)
+                    if tag_name == "GPSInfo":
+                        gps = self._gps_coordinates(value)
                     exif_dict[tag_name] = str(value)
             
             return {
                 "has_exif": len(exif_dict) > 0,
                 "camera_make": exif_dict.get("Make", "unknown"),
                 "camera_model": exif_dict.get("Model", "unknown"),
-                "datetime_taken": exif_dict.get("DateTime"),
+                "datetime_taken": exif_dict.get("DateTimeOriginal") or exif_dict.get("DateTime"),
                 "gps_info": exif_dict.get("GPSInfo"),
+                "gps": gps,
                 "orientation": exif_dict.get("Orientation"),
                 "flash": exif_dict.get("Flash")
             }
@@ -106,6 +144,22 @@ class FamilyMemoryProcessor:
             logger.warning(f"Could not extract EXIF data: {e}")
             return {"has_exif": False}
     
+    @staticmethod
+    def _gps_coordinates(gps_info: Any) -> Optional[Dict[str, float]]:
+        """Decimal latitude/longitude from an EXIF GPSInfo block"""
+        try:
+            def degrees(dms, ref):
+                value = float(dms[0]) + float(dms[1]) / 60 + float(dms[2]) / 3600
+                return -value if ref in ("S", "W") else value
+            
+            # GPSLatitudeRef, GPSLatitude, GPSLongitudeRef, GPSLongitude
+            return {
+                "latitude": round(degrees(gps_info[2], gps_info[1]), 6),
+                "longitude": round(degrees(gps_info[4], gps_info[3]), 6)
+            }
+        except (KeyError, IndexError, TypeError, ValueError, ZeroDivisionError):
+            return None
+    
     def _analyze_image_properties(self, image: np.ndarray) -> Dict[str, Any]:
         """Analyze basic image properties"""
         height, width = image.shape[:2]
@@ -117,7 +171,7 @@ class FamilyMemoryProcessor:
         brightness = np.mean(gray)
         contrast = np.std(gray)
         
-        # Detect blurriness using Laplacian variance
+        # Detect blurriness using Laplacian variance, measured at the decoded size rather than the original
         laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
         is_blurry = laplacian_var < 100
         
@@ -141,8 +195,8 @@ class FamilyMemoryProcessor:
             "quality_score": min(100, max(0, laplacian_var / 10))
         }
     
-    def _detect_faces(self, image: np.ndarray) -> Dict[str, Any]:
-        """Detect faces in the image"""
+    def _detect_faces(self, image: np.ndarray, scale: float = 1.0) -> Dict[str, Any]:
+        """Detect faces in the image; scale is the image's size relative to the original photo"""
         if self.face_cascade is None:
             return {"count": 0, "faces": []}
         
@@ -158,14 +212,14 @@ class FamilyMemoryProcessor:
                 face_info = {
                     "id": i,
                     "position": {
-                        "x": int(x), 
-                        "y": int(y), 
-                        "width": int(w), 
-                        "height": int(h)
+                        "x": int(x / scale), 
+                        "y": int(y / scale), 
+                        "width": int(w / scale), 
+                        "height": int(h / scale)
                     },
                     "center": {
-                        "x": int(x + w/2), 
-                        "y": int(y + h/2)
+                        "x": int((x + w/2) / scale), 
+                        "y": int((y + h/2) / scale)
                     },
                     "confidence": 0.8,  # OpenCV doesn't provide confidence scores
                     "size_category": self._categorize_face_size(w, h, image.shape),
@@ -223,24 +277,20 @@ class FamilyMemoryProcessor:
         
         return f"{vertical}_{horizontal}"
     
-    def _analyze_scene(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_scene(self, image: Union[np.ndarray, ImageContext]) -> Dict[str, Any]:
         """Analyze the scene in the image"""
-        # Convert to HSV for color analysis
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        height, width = image.shape[:2]
+        # Colour class ratios from one quantized histogram pass over a downsampled HSV copy
+        context = ImageContext.of(image)
         
         # Color-based scene detection
         scene_indicators = {}
         
         # Sky detection (blue areas in upper part)
-        upper_region = hsv[:height//3, :, :]
-        blue_mask = cv2.inRange(upper_region, (100, 50, 50), (130, 255, 255))
-        sky_ratio = np.sum(blue_mask > 0) / (upper_region.shape[0] * upper_region.shape[1])
+        sky_ratio = context.top_color_ratios["sky"]
         scene_indicators["sky"] = sky_ratio
         
         # Vegetation detection (green areas)
-        green_mask = cv2.inRange(hsv, (35, 50, 50), (85, 255, 255))
-        vegetation_ratio = np.sum(green_mask > 0) / (height * width)
+        vegetation_ratio = context.color_ratios["foliage"]
         scene_indicators["vegetation"] = vegetation_ratio
         
         # Indoor/outdoor classification
@@ -256,7 +306,7 @@ class FamilyMemoryProcessor:
             setting = "indoor"
         
         # Lighting analysis
-        brightness = np.mean(image)
+        brightness = np.mean(context.bgr_means)
         lighting = "bright" if brightness > 150 else "normal" if brightness > 100 else "dim"
         
         return {
@@ -322,70 +372,223 @@ class FamilyMemoryProcessor:
         # Remove duplicates and return
         return list(set(tag for tag in tags if tag != "unknown"))
     
-    def create_family_timeline(self, photos_dir: str) -> List[Dict[str, Any]]:
-        """Create a timeline of family memories from photos directory"""
+    @cached_property
+    def timeline_manifest(self) -> TimelineManifest:
+        """Manifest of photos already analysed for timelines"""
+        return TimelineManifest(os.getenv("TIMELINE_MANIFEST_DB", "data/timeline_manifest.db"))
+    
+    def create_family_timeline(self, photos_dir: str, parallel: bool = True,
+                               metadata_only: bool = False) -> List[Dict[str, Any]]:
+        """Create a timeline of family memories from photos directory, newest first
+        
+        Only photos that are new or changed since the last call are analysed, in the analysis
+        process pool when ``parallel``; entries are read off the manifest's date index.
+        With ``metadata_only`` new photos get an entry from their EXIF headers alone and the
+        full analysis runs later on a background thread, replacing those entries as it goes.
+        """
         try:
-            timeline = []
-            
             if not os.path.exists(photos_dir):
-                return timeline
+                return []
+            
+            root = os.path.abspath(photos_dir)
+            known = self.timeline_manifest.known_files(root)
             
-            # Get all image files
+            # Get all image files, keeping those whose size or mtime changed
             image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
-            image_files = []
+            present = set()
+            pending = []
             
-            for file_path in Path(photos_dir).rglob('*'):
+            for file_path in Path(root).rglob('*'):
                 if file_path.suffix.lower() in image_extensions:
-                    image_files.append(file_path)
+                    file_stat = file_path.stat()
+                    present.add(str(file_path))
+                    if known.get(str(file_path)) != (file_stat.st_size, file_stat.st_mtime_ns):
+                        pending.append((file_path, file_stat))
+            
+            self.timeline_manifest.forget(set(known) - present)
             
-            # Process each image
-            for image_path in image_files:
-                try:
-                    # Get file modification time as fallback date
-                    file_stat = image_path.stat()
-                    default_date = datetime.fromtimestamp(file_stat.st_mtime)
-                    
-                    # Process the photo
-                    analysis = self.process_family_photo(str(image_path))
-                    
-                    if "error" not in analysis:
-                        # Extract date from EXIF or use file date
-                        photo_date = default_date
-                        if analysis.get("exif_data", {}).get("datetime_taken"):
-                            try:
-                                exif_date = analysis["exif_data"]["datetime_taken"]
-                                photo_date = datetime.strptime(exif_date, "%Y:%m:%d %H:%M:%S")
-                            except:
-                                pass
-                        
-                        timeline_entry = {
-                            "id": str(image_path.stem),
-                            "file_path": str(image_path),
-                            "date": photo_date.isoformat(),
-                            "title": f"Memory from {photo_date.strftime('%B %d, %Y')}",
-                            "faces_detected": analysis.get("faces", {}).get("count", 0),
-                            "scene_type": analysis.get("scene_analysis", {}).get("scene_type", "unknown"),
-                            "tags": analysis.get("smart_tags", []),
-                            "quality_score": analysis.get("image_properties", {}).get("quality_score", 0),
-                            "analysis": analysis
-                        }
-                        
-                        timeline.append(timeline_entry)
-                        
-                except Exception as e:
-                    logger.warning(f"Could not process {image_path}: {e}")
-                    continue
+            if metadata_only:
+                self._record_metadata_entries(pending)
+                if self.timeline_manifest.count(root, pending_only=True):
+                    self.start_timeline_enrichment(root)
+                logger.info(f"Timeline for {root}: {len(pending)} photos read from EXIF, "
+                            f"{len(present) - len(pending)} unchanged")
+                return list(self.timeline_manifest.entries(root))
             
-            # Sort timeline by date
-            timeline.sort(key=lambda x: x["date"], reverse=True)
+            # Metadata-only entries from earlier calls are analysed along with new and changed images
+            queued = {str(image_path) for image_path, _ in pending}
+            for path in self.timeline_manifest.pending(root):
+                if path not in queued and path in present:
+                    pending.append((Path(path), os.stat(path)))
             
-            logger.info(f"Created timeline with {len(timeline)} memories")
-            return timeline
+            # Process new and changed images
+            for image_path, file_stat, analysis in self._analyze_timeline_photos(pending, parallel):
+                self._record_timeline_entry(image_path, file_stat, analysis)
+            
+            logger.info(f"Timeline for {root}: {len(pending)} photos analysed, {len(present) - len(pending)} unchanged")
+            return list(self.timeline_manifest.entries(root))
             
         except Exception as e:
             logger.error(f"Error creating family timeline: {e}")
             return []
     
+    def _record_metadata_entries(self, pending: List[Tuple[Path, os.stat_result]]):
+        """Record EXIF-only entries, reading headers on a few threads since it is all file I/O"""
+        def read(item):
+            image_path, file_stat = item
+            # The camera's embedded thumbnail sits in the same header; photos without one get a
+            # generated thumbnail when the full analysis reaches them
+            return (image_path, file_stat, {"exif_data": self._extract_exif_data(str(image_path))},
+                    exif_thumbnail(str(image_path)))
+        
+        with ThreadPoolExecutor(max_workers=TIMELINE_EXIF_WORKERS) as pool:
+            rows = []
+            for image_path, file_stat, analysis, thumbnail in pool.map(read, pending):
+                entry = self._timeline_entry(image_path, file_stat, analysis, status="pending", thumbnail=thumbnail)
+                # The content hash needs the whole file, so it waits for the full analysis
+                rows.append((str(image_path), file_stat.st_size, file_stat.st_mtime_ns, "", entry["date"], entry))
+        
+        self.timeline_manifest.record_many(rows, analyzed=False)
+    
+    def _record_timeline_entry(self, image_path: Path, file_stat: os.stat_result, analysis: Dict[str, Any],
+                               keep_failed: bool = False) -> bool:
+        """Store a fully analysed entry; failed photos are retried next time unless keep_failed"""
+        try:
+            sha256 = file_sha256(str(image_path))
+            if "error" in analysis:
+                logger.warning(f"Could not process {image_path}: {analysis['error']}")
+                if not keep_failed:
+                    return False
+                analysis = {"exif_data": self._extract_exif_data(str(image_path))}
+                timeline_entry = self._timeline_entry(image_path, file_stat, analysis, status="failed",
+                                                      thumbnail=exif_thumbnail(str(image_path)))
+            else:
+                timeline_entry = self._timeline_entry(image_path, file_stat, analysis,
+                                                      thumbnail=self._timeline_thumbnail(image_path, sha256))
+            
+            self.timeline_manifest.record(
+                str(image_path), file_stat.st_size, file_stat.st_mtime_ns,
+                sha256, timeline_entry["date"], timeline_entry
+            )
+            return timeline_entry["analysis_status"] == "complete"
+            
+        except Exception as e:
+            logger.warning(f"Could not process {image_path}: {e}")
+            return False
+    
+    @staticmethod
+    def _timeline_thumbnail(image_path: Path, sha256: str) -> Optional[Dict[str, Any]]:
+        """The embedded EXIF thumbnail, else the smallest generated derivative"""
+        thumbnail = exif_thumbnail(str(image_path))
+        if thumbnail is None:
+            try:
+                thumbnail = next(iter(generate_derivatives(str(image_path), sha256).values()))
+            except Exception as e:
+                logger.warning(f"Could not create a thumbnail for {image_path}: {e}")
+        return thumbnail
+    
+    def enrich_timeline(self, photos_dir: str) -> int:
+        """Run the full analysis for metadata-only entries; returns how many were enriched"""
+        root = os.path.abspath(photos_dir)
+        pending = []
+        for path in self.timeline_manifest.pending(root):
+            try:
+                pending.append((Path(path), os.stat(path)))
+            except OSError:
+                self.timeline_manifest.forget({path})
+        
+        enriched = 0
+        for image_path, file_stat, analysis in self._analyze_timeline_photos(pending, parallel=True):
+            # A photo that cannot be analysed keeps its EXIF entry rather than being retried forever
+            if self._record_timeline_entry(image_path, file_stat, analysis, keep_failed=True):
+                enriched += 1
+        
+        logger.info(f"Timeline enrichment for {root}: {enriched}/{len(pending)} photos analysed")
+        return enriched
+    
+    def start_timeline_enrichment(self, photos_dir: str) -> bool:
+        """Enrich metadata-only entries on a background thread; False if one is already running"""
+        root = os.path.abspath(photos_dir)
+        with self._enrichment_lock:
+            thread = self._enrichment_threads.get(root)
+            if thread is not None and thread.is_alive():
+                return False
+            thread = threading.Thread(target=self._run_enrichment, args=(root,),
+                                      name="timeline-enrichment", daemon=True)
+            self._enrichment_threads[root] = thread
+            thread.start()
+        return True
+    
+    def _run_enrichment(self, root: str):
+        try:
+            self.enrich_timeline(root)
+        except Exception as e:
+            logger.error(f"Timeline enrichment for {root} failed: {e}")
+    
+    def timeline_status(self, photos_dir: str) -> Dict[str, Any]:
+        """How much of a timeline still waits for full analysis"""
+        root = os.path.abspath(photos_dir)
+        thread = self._enrichment_threads.get(root)
+        return {
+            "total": self.timeline_manifest.count(root),
+            "pending_analysis": self.timeline_manifest.count(root, pending_only=True),
+            "enriching": thread is not None and thread.is_alive()
+        }
+    
+    def _analyze_timeline_photos(self, pending: List[Tuple[Path, os.stat_result]],
+                                 parallel: bool) -> Iterator[Tuple[Path, os.stat_result, Dict[str, Any]]]:
+        """Analyse photos, yielding each as soon as it is done"""
+        if not parallel or len(pending) < 2:
+            for image_path, file_stat in pending:
+                yield image_path, file_stat, self.process_family_photo(str(image_path))
+            return
+        
+        try:
+            from backend.analysis_executor import analysis_executor, _process_memory_photo
+        except ImportError:
+            from analysis_executor import analysis_executor, _process_memory_photo
+        
+        futures = {
+            analysis_executor.submit(_process_memory_photo, str(image_path), None): (image_path, file_stat)
+            for image_path, file_stat in pending
+        }
+        for future in as_completed(futures):
+            image_path, file_stat = futures[future]
+            try:
+                analysis = future.result()
+            except Exception as e:
+                analysis = {"error": str(e)}
+            yield image_path, file_stat, analysis
+    
+    def _timeline_entry(self, image_path: Path, file_stat: os.stat_result, analysis: Dict[str, Any],
+                        status: str = "complete", thumbnail: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Timeline entry for a photo; metadata-only entries carry just the EXIF fields"""
+        exif_data = analysis.get("exif_data", {})
+        
+        # Extract date from EXIF or use file modification time
+        photo_date = datetime.fromtimestamp(file_stat.st_mtime)
+        if exif_data.get("datetime_taken"):
+            try:
+                exif_date = exif_data["datetime_taken"]
+                photo_date = datetime.strptime(exif_date, "%Y:%m:%d %H:%M:%S")
+            except:
+                pass
+        
+        return {
+            "id": str(image_path.stem),
+            "file_path": str(image_path),
+            "date": photo_date.isoformat(),
+            "title": f"Memory from {photo_date.strftime('%B %d, %Y')}",
+            "location": exif_data.get("gps"),
+            "thumbnail": thumbnail,
+            "faces_detected": analysis.get("faces", {}).get("count", 0),
+            "scene_type": analysis.get("scene_analysis", {}).get("scene_type", "unknown"),
+            "tags": analysis.get("smart_tags", []),
+            "quality_score": analysis.get("image_properties", {}).get("quality_score", 0),
+            "analysis_status": status,
+            "analysis": analysis
+        }
+    
     def get_memory_suggestions(self, date: str = None, family_member: str = None) -> Dict[str, Any]:
         """Get smart memory suggestions"""
         try:
@@ -8,19 +8,19 @@ import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List
-import aiofiles
 from fastapi import UploadFile
 
+from backend.upload_stream import stream_upload, MEDIA_KINDS
+
 logger = logging.getLogger(__name__)
 
 async def save_uploaded_file(file: UploadFile, directory: Path) -> str:
     """Save uploaded file to specified directory"""
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
+    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{Path(file.filename or 'upload').name}"
     file_path = directory / filename
     
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    # Streamed in chunks, checking type and size on the way; not a memory photo, so not in the blob store
+    await stream_upload(file, file_path, allowed_kinds=MEDIA_KINDS)
     
     return filename
 
@@ -28,17 +28,10 @@ async def analyze_image_with_ai(image_path: str, analysis_type: str = "general",
     """Analyze image using AI services"""
     try:
         # Import AI services locally to avoid circular imports
-        from backend.ai_services import family_ai_analyzer
-        
-        if not family_ai_analyzer:
-            return {
-                "success": False,
-                "error": "AI services not available",
-                "analysis": {}
-            }
+        from backend.analysis_executor import analysis_executor
         
-        # Use the family AI analyzer
-        analysis_result = await family_ai_analyzer.analyze_family_photo(image_path, family_context or [])
+        # Run the family AI analyzer in the analysis process pool so the event loop stays free
+        analysis_result = await analysis_executor.analyze_family_photo(image_path, family_context or [])
         
         return {
             "success": True,
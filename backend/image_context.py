@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Shared Image Feature Context for Elmowafiplatform
+Computes grayscale, HSV, downsampled copies, histograms and face boxes once per image, on first use
+"""
+
+import os
+import hashlib
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    from backend.image_loader import load_image_with_size
+except ImportError:
+    from image_loader import load_image_with_size
+
+# Colour statistics are taken from a copy whose longest side is at most this many pixels
+ANALYSIS_MAX_DIMENSION = int(os.getenv("IMAGE_ANALYSIS_MAX_DIMENSION", "512"))
+
+# Inclusive HSV ranges (as cv2.inRange takes them) of the colour classes object and scene detection count
+COLOR_CLASSES = {
+    "sky": ((100, 50, 50), (130, 255, 255)),
+    "vegetation": ((40, 50, 50), (80, 255, 255)),
+    "foliage": ((35, 50, 50), (85, 255, 255)),
+    "water": ((90, 100, 100), (120, 255, 255)),
+    "gray": ((0, 0, 50), (180, 30, 200))
+}
+
+def _class_bins():
+    """Per-channel bin edges at every class boundary, and a LUT mapping each channel value to its bin"""
+    edges = []
+    for channel in range(3):
+        bounds = {0, 256}
+        for lower, upper in COLOR_CLASSES.values():
+            bounds.update((lower[channel], min(upper[channel] + 1, 256)))
+        edges.append(np.array(sorted(bounds)))
+    lut = np.stack([np.searchsorted(e, np.arange(256), side="right") - 1 for e in edges], axis=-1)
+    return edges, lut.astype(np.uint8).reshape(1, 256, 3)
+
+_CLASS_EDGES, _CLASS_LUT = _class_bins()
+_CLASS_SHAPE = tuple(len(e) - 1 for e in _CLASS_EDGES)
+
+def color_class_histogram(hsv: np.ndarray) -> np.ndarray:
+    """Quantized 3-D HSV histogram whose bins never straddle a colour class boundary, in one pass"""
+    if hsv.size == 0:
+        return np.zeros(_CLASS_SHAPE, dtype=np.int64)
+    bins = cv2.LUT(hsv, _CLASS_LUT).reshape(-1, 3).astype(np.int32)
+    codes = (bins[:, 0] * _CLASS_SHAPE[1] + bins[:, 1]) * _CLASS_SHAPE[2] + bins[:, 2]
+    return np.bincount(codes, minlength=int(np.prod(_CLASS_SHAPE))).reshape(_CLASS_SHAPE)
+
+def color_class_ratios(histogram: np.ndarray) -> Dict[str, float]:
+    """Fraction of pixels in every colour class; equal to counting a cv2.inRange mask per class"""
+    total = max(int(histogram.sum()), 1)
+    ratios = {}
+    for name, (lower, upper) in COLOR_CLASSES.items():
+        box = tuple(
+            slice(int(np.searchsorted(e, lo)), int(np.searchsorted(e, min(hi + 1, 256))))
+            for e, lo, hi in zip(_CLASS_EDGES, lower, upper)
+        )
+        ratios[name] = float(histogram[box].sum()) / total
+    return ratios
+
+# (path, size, mtime) -> sha256, so repeated lookups for an unchanged file skip rehashing
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+_FILE_HASH_MEMO_SIZE = 4096
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents, memoised on its size and mtime"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        if len(_file_hashes) >= _FILE_HASH_MEMO_SIZE:
+            _file_hashes.pop(next(iter(_file_hashes)))
+        _file_hashes[memo_key] = digest
+    return digest
+
+class ImageContext:
+    """Lazily computed per-image features shared by every analyzer
+
+    Built from a path, the image is only decoded when a feature needs pixels, so a fully
+    cached analysis costs a file hash and no decode. With ``max_dimension`` the photo is decoded
+    at reduced size; ``original_width``/``original_height`` and ``to_original`` refer back to it.
+    """
+
+    def __init__(self, image: Optional[np.ndarray] = None, face_cascade: Any = None, image_path: Optional[str] = None,
+                 max_dimension: Optional[int] = None):
+        if image is None and image_path is None:
+            raise ValueError("ImageContext needs an image or an image path")
+        if image is not None:
+            self.__dict__["image"] = image
+            self._original_size = (image.shape[1], image.shape[0])
+        self.face_cascade = face_cascade
+        self.image_path = image_path
+        self.max_dimension = max_dimension
+
+    @classmethod
+    def of(cls, image: Union[np.ndarray, str, "ImageContext"], face_cascade: Any = None) -> "ImageContext":
+        """Wrap a raw image or path, or pass an existing context through unchanged"""
+        if isinstance(image, cls):
+            return image
+        if isinstance(image, (str, os.PathLike)):
+            return cls(face_cascade=face_cascade, image_path=str(image))
+        return cls(image, face_cascade)
+
+    @cached_property
+    def image(self) -> np.ndarray:
+        """Decoded, upright BGR image, read from image_path on first use"""
+        try:
+            image, self._original_size = load_image_with_size(self.image_path, self.max_dimension)
+        except ValueError:
+            raise ValueError("Could not load image")
+        return image
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def original_width(self) -> int:
+        self.image
+        return self._original_size[0]
+
+    @property
+    def original_height(self) -> int:
+        self.image
+        return self._original_size[1]
+
+    @property
+    def scale(self) -> float:
+        """Decoded size relative to the original photo"""
+        return self.width / self.original_width
+
+    def to_original(self, box: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """Map an (x, y, w, h) box on the decoded image to original photo coordinates"""
+        scale = self.scale
+        return tuple(int(round(v / scale)) for v in box)
+
+    @cached_property
+    def sha256(self) -> str:
+        """Content hash of the file, or of the pixels for in-memory images"""
+        if self.image_path is not None:
+            return file_sha256(self.image_path)
+        image = np.ascontiguousarray(self.image)
+        digest = hashlib.sha256(str(image.shape).encode())
+        digest.update(image.data)
+        return digest.hexdigest()
+
+    # ---- full resolution -----------------------------------------------------------
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def gray_stats(self) -> Dict[str, float]:
+        """Brightness, contrast and Laplacian variance (blur) of the grayscale image at its decoded size
+
+        With ``max_dimension`` that is the reduced decode, not the original photo. Laplacian variance
+        depends on scale (downscaling sharpens edges per pixel), so it is only comparable between
+        images decoded at the same size; cached results are keyed on ``max_dimension`` for that reason.
+        """
+        mean, std = cv2.meanStdDev(self.gray)
+        return {
+            "brightness": float(mean[0][0]),
+            "contrast": float(std[0][0]),
+            "laplacian_var": float(cv2.Laplacian(self.gray, cv2.CV_64F).var())
+        }
+
+    @cached_property
+    def face_boxes(self) -> List[Tuple[int, int, int, int]]:
+        """Haar cascade (x, y, w, h) boxes; empty when no cascade is loaded"""
+        if self.face_cascade is None:
+            return []
+        return [tuple(int(v) for v in box) for box in self.face_cascade.detectMultiScale(self.gray, 1.1, 4)]
+
+    # ---- downsampled ---------------------------------------------------------------
+
+    @cached_property
+    def small(self) -> np.ndarray:
+        """Downsampled BGR copy for colour statistics"""
+        longest = max(self.height, self.width)
+        if longest <= ANALYSIS_MAX_DIMENSION:
+            return self.image
+        scale = ANALYSIS_MAX_DIMENSION / longest
+        return cv2.resize(self.image, (max(1, round(self.width * scale)), max(1, round(self.height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        """HSV of the downsampled copy"""
+        return cv2.cvtColor(self.small, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def bgr_means(self) -> Tuple[float, float, float]:
+        """Mean blue, green and red values"""
+        blue, green, red, _ = cv2.mean(self.small)
+        return float(blue), float(green), float(red)
+
+    @cached_property
+    def hsv_histograms(self) -> Dict[str, np.ndarray]:
+        """Per-channel HSV histograms (hue has 180 bins, saturation and value 256)"""
+        return {
+            "hue": cv2.calcHist([self.hsv], [0], None, [180], [0, 180]).ravel(),
+            "saturation": cv2.calcHist([self.hsv], [1], None, [256], [0, 256]).ravel(),
+            "value": cv2.calcHist([self.hsv], [2], None, [256], [0, 256]).ravel()
+        }
+
+    @cached_property
+    def hsv_means(self) -> Dict[str, float]:
+        """Mean hue, saturation and value, taken from the histograms"""
+        means = {}
+        for channel, histogram in self.hsv_histograms.items():
+            means[channel] = float(np.dot(histogram, np.arange(len(histogram))) / max(histogram.sum(), 1.0))
+        return means
+
+    @cached_property
+    def _color_histograms(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Colour class histograms of the top third and the rest of the downsampled image"""
+        top = self.hsv.shape[0] // 3
+        return color_class_histogram(self.hsv[:top]), color_class_histogram(self.hsv[top:])
+
+    @cached_property
+    def color_ratios(self) -> Dict[str, float]:
+        """Fraction of the whole image in each of COLOR_CLASSES"""
+        top, rest = self._color_histograms
+        return color_class_ratios(top + rest)
+
+    @cached_property
+    def top_color_ratios(self) -> Dict[str, float]:
+        """Fraction of the top third of the image in each of COLOR_CLASSES"""
+        return color_class_ratios(self._color_histograms[0])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Shared Image Loader for Elmowafiplatform
+Decodes photos upright (EXIF orientation applied once) and, when a maximum dimension is given,
+lets the JPEG decoder produce a 1/2, 1/4 or 1/8 scale image directly instead of decoding full resolution
+"""
+
+import os
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest side analyzers decode photos at; 0 decodes at full resolution
+DECODE_MAX_DIMENSION = int(os.getenv("IMAGE_DECODE_MAX_DIMENSION", "1280"))
+
+def load_image_with_size(image_path: str, max_dimension: Optional[int] = None,
+                         rgb: bool = False) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode an image, returning it with the (width, height) of the upright full-resolution original
+
+    The result's longest side is at most ``max_dimension``; channels are BGR unless ``rgb`` is set.
+    Raises ValueError when the file cannot be decoded.
+    """
+    try:
+        with Image.open(image_path) as pil_image:
+            width, height = pil_image.size
+            longest = max(width, height)
+
+            if max_dimension and longest > max_dimension:
+                # JPEG only: picks the largest DCT scale whose output is still at least the requested size
+                scale = max_dimension / longest
+                pil_image.draft("RGB", (max(1, int(width * scale)), max(1, int(height * scale))))
+
+            # Orientation 5-8 swap the axes
+            orientation = pil_image.getexif().get(0x0112, 1)
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+
+            upright = ImageOps.exif_transpose(pil_image)
+            if upright.mode != "RGB":
+                upright = upright.convert("RGB")
+            image = np.asarray(upright)
+    except Exception as e:
+        raise ValueError(f"Could not load image: {e}")
+
+    # The draft scale is a power of two; finish with an area resize to the exact size asked for
+    if max_dimension and max(image.shape[:2]) > max_dimension:
+        scale = max_dimension / max(image.shape[:2])
+        image = cv2.resize(image, (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale))),
+                           interpolation=cv2.INTER_AREA)
+
+    if not rgb:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    return np.ascontiguousarray(image), (width, height)
+
+def load_image(image_path: str, max_dimension: Optional[int] = None, rgb: bool = False) -> np.ndarray:
+    """Decode an upright image no larger than max_dimension; BGR unless rgb is set"""
+    return load_image_with_size(image_path, max_dimension, rgb)[0]
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Staged Ingest Pipeline for Elmowafiplatform
+Jobs pass through a chain of async stages, each with its own bounded queue, worker count and retry policy,
+so a burst of uploads waits in the queues instead of starting unbounded analysis work.
+Per-stage queue depth, throughput and latency are kept for health endpoints.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+StageHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 4)
+
+class Stage:
+    """One pipeline step: a bounded queue drained by a fixed number of workers"""
+
+    def __init__(self, name: str, handler: StageHandler, workers: int = 1, queue_size: int = 100,
+                 max_retries: int = 2, retry_delay: float = 1.0):
+        self.name = name
+        self.handler = handler
+        self.workers = int(os.getenv(f"INGEST_{name.upper()}_WORKERS", str(workers)))
+        self.queue_size = int(os.getenv(f"INGEST_{name.upper()}_QUEUE_SIZE", str(queue_size)))
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self._wait_times: Deque[float] = deque(maxlen=500)
+        self._run_times: Deque[float] = deque(maxlen=500)
+
+    async def run(self, job: Dict[str, Any]):
+        """Run the handler, retrying with exponential backoff; the last error propagates"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retried += 1
+                logger.warning(f"Ingest stage {self.name} failed for job {job.get('id')} "
+                               f"(attempt {attempt + 1}): {e}; retrying")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        wait_times = list(self._wait_times)
+        run_times = list(self._run_times)
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "wait_seconds": {"p50": _percentile(wait_times, 0.5), "p95": _percentile(wait_times, 0.95)},
+            "run_seconds": {"p50": _percentile(run_times, 0.5), "p95": _percentile(run_times, 0.95)}
+        }
+
+class IngestPipeline:
+    """Chain of stages; a job moves to the next stage's queue once a stage finishes with it"""
+
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = stages
+        self.completed = 0
+        self.failed = 0
+        self.recent_failures: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._tasks: List[asyncio.Task] = []
+        self._loop = None
+
+    def _ensure_workers(self):
+        """Start the stage workers on the running loop at first use"""
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._loop is loop:
+            return
+        self._loop = loop
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+        self._tasks = [
+            loop.create_task(self._worker(index), name=f"{self.name}-{stage.name}-{i}")
+            for index, stage in enumerate(self.stages)
+            for i in range(stage.workers)
+        ]
+        logger.info(f"{self.name} pipeline started: " +
+                    ", ".join(f"{stage.name}x{stage.workers}" for stage in self.stages))
+
+    async def submit(self, job: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """Queue a job at the first stage; waits for room up to timeout and returns whether it was queued"""
+        self._ensure_workers()
+        job.setdefault("submitted_at", time.monotonic())
+        job["_enqueued_at"] = time.monotonic()
+        try:
+            await asyncio.wait_for(self.stages[0].queue.put(job), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} pipeline full; job {job.get('id')} not queued")
+            return False
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            job = await stage.queue.get()
+            stage._wait_times.append(time.monotonic() - job["_enqueued_at"])
+            stage.busy += 1
+            start = time.monotonic()
+            try:
+                result = await stage.run(job)
+                stage.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.failed += 1
+                self._fail(job, stage, e)
+                continue
+            finally:
+                stage._run_times.append(time.monotonic() - start)
+                stage.busy -= 1
+                stage.queue.task_done()
+
+            if result is False or next_stage is None:
+                # A handler returning False ends the job early, e.g. nothing to analyse
+                self.completed += 1
+                continue
+
+            # Waiting here when the next queue is full is what pushes back on earlier stages
+            job["_enqueued_at"] = time.monotonic()
+            await next_stage.queue.put(job)
+
+    def _fail(self, job: Dict[str, Any], stage: Stage, error: Exception):
+        self.failed += 1
+        self.recent_failures.append({
+            "job_id": job.get("id"),
+            "stage": stage.name,
+            "error": str(error),
+            "failed_at": datetime.now().isoformat()
+        })
+        logger.error(f"{self.name} job {job.get('id')} failed in {stage.name}: {error}")
+
+    async def stop(self, drain_timeout: float = 0):
+        """Stop the workers, first giving queued jobs up to drain_timeout seconds to finish"""
+        if not self._tasks:
+            return
+        if drain_timeout > 0:
+            try:
+                for stage in self.stages:
+                    await asyncio.wait_for(stage.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.name} pipeline stopped with jobs still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-stage queue depth, counters and latency percentiles"""
+        return {
+            "running": bool(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "stages": {stage.name: stage.get_metrics() for stage in self.stages},
+            "recent_failures": list(self.recent_failures)
+        }
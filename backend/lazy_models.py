@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Lazy Model Loading for Elmowafiplatform
+Model singletons (face trainer, photo clustering, AI analyzers) are imported and built on first use
+instead of at server import time; warm_up() loads them ahead of time when that is wanted
+"""
+
+import os
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyModel:
+    """Stands in for a singleton, building it on first attribute access"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Any:
+        """Build the singleton if it has not been built yet, and return it"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    logger.info(f"Loaded {self._name} in {time.perf_counter() - start:.2f}s")
+        return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def lazy_method(self, attr: str) -> Callable[..., Any]:
+        """The named method, looked up only when called; hand this to an executor so the model loads
+        on the worker thread rather than on the event loop"""
+        return lambda *args, **kwargs: getattr(self.load(), attr)(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyModel {self._name} ({'loaded' if self.loaded else 'not loaded'})>"
+
+_registry: Dict[str, LazyModel] = {}
+
+def lazy_model(name: str, factory: Callable[[], Any]) -> LazyModel:
+    """Register a lazily built singleton"""
+    model = _registry[name] = LazyModel(name, factory)
+    return model
+
+def _import(module: str):
+    # Modules are imported both as backend.<module> and from inside backend/
+    try:
+        return importlib.import_module(f"backend.{module}")
+    except ImportError:
+        return importlib.import_module(module)
+
+def module_available(*modules: str) -> bool:
+    """Whether modules can be imported, without importing them"""
+    try:
+        return all(importlib.util.find_spec(module) is not None for module in modules)
+    except (ImportError, ValueError):
+        return False
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Load the named models (default: all) now; returns load seconds or the error per model"""
+    results = {}
+    for name in names or list(_registry):
+        start = time.perf_counter()
+        try:
+            _registry[name].load()
+            results[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            logger.error(f"Could not load {name}: {e}")
+            results[name] = {"error": str(e)}
+    return results
+
+def get_status() -> Dict[str, bool]:
+    """Which models are loaded, for health endpoints"""
+    return {name: model.loaded for name, model in _registry.items()}
+
+# Models warm_up() loads when MODEL_WARMUP is set or the server runs with --preload
+face_trainer = lazy_model("face_trainer", lambda: _import("facial_recognition_trainer").face_trainer)
+photo_clustering_engine = lazy_model("photo_clustering_engine", lambda: _import("photo_clustering").photo_clustering_engine)
+family_ai_analyzer = lazy_model("family_ai_analyzer", lambda: _import("ai_services").family_ai_analyzer.load_models())
+comprehensive_family_ai = lazy_model(
+    "comprehensive_family_ai", lambda: _import("comprehensive_ai_services").comprehensive_family_ai
+)
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "false").lower() == "true"
@@ -38,22 +38,17 @@ DATABASE_PATH = "data/family_platform.db"
 # Import authentication
 from auth import UserAuth, UserLogin, Token, get_current_user, register_user, login_user
 
-# Import AI services from modules
-try:
-    from backend.facial_recognition_trainer import face_trainer
-    FACE_RECOGNITION_AVAILABLE = True
-except ImportError:
+# AI models load on first use (or at startup with MODEL_WARMUP / --preload), not at import
+from backend import lazy_models
+from backend.lazy_models import face_trainer, module_available
+
+FACE_RECOGNITION_AVAILABLE = module_available("cv2", "numpy", "sklearn")
+if not FACE_RECOGNITION_AVAILABLE:
     print("Face recognition not available - install face-recognition package for full AI features")
-    face_trainer = None
-    FACE_RECOGNITION_AVAILABLE = False
 
-try:
-    from backend.photo_clustering import photo_clustering_engine
-    PHOTO_CLUSTERING_AVAILABLE = True
-except ImportError:
+PHOTO_CLUSTERING_AVAILABLE = module_available("cv2", "numpy", "sklearn")
+if not PHOTO_CLUSTERING_AVAILABLE:
     print("Photo clustering not available - check AI dependencies")
-    photo_clustering_engine = None
-    PHOTO_CLUSTERING_AVAILABLE = False
 
 # Import the data manager and AI integration
 from backend.data_manager import DataManager
@@ -228,6 +223,20 @@ async def startup_event():
     # Initialize Family AI database if available
     if FAMILY_AI_AVAILABLE:
         FamilyAIBase.metadata.create_all()
+    
+    # Optional per-worker warm-up; with --preload the parent process has already loaded the models
+    if lazy_models.MODEL_WARMUP:
+        await asyncio.get_running_loop().run_in_executor(None, lazy_models.warm_up)
+    
+    # Startup runs in every worker; the watcher and the suggestion refresher each take a file lock,
+    # so only one worker per host runs them and the others skip
+    # Ingest photos dropped into PHOTO_WATCH_DIRS
+    from backend.photo_watcher import photo_watcher
+    photo_watcher.start(data_manager)
+    
+    # Keep the precomputed memory suggestions current
+    from backend.suggestion_store import memory_suggestions
+    memory_suggestions.start()
 
 # Shutdown event handler
 @app.on_event("shutdown")
@@ -236,6 +245,68 @@ async def shutdown_event():
     await close_redis()
     await close_enhanced_redis()
     await redis_websocket_manager.shutdown()
+    
+    # Train any face samples still waiting for a debounced retrain
+    if face_trainer.loaded:
+        face_trainer.retrain_scheduler.stop(flush=True)
+    
+    # Finish the photo ingest batch in flight
+    from backend.photo_watcher import photo_watcher
+    photo_watcher.stop()
+    
+    from backend.suggestion_store import memory_suggestions
+    memory_suggestions.stop()
+    
+    # Let queued memory analysis finish before the analysis workers go away
+    from backend.api_v1 import memory_ingest_pipeline
+    await memory_ingest_pipeline.stop(drain_timeout=float(os.getenv("INGEST_DRAIN_SECONDS", "10")))
+    
+    # Stop photo analysis worker processes
+    from backend.analysis_executor import analysis_executor
+    analysis_executor.shutdown(wait=False)
+
+def run_preloaded(host: str, port: int, workers: int):
+    """Load every model in this process, then fork workers that share those pages copy-on-write
+
+    Each worker runs the startup handler; the photo watcher and suggestion refresher run in
+    whichever worker takes their lock first.
+    """
+    logger.info(f"Preloaded models: {lazy_models.warm_up()}")
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # uvicorn's own multi-worker mode spawns fresh interpreters, which would not share the models
+        logger.warning("gunicorn not installed; serving the preloaded models from a single process")
+        uvicorn.run(app, host=host, port=port)
+        return
+    
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+        
+        def load(self):
+            return app
+    
+    PreloadedApplication().run()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Elmowafiplatform API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--preload", action="store_true",
+                        help="Load AI models once before forking workers, so they share the memory; "
+                             "background services still run in one worker only")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes with --preload")
+    args = parser.parse_args()
+    
+    if args.preload:
+        run_preloaded(args.host, args.port, args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, reload=True)
\ No newline at end of file
@@ -11,8 +11,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
+from fastapi import HTTPException
 from werkzeug.utils import secure_filename
 import logging
 
@@ -22,6 +23,7 @@ from facial_recognition_trainer import face_trainer
 from photo_clustering import photo_clustering_engine  
 from gps_verification import gps_verifier
 from database import db
+from blob_store import blob_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -246,26 +248,28 @@ def upload_memory():
         if not uploaded_files or all(f.filename == '' for f in uploaded_files):
             return jsonify({"error": "At least one image is required"}), 400
         
+        # Memory id first, so each photo is referenced by the memory as it is stored
+        memory_id = f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
         # Process and save images
         image_urls = []
+        image_paths = []
         ai_analysis_results = []
         
         for file in uploaded_files:
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                # Add timestamp to avoid conflicts
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                file_path = app.config['UPLOAD_FOLDER'] / filename
-                file.save(file_path)
+                # Streamed into the content-addressed store with type and size checks; known content is kept once
+                stored = blob_store.put_stream(file.stream, owner_id=memory_id)
+                image_paths.append(stored.path)
                 
                 # Store relative URL for frontend
-                image_urls.append(f"/api/uploads/{filename}")
+                image_urls.append(f"/api/blobs/{stored.path.relative_to(blob_store.root).as_posix()}")
                 
                 # Perform additional AI analysis if needed
                 try:
                     analysis_result = family_analyzer.analyze_family_photo(
-                        str(file_path), 
+                        str(stored.path), 
                         family_context={"members": family_members}
                     )
                     ai_analysis_results.append(analysis_result)
@@ -273,8 +277,6 @@ def upload_memory():
                     logger.warning(f"AI analysis failed for {filename}: {ai_error}")
                     ai_analysis_results.append(None)
         
-        # Create memory record
-        memory_id = f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # Combine AI analysis data
         combined_ai_analysis = {
@@ -283,30 +285,34 @@ def upload_memory():
             "processed_at": datetime.now().isoformat()
         }
         
-        with get_db_connection() as conn:
-            conn.execute("""
-                INSERT INTO memories 
-                (id, title, description, date, location, image_url, tags, 
-                 family_members, ai_analysis, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                memory_id,
-                title,
-                description,
-                date,
-                location,
-                json.dumps(image_urls),
-                json.dumps(tags),
-                json.dumps(family_members),
-                json.dumps(combined_ai_analysis),
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
+        try:
+            with get_db_connection() as conn:
+                conn.execute("""
+                    INSERT INTO memories 
+                    (id, title, description, date, location, image_url, tags, 
+                     family_members, ai_analysis, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    memory_id,
+                    title,
+                    description,
+                    date,
+                    location,
+                    json.dumps(image_urls),
+                    json.dumps(tags),
+                    json.dumps(family_members),
+                    json.dumps(combined_ai_analysis),
+                    datetime.now().isoformat(),
+                    datetime.now().isoformat()
+                ))
+        except Exception:
+            # No memory holds the photos, so nothing would ever release them
+            blob_store.release_owner(memory_id)
+            raise
         
         # Train facial recognition if faces were detected
-        for i, result in enumerate(ai_analysis_results):
+        for image_path, result in zip(image_paths, ai_analysis_results):
             if result and result.get('faces_detected'):
-                image_path = app.config['UPLOAD_FOLDER'] / f"{timestamp}_{uploaded_files[i].filename}"
                 for member_id in family_members:
                     face_trainer.add_training_sample(member_id, str(image_path), verified=False)
         
@@ -324,6 +330,9 @@ def upload_memory():
             "message": "Memory created successfully"
         }), 201
         
+    except HTTPException as e:
+        # Unsupported type or too large
+        return jsonify({"error": e.detail}), e.status_code
     except Exception as e:
         logger.error(f"Error uploading memory: {e}")
         return jsonify({"error": str(e)}), 500
@@ -333,6 +342,14 @@ def serve_upload(filename):
     """Serve uploaded files"""
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.route('/api/blobs/<path:blob_path>')
+def serve_blob(blob_path):
+    """Serve a stored memory photo, only to the family whose memories reference it"""
+    stored = blob_store.get(Path(blob_path).stem.lower(), request.args.get('familyId'))
+    if stored is None or stored.path.resolve() != (blob_store.root / blob_path).resolve():
+        return jsonify({"error": "File not found"}), 404
+    return send_file(stored.path.resolve())
+
 # Smart Memory Suggestions API
 @app.route('/api/memories/suggestions', methods=['GET'])
 def get_memory_suggestions():
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Media Responses for Elmowafiplatform
+File responses with ETag / Last-Modified revalidation and single byte-range requests. Bodies are
+copied out in bounded pread() chunks on a worker thread, so a large video is never read into memory
+whole and the event loop never blocks on disk.
+"""
+
+import os
+import re
+import stat as stat_module
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+RANGE_CHUNK_SIZE = 256 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match calls for
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def _not_modified_since(header: Optional[str], mtime: float) -> bool:
+    if not header:
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte of a single range; None when unsatisfiable, raises ValueError when not a valid single range"""
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        raise ValueError(header)
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        # An invalid range is ignored rather than refused (RFC 9110 14.1.1)
+        raise ValueError(header)
+    if first >= size:
+        return None
+    return first, min(int(last), size - 1) if last else size - 1
+
+class FileRangeResponse(Response):
+    """Sends bytes first..last of a file in RANGE_CHUNK_SIZE pread() chunks"""
+
+    def __init__(self, path: Union[str, Path], first: int, last: int, status_code: int = 200,
+                 headers: Optional[dict] = None, media_type: Optional[str] = None):
+        self.path = path
+        self.first = first
+        self.count = max(0, last - first + 1)
+        headers = {**(headers or {}), "Content-Length": str(self.count)}
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as f:
+            fd = f.fileno()
+            offset = self.first
+            remaining = self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(RANGE_CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body rather than hang the client
+                await send({"type": "http.response.body", "body": b""})
+
+def file_response(request: Request, path: Union[str, Path], media_type: Optional[str] = None,
+                  etag: Optional[str] = None, immutable: bool = False,
+                  stat_result: Optional[os.stat_result] = None) -> Response:
+    """Serve a file honouring If-None-Match, If-Modified-Since, Range and If-Range
+
+    Immutable files (content-addressed URLs) are cached for a year; others must revalidate.
+    """
+    stat = stat_result or os.stat(path)
+    size = stat.st_size
+    etag = etag or f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    media_type = media_type or mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "public, max-age=0, must-revalidate"
+    }
+
+    # If-Modified-Since only counts when there is no If-None-Match
+    if_none_match = request.headers.get("if-none-match")
+    if (_etag_matches(if_none_match, etag) or
+            (if_none_match is None and _not_modified_since(request.headers.get("if-modified-since"), stat.st_mtime))):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and size and (not if_range or if_range.strip() in (etag, last_modified)):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            # Multiple, malformed or invalid ranges: the whole file is a valid answer
+            byte_range = (0, size - 1)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range != (0, size - 1):
+            first, last = byte_range
+            headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+            return FileRangeResponse(path, first, last, status_code=206, headers=headers, media_type=media_type)
+
+    return FileRangeResponse(path, 0, size - 1, headers=headers, media_type=media_type)
+
+def media_file_response(request: Request, root: Union[str, Path], relative_path: str, **kwargs) -> Response:
+    """file_response for a path below root; anything outside it, or not a regular file, is a 404"""
+    root = Path(root).resolve()
+    path = (root / relative_path).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        stat = None
+    if not path.is_relative_to(root) or stat is None or not stat_module.S_ISREG(stat.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_response(request, path, stat_result=stat, **kwargs)
+
+class MediaFiles(StaticFiles):
+    """StaticFiles whose responses support ranges and conditional requests"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            # html mode's 404.html
+            return super().file_response(full_path, stat_result, scope, status_code)
+        return file_response(Request(scope), full_path, stat_result=stat_result)
@@ -79,6 +79,44 @@ class MemoryEngine:
         logger.info(f"Photo uploaded: {photo_id}")
         return photo_id
     
+    async def upload_photo_stream(self, file, uploader_id: str) -> str:
+        """
+        Upload a photo from an UploadFile without reading it into memory.
+        
+        Args:
+            file: The uploaded file, read in chunks
+            uploader_id: ID of the user who uploaded the file
+            
+        Returns:
+            photo_id: Unique ID for the uploaded photo
+        """
+        try:
+            from backend.blob_store import blob_store
+        except ImportError:
+            from blob_store import blob_store
+        
+        # Generate unique ID for the photo
+        photo_id = str(uuid.uuid4())
+        
+        filename = file.filename or ""
+        
+        # Stream into the blob store, checking type and size and hashing on the way; known content is not kept twice
+        stored = await blob_store.put_upload(file, owner_id=photo_id)
+        
+        # Store metadata
+        self.photo_metadata[photo_id] = {
+            "original_filename": filename,
+            "upload_date": datetime.now().isoformat(),
+            "uploader_id": uploader_id,
+            "file_path": str(stored.path),
+            "size": stored.size,
+            "sha256": stored.sha256,
+            "analyzed": False
+        }
+        
+        logger.info(f"Photo uploaded: {photo_id}")
+        return photo_id
+    
     def get_memory_suggestions(self, family_member_id: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Get AI-powered memory suggestions.
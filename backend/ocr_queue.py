@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+OCR Job Queue for Elmowafiplatform
+Runs tesseract on a bounded pool of worker threads with per-job timeouts and cancellation,
+skipping photos that a cheap edge-density / MSER pre-check says contain no text
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import cv2
+
+try:
+    import pytesseract
+    from PIL import Image
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    from backend.analysis_cache import cached_analysis
+    from backend.image_loader import load_image
+except ImportError:
+    from analysis_cache import cached_analysis
+    from image_loader import load_image
+
+logger = logging.getLogger(__name__)
+
+# Pre-check thresholds: photos need both enough edges and enough character-sized MSER regions
+TEXT_PRECHECK_DIMENSION = int(os.getenv("OCR_PRECHECK_DIMENSION", "640"))
+MIN_EDGE_DENSITY = float(os.getenv("OCR_MIN_EDGE_DENSITY", "0.02"))
+MIN_TEXT_REGIONS = int(os.getenv("OCR_MIN_TEXT_REGIONS", "12"))
+
+def text_likelihood(image_path: str) -> Dict[str, Any]:
+    """Cheap check for whether a photo is worth running OCR on"""
+    gray = cv2.cvtColor(load_image(image_path, TEXT_PRECHECK_DIMENSION), cv2.COLOR_BGR2GRAY)
+    edge_density = cv2.countNonZero(cv2.Canny(gray, 100, 200)) / gray.size
+
+    text_regions = 0
+    if edge_density >= MIN_EDGE_DENSITY:
+        # Characters are small, roughly upright blobs; skip MSER entirely on smooth photos
+        _, boxes = cv2.MSER_create().detectRegions(gray)
+        height = gray.shape[0]
+        for x, y, w, h in boxes:
+            if 0.01 * height <= h <= 0.2 * height and 0.1 <= w / h <= 2.0:
+                text_regions += 1
+
+    return {
+        "edge_density": round(float(edge_density), 4),
+        "text_regions": text_regions,
+        "likely_text": edge_density >= MIN_EDGE_DENSITY and text_regions >= MIN_TEXT_REGIONS
+    }
+
+class OCRQueueFull(Exception):
+    """The OCR queue is at capacity"""
+
+class OCRJobQueue:
+    """Bounded OCR queue; job results stay retrievable by id until they expire"""
+
+    def __init__(self, workers: Optional[int] = None, max_queued: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None, job_ttl_seconds: Optional[float] = None):
+        self.workers = workers or int(os.getenv("OCR_WORKERS", "2"))
+        self.max_queued = max_queued or int(os.getenv("OCR_QUEUE_SIZE", "100"))
+        self.timeout_seconds = timeout_seconds or float(os.getenv("OCR_JOB_TIMEOUT_SECONDS", "30"))
+        self.job_ttl_seconds = job_ttl_seconds or float(os.getenv("OCR_JOB_TTL_SECONDS", "3600"))
+
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._finished: Dict[str, float] = {}
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"ocr-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"OCR queue started with {self.workers} workers")
+
+    @cached_analysis("tesseract_text", "1", lambda self, timeout=None: {})
+    def tesseract_text(self, image_path: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Tesseract OCR; a timeout kills the tesseract process and raises RuntimeError"""
+        with Image.open(image_path) as pil_image:
+            text = pytesseract.image_to_string(pil_image, timeout=timeout or 0)
+
+        # Clean up the text
+        return text.strip() if text and text.strip() else None
+
+    def submit(self, image_path: str, precheck: bool = True, cleanup: bool = False) -> str:
+        """Queue a photo for OCR and return its job id; cleanup deletes the file once the job ends"""
+        self._prune()
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "text": None,
+            "text_check": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None
+        }
+        future = Future()
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._futures[job_id] = future
+
+        try:
+            self._queue.put_nowait((job_id, image_path, precheck, cleanup))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id)
+                self._futures.pop(job_id)
+            raise OCRQueueFull(f"OCR queue is full ({self.max_queued} jobs)")
+
+        self._ensure_workers()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def future(self, job_id: str) -> Optional[Future]:
+        """Future resolving to the finished job, for callers that want to wait"""
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job; a queued job never runs, a running job's result is discarded"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["finished_at"] is not None:
+                return False
+            future = self._futures[job_id]
+            if future.cancel():
+                self._finish(job, "cancelled")
+            else:
+                job["status"] = "cancelling"
+            return True
+
+    def _worker(self):
+        while True:
+            job_id, image_path, precheck, cleanup = self._queue.get()
+            try:
+                self._run(job_id, image_path, precheck)
+            except Exception as e:
+                logger.error(f"OCR job {job_id} failed: {e}")
+            finally:
+                if cleanup and os.path.exists(image_path):
+                    os.unlink(image_path)
+                self._queue.task_done()
+
+    def _run(self, job_id: str, image_path: str, precheck: bool):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+            if job is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                # Cancelled through its future while queued
+                if job["finished_at"] is None:
+                    self._finish(job, "cancelled")
+                return
+            job["status"] = "running"
+
+        status, text, text_check, error = "done", None, None, None
+        try:
+            if precheck:
+                text_check = text_likelihood(image_path)
+            if text_check is not None and not text_check["likely_text"]:
+                status = "skipped"
+            elif not TESSERACT_AVAILABLE:
+                status, error = "failed", "Tesseract not available"
+            else:
+                text = self.tesseract_text(image_path, timeout=self.timeout_seconds)
+        except RuntimeError as e:
+            # pytesseract reports its own timeout as a RuntimeError
+            status, error = ("timeout" if "timeout" in str(e).lower() else "failed"), str(e)
+        except Exception as e:
+            status, error = "failed", str(e)
+
+        with self._lock:
+            if job["status"] == "cancelling":
+                status, text = "cancelled", None
+            job["text"] = text
+            job["text_check"] = text_check
+            job["error"] = error
+            self._finish(job, status)
+            future.set_result(dict(job))
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        job["status"] = status
+        job["finished_at"] = datetime.now().isoformat()
+        self._finished[job["job_id"]] = time.time()
+
+    def _prune(self):
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.job_ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, finished in self._finished.items() if finished < cutoff]
+            for job_id in expired:
+                self._finished.pop(job_id)
+                self._jobs.pop(job_id)
+                self._futures.pop(job_id)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Queue configuration and load for health endpoints"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job["status"] == "running")
+        return {
+            "tesseract_available": TESSERACT_AVAILABLE,
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": running,
+            "max_queued": self.max_queued,
+            "timeout_seconds": self.timeout_seconds
+        }
+
+# Global OCR queue; worker threads start on first submit
+ocr_queue = OCRJobQueue()
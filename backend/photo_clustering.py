@@ -171,16 +171,7 @@ class PhotoClusteringEngine:
                 algorithm = analysis["recommended_algorithm"]
             
             # Perform clustering based on algorithm
-            if algorithm == "spatiotemporal":
-                clusters = self._spatiotemporal_clustering(memories)
-            elif algorithm == "multi_feature":
-                clusters = self._multi_feature_clustering(memories)
-            elif algorithm == "visual_clustering":
-                clusters = self._visual_clustering(memories)
-            elif algorithm == "temporal":
-                clusters = self._temporal_clustering(memories)
-            else:
-                clusters = self._simple_grouping(memories)
+            clusters = self.run_clustering(memories, algorithm)
             
             # Create albums from clusters
             albums_created = []
@@ -215,6 +206,19 @@ class PhotoClusteringEngine:
                 "albums_created": 0
             }
     
+    def run_clustering(self, memories: List[Dict[str, Any]], algorithm: str) -> List[List[Dict]]:
+        """Run a single clustering algorithm without creating albums"""
+        if algorithm == "spatiotemporal":
+            return self._spatiotemporal_clustering(memories)
+        elif algorithm == "multi_feature":
+            return self._multi_feature_clustering(memories)
+        elif algorithm == "visual_clustering":
+            return self._visual_clustering(memories)
+        elif algorithm == "temporal":
+            return self._temporal_clustering(memories)
+        else:
+            return self._simple_grouping(memories)
+    
     def _spatiotemporal_clustering(self, memories: List[Dict[str, Any]]) -> List[List[Dict]]:
         """Cluster memories based on space and time proximity"""
         clusters = []
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Photo Folder Watcher for Elmowafiplatform
+Watches configured photo directories (inotify through watchdog where available, polling otherwise),
+waits for bursts of writes to settle, and turns new photos into memories in batches.
+Progress is kept in SQLite so a restart never ingests the same file twice.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    from backend.process_lock import ProcessLock
+except ImportError:
+    from process_lock import ProcessLock
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.heic', '.webp'}
+
+# Directories are separated like PATH entries
+PHOTO_WATCH_DIRS = [d for d in os.getenv("PHOTO_WATCH_DIRS", "").split(os.pathsep) if d]
+DEBOUNCE_SECONDS = float(os.getenv("PHOTO_WATCH_DEBOUNCE_SECONDS", "2"))
+POLL_SECONDS = float(os.getenv("PHOTO_WATCH_POLL_SECONDS", "30"))
+BATCH_SIZE = int(os.getenv("PHOTO_WATCH_BATCH_SIZE", "50"))
+
+def _sha256(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def _taken_at(path: str, fallback: float) -> str:
+    """EXIF capture time as ISO date, else the file's mtime; only headers are read"""
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            taken = exif.get_ifd(0x8769).get(0x9003) or exif.get(0x0132)  # DateTimeOriginal, DateTime
+        if taken:
+            return datetime.strptime(str(taken), "%Y:%m:%d %H:%M:%S").isoformat()
+    except Exception:
+        pass
+    return datetime.fromtimestamp(fallback).isoformat()
+
+def _derivatives(path: str, sha256: str) -> Dict[str, Any]:
+    """Thumbnails for an imported photo; an import still succeeds without them"""
+    try:
+        try:
+            from backend.derivatives import generate_derivatives
+        except ImportError:
+            from derivatives import generate_derivatives
+        return generate_derivatives(path, sha256)
+    except Exception as e:
+        logger.warning(f"Could not generate thumbnails for {path}: {e}")
+        return {}
+
+class IngestProgress:
+    """Durable record of which files have been ingested"""
+
+    def __init__(self, db_path: str = "data/photo_watcher.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                memory_id TEXT,
+                ingested_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ingested_files_sha ON ingested_files(sha256)")
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def is_current(self, path: str, size: int, mtime_ns: int) -> bool:
+        """Whether this exact version of the file was already ingested"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM ingested_files WHERE path = ? AND size = ? AND mtime_ns = ?", (path, size, mtime_ns)
+        ).fetchone()
+        conn.close()
+        return row is not None
+
+    def memory_for_hash(self, sha256: str) -> Optional[str]:
+        """Memory already created for the same content, under any path"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT memory_id FROM ingested_files WHERE sha256 = ? AND memory_id IS NOT NULL LIMIT 1", (sha256,)
+        ).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def record(self, rows: List[Tuple[str, int, int, str, Optional[str]]]):
+        """Mark files ingested: (path, size, mtime_ns, sha256, memory_id)"""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        conn.executemany("""
+            INSERT OR REPLACE INTO ingested_files (path, size, mtime_ns, sha256, memory_id, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [row + (now,) for row in rows])
+        conn.commit()
+        conn.close()
+
+    def count(self) -> int:
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0]
+        conn.close()
+        return total
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog create/modify/move events to the watcher"""
+
+    def __init__(self, watcher: "PhotoWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+class PhotoWatcher:
+    """Continuous ingest of photos dropped into watched directories"""
+
+    def __init__(self, directories: Optional[List[str]] = None, progress: Optional[IngestProgress] = None,
+                 debounce_seconds: float = DEBOUNCE_SECONDS, batch_size: int = BATCH_SIZE,
+                 poll_seconds: float = POLL_SECONDS):
+        self.directories = [os.path.abspath(d) for d in (directories if directories is not None else PHOTO_WATCH_DIRS)]
+        self.progress = progress
+        self.debounce_seconds = debounce_seconds
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+
+        self.data_manager = None
+        self._pending: Dict[str, float] = {}
+        self._ready = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._process_lock: Optional[ProcessLock] = None
+        self.stats = {"ingested": 0, "duplicates": 0, "failed": 0, "batches": 0, "last_batch_at": None}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self, data_manager) -> bool:
+        """Start watching; False when there is nothing to watch or it is already running"""
+        if self.running or not self.directories:
+            return False
+
+        self.data_manager = data_manager
+        if self.progress is None:
+            self.progress = IngestProgress(os.getenv("PHOTO_WATCH_DB", "data/photo_watcher.db"))
+        # Only one process per progress database watches; other server workers skip it
+        if self._process_lock is None:
+            self._process_lock = ProcessLock(self.progress.db_path + ".lock")
+        if not self._process_lock.acquire():
+            logger.info("Another server process is already watching the photo directories")
+            return False
+        self._stop.clear()
+
+        for directory in self.directories:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+
+        if WATCHDOG_AVAILABLE:
+            # watchdog picks inotify on Linux
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self.directories:
+                self._observer.schedule(handler, directory, recursive=True)
+            self._observer.start()
+
+        # The scanner catches up on files added while stopped, and is the only source of events without watchdog
+        self._threads = [
+            threading.Thread(target=self._scan_loop, name="photo-watcher-scan", daemon=True),
+            threading.Thread(target=self._debounce_loop, name="photo-watcher-debounce", daemon=True),
+            threading.Thread(target=self._ingest_loop, name="photo-watcher-ingest", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        logger.info(f"Watching {len(self.directories)} photo directories "
+                    f"({'inotify' if WATCHDOG_AVAILABLE else f'polling every {self.poll_seconds}s'})")
+        return True
+
+    def stop(self):
+        """Stop watching; a batch already being ingested is finished first"""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+        if self._process_lock is not None:
+            self._process_lock.release()
+
+    def notify(self, path: str):
+        """Note activity on a file; it is ingested once it has been quiet for the debounce period"""
+        if Path(path).suffix.lower() in IMAGE_EXTENSIONS:
+            with self._lock:
+                self._pending[os.path.abspath(path)] = time.monotonic()
+
+    def _scan_loop(self):
+        while not self._stop.is_set():
+            for directory in self.directories:
+                for file_path in Path(directory).rglob('*'):
+                    if file_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                        continue
+                    try:
+                        file_stat = file_path.stat()
+                    except OSError:
+                        continue
+                    if not self.progress.is_current(str(file_path), file_stat.st_size, file_stat.st_mtime_ns):
+                        self.notify(str(file_path))
+            # With inotify the scan only needs to run once, at startup
+            if WATCHDOG_AVAILABLE or self._stop.wait(self.poll_seconds):
+                return
+
+    def _debounce_loop(self):
+        while not self._stop.wait(min(self.debounce_seconds / 2, 1.0)):
+            cutoff = time.monotonic() - self.debounce_seconds
+            with self._lock:
+                settled = [path for path, seen in self._pending.items() if seen <= cutoff]
+                for path in settled:
+                    self._pending.pop(path)
+            for path in settled:
+                self._ready.put(path)
+
+    def _ingest_loop(self):
+        # DataManager's API is async; this thread runs its own loop for it
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop.is_set():
+                try:
+                    batch = [self._ready.get(timeout=1.0)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._ready.get_nowait())
+                    except queue.Empty:
+                        break
+                loop.run_until_complete(self._ingest_batch(batch))
+        finally:
+            loop.close()
+
+    async def _ingest_batch(self, paths: List[str]):
+        """Hash the batch and create memories for new content, recording each file as soon as it is done"""
+        try:
+            from backend.blob_store import blob_store
+        except ImportError:
+            from blob_store import blob_store
+
+        done = 0
+        for path in dict.fromkeys(paths):
+            try:
+                file_stat = os.stat(path)
+                if self.progress.is_current(path, file_stat.st_size, file_stat.st_mtime_ns):
+                    continue
+
+                sha256 = _sha256(path)
+                memory_id = self.progress.memory_for_hash(sha256)
+                if memory_id is not None:
+                    # Same photo copied or moved into another folder
+                    self.stats["duplicates"] += 1
+                else:
+                    # The memory's copy lives in the blob store, so deleting the original does not break it
+                    memory_id = str(uuid.uuid4())
+                    stored = blob_store.put_file(path, sha256, owner_id=memory_id)
+                    taken_at = _taken_at(path, file_stat.st_mtime)
+                    memory_id = await self.data_manager.create_memory({
+                        "id": memory_id,
+                        "title": f"Memory from {datetime.fromisoformat(taken_at).strftime('%B %d, %Y')}",
+                        "description": f"Imported from {os.path.basename(path)}",
+                        "date": taken_at,
+                        "imageUrl": str(stored.path),
+                        "imageSha256": sha256,
+                        "tags": ["imported"],
+                        "derivatives": _derivatives(str(stored.path), sha256)
+                    })
+                    self.stats["ingested"] += 1
+
+                # Recorded straight away: a duplicate later in this batch finds it, and a crash
+                # mid-batch does not re-create the memories already made
+                self.progress.record([(path, file_stat.st_size, file_stat.st_mtime_ns, sha256, memory_id)])
+                done += 1
+
+            except FileNotFoundError:
+                # Deleted or renamed before it settled; a rename arrives as its own event
+                continue
+            except Exception as e:
+                logger.error(f"Could not ingest {path}: {e}")
+                self.stats["failed"] += 1
+
+        self.stats["batches"] += 1
+        self.stats["last_batch_at"] = datetime.now().isoformat()
+        if done:
+            logger.info(f"Ingested batch of {done} photos")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Watcher configuration and counters for health endpoints"""
+        with self._lock:
+            debouncing = len(self._pending)
+        return {
+            "running": self.running,
+            "mode": "inotify" if WATCHDOG_AVAILABLE else "polling",
+            "directories": self.directories,
+            "debouncing": debouncing,
+            "queued": self._ready.qsize(),
+            "files_recorded": self.progress.count() if self.progress else 0,
+            **self.stats
+        }
+
+# Global watcher over PHOTO_WATCH_DIRS; started with the server
+photo_watcher = PhotoWatcher()
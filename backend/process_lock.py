@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Single-Process Locks for Elmowafiplatform
+Background services (photo watcher, suggestion refresher) start in every server worker; a non-blocking
+flock on a lock file lets exactly one worker per host run each of them
+"""
+
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class ProcessLock:
+    """Held by at most one process at a time; released on release() or when the process exits"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[IO] = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False when another process holds it"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            # No flock (Windows): run a single worker there
+            return True
+
+        lock_file = open(self.path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            # Closing the file drops the flock
+            self._file.close()
+            self._file = None
@@ -15,7 +15,7 @@ from pathlib import Path
 import uvicorn
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from media_serving import MediaFiles
 from pydantic import BaseModel
 import aiohttp
 import aiofiles
@@ -62,8 +62,8 @@ for directory in [UPLOAD_DIR, MEMORY_DIR, DATA_DIR]:
     directory.mkdir(exist_ok=True)
 
 # Serve static files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-app.mount("/memories", StaticFiles(directory="memories"), name="memories")
+app.mount("/uploads", MediaFiles(directory="uploads"), name="uploads")
+app.mount("/memories", MediaFiles(directory="memories"), name="memories")
 
 # In-memory data storage (for testing)
 family_members = []
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Materialized Memory Suggestions for Elmowafiplatform
+On-this-day, similar memories, gaps and activity ideas are computed for the whole family and for each
+member in one pass over the memories, and stored one row per scope, so a suggestions request is a
+single primary-key read. Memory changes mark the affected scopes stale; a background thread recomputes
+stale scopes shortly after, and everything once a night when the date (and so on-this-day) moves on.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from backend.database import ElmowafyDatabase
+    from backend.process_lock import ProcessLock
+except ImportError:
+    from database import ElmowafyDatabase
+    from process_lock import ProcessLock
+
+logger = logging.getLogger(__name__)
+
+FAMILY_SCOPE = "family"
+SUGGESTION_LIMIT = int(os.getenv("SUGGESTION_LIMIT", "5"))
+GAP_MONTHS = int(os.getenv("SUGGESTION_GAP_MONTHS", "12"))
+
+# Memory fields whose change can alter a suggestion; analysis and thumbnail updates do not
+SUGGESTION_FIELDS = {"title", "date", "location", "tags", "familyMembers", "imageUrl"}
+
+def member_scope(member_id: str) -> str:
+    return f"member:{member_id}"
+
+def _memory_date(memory: Dict[str, Any]) -> Optional[date]:
+    try:
+        return date.fromisoformat((memory.get("date") or "")[:10])
+    except ValueError:
+        return None
+
+def _summary(memory: Dict[str, Any], **extra) -> Dict[str, Any]:
+    return {
+        "id": memory["id"],
+        "title": memory["title"],
+        "date": memory["date"],
+        "location": memory.get("location"),
+        "imageUrl": memory.get("imageUrl"),
+        "thumbnail": (memory.get("derivatives") or {}).get("thumb", {}).get("url"),
+        **extra
+    }
+
+def _features(memory: Dict[str, Any]) -> set:
+    features = {f"tag:{tag}" for tag in memory.get("tags") or []}
+    features.update(f"member:{member}" for member in memory.get("familyMembers") or [])
+    if memory.get("location"):
+        features.add(f"location:{memory['location']}")
+    return features
+
+def on_this_day(memories: List[Dict[str, Any]], target: date, limit: int = SUGGESTION_LIMIT) -> List[Dict[str, Any]]:
+    """Memories from the target's month and day in earlier years, most recent first"""
+    matches = []
+    for memory in memories:
+        memory_date = _memory_date(memory)
+        if memory_date and memory_date.year < target.year and (memory_date.month, memory_date.day) == (target.month, target.day):
+            matches.append((memory_date, memory))
+    matches.sort(key=lambda item: item[0], reverse=True)
+    return [_summary(memory, years_ago=target.year - memory_date.year) for memory_date, memory in matches[:limit]]
+
+def similar_memories(memories: List[Dict[str, Any]], limit: int = SUGGESTION_LIMIT) -> List[Dict[str, Any]]:
+    """Older memories sharing the most tags, people and place with the latest one"""
+    dated = sorted((m for m in memories if _memory_date(m)), key=lambda m: m["date"], reverse=True)
+    if not dated:
+        return []
+    latest = dated[0]
+    latest_features = _features(latest)
+    if not latest_features:
+        return []
+
+    scored = []
+    for memory in dated[1:]:
+        features = _features(memory)
+        shared = latest_features & features
+        if shared:
+            scored.append((len(shared) / len(latest_features | features), memory))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [
+        _summary(memory, similarity=round(score, 3), similar_to=latest["id"])
+        for score, memory in scored[:limit]
+    ]
+
+def memory_gaps(memories: List[Dict[str, Any]], today: date, members: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Recent months without memories and, for the family, members nobody has photographed lately"""
+    months_with_memories = {
+        (memory_date.year, memory_date.month) for memory_date in map(_memory_date, memories) if memory_date
+    }
+    gaps = []
+    year, month = today.year, today.month
+    for _ in range(GAP_MONTHS):
+        if (year, month) not in months_with_memories:
+            gaps.append({
+                "type": "empty_month",
+                "month": f"{year:04d}-{month:02d}",
+                "message": f"No memories from {date(year, month, 1).strftime('%B %Y')} yet"
+            })
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+    if members:
+        since = (today - timedelta(days=180)).isoformat()
+        recently_seen = {
+            member for memory in memories if (memory.get("date") or "") >= since
+            for member in memory.get("familyMembers") or []
+        }
+        for member in members:
+            if member["id"] not in recently_seen:
+                gaps.append({
+                    "type": "member_absent",
+                    "member_id": member["id"],
+                    "message": f"No memories with {member['name']} in the last six months"
+                })
+    return gaps
+
+def suggested_activities(memories: List[Dict[str, Any]], limit: int = SUGGESTION_LIMIT) -> List[str]:
+    """Activity ideas drawn from the places and themes that recur in the memories"""
+    activities = []
+    locations = Counter(memory["location"] for memory in memories if memory.get("location"))
+    for location, count in locations.most_common(2):
+        if count > 1:
+            activities.append(f"Plan another visit to {location} - it appears in {count} memories")
+    tags = Counter(tag for memory in memories for tag in memory.get("tags") or [])
+    for tag, count in tags.most_common(2):
+        if count > 1:
+            activities.append(f"Capture more '{tag}' moments together")
+    if not activities:
+        activities = [
+            "Plan a family photo session to capture new memories",
+            "Add dates, places and people to your memories for better suggestions"
+        ]
+    return activities[:limit]
+
+def family_connections(memories: List[Dict[str, Any]], member_id: str, names: Dict[str, str],
+                       limit: int = SUGGESTION_LIMIT) -> List[Dict[str, Any]]:
+    """Who appears most often alongside a member"""
+    together = Counter(
+        other for memory in memories for other in memory.get("familyMembers") or [] if other != member_id
+    )
+    return [
+        {"member_id": other, "name": names.get(other, other), "shared_memories": count}
+        for other, count in together.most_common(limit)
+    ]
+
+class SuggestionMaterializer:
+    """materialized_suggestions table: one precomputed suggestion set per family or member scope"""
+
+    def __init__(self, db_path: str = "data/elmowafiplatform.db"):
+        self.db_path = db_path
+        self.database = ElmowafyDatabase(db_path)
+        self.refresh_interval = float(os.getenv("SUGGESTION_REFRESH_SECONDS", "30"))
+        self.nightly_hour = int(os.getenv("SUGGESTION_NIGHTLY_HOUR", "0"))
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_full_refresh: Optional[date] = None
+        # One refresher per database, however many server workers start one
+        self._process_lock = ProcessLock(db_path + ".suggestions.lock")
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS materialized_suggestions (
+                scope TEXT PRIMARY KEY,
+                suggestions TEXT NOT NULL,
+                computed_for TEXT NOT NULL,
+                computed_at TEXT NOT NULL,
+                stale INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_materialized_suggestions_stale ON materialized_suggestions(stale) WHERE stale = 1")
+        # On-this-day for an arbitrary date is an index lookup on the date's "MM-DD"
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_month_day ON memories(substr(date, 6, 5))")
+        conn.commit()
+        conn.close()
+
+    def get(self, family_member: Optional[str] = None, target_date: Optional[str] = None) -> Dict[str, Any]:
+        """Stored suggestions for a member, or the family; stale rows are served while a refresh is pending
+
+        Raises ValueError for a target_date that is not an ISO date.
+        """
+        scope = member_scope(family_member) if family_member else FAMILY_SCOPE
+        today = date.today()
+        target = date.fromisoformat(target_date[:10]) if target_date else today
+
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT suggestions, computed_for, computed_at, stale FROM materialized_suggestions WHERE scope = ?", (scope,)
+        ).fetchone()
+        conn.close()
+
+        if row is None or row[1] < today.isoformat():
+            # First request for a scope (e.g. a new member), or the first today before the nightly run
+            suggestions = self.refresh([scope])[scope]
+            computed_at, stale = datetime.now().isoformat(), False
+        else:
+            suggestions = json.loads(row[0])
+            computed_at, stale = row[2], bool(row[3])
+
+        if target != today:
+            # Only today's on-this-day is materialized; other dates use the month-day index
+            suggestions["on_this_day"] = on_this_day(self._memories_on_month_day(target, family_member), target)
+
+        return {**suggestions, "scope": scope, "computed_at": computed_at, "stale": stale}
+
+    def invalidate(self, member_ids: Iterable[str] = ()):
+        """Mark the family scope and the given members' scopes stale and wake the refresher"""
+        scopes = [FAMILY_SCOPE] + [member_scope(member_id) for member_id in member_ids]
+        conn = self._connect()
+        conn.executemany("UPDATE materialized_suggestions SET stale = 1 WHERE scope = ?", [(scope,) for scope in scopes])
+        conn.commit()
+        conn.close()
+        self._wake.set()
+
+    def memory_members(self, memory_id: str) -> List[str]:
+        """Members tagged on a stored memory, for invalidating before it is changed or deleted"""
+        conn = self._connect()
+        row = conn.execute("SELECT family_members FROM memories WHERE id = ?", (memory_id,)).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def _memories_on_month_day(self, target: date, member_id: Optional[str]) -> List[Dict[str, Any]]:
+        query = ("SELECT id, title, date, location, image_url, family_members, derivatives FROM memories "
+                 "WHERE substr(date, 6, 5) = ? AND date < ?")
+        params = [target.strftime("%m-%d"), f"{target.year:04d}"]
+        if member_id:
+            query += " AND family_members LIKE ?"
+            params.append(f'%"{member_id}"%')
+
+        conn = self._connect()
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+
+        memories = [{
+            "id": row[0],
+            "title": row[1],
+            "date": row[2],
+            "location": row[3],
+            "imageUrl": row[4],
+            "familyMembers": json.loads(row[5]) if row[5] else [],
+            "derivatives": json.loads(row[6]) if row[6] else {}
+        } for row in rows]
+        return self._scope_memories(memories, member_id)
+
+    def _scope_memories(self, memories: List[Dict[str, Any]], member_id: Optional[str]) -> List[Dict[str, Any]]:
+        if member_id is None:
+            return memories
+        return [memory for memory in memories if member_id in (memory.get("familyMembers") or [])]
+
+    def refresh(self, scopes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Recompute the given scopes, or the family and every member, from one read of the memories"""
+        memories = self.database.get_memories()
+        members = self.database.get_family_members()
+        names = {member["id"]: member["name"] for member in members}
+        if scopes is None:
+            scopes = [FAMILY_SCOPE] + [member_scope(member["id"]) for member in members]
+
+        today = date.today()
+        computed = {}
+        for scope in scopes:
+            member_id = None if scope == FAMILY_SCOPE else scope.split(":", 1)[1]
+            scoped = self._scope_memories(memories, member_id)
+            suggestions = {
+                "on_this_day": on_this_day(scoped, today),
+                "similar_memories": similar_memories(scoped),
+                "memory_gaps": memory_gaps(scoped, today, members if member_id is None else None),
+                "suggested_activities": suggested_activities(scoped),
+                "memory_count": len(scoped)
+            }
+            if member_id is not None:
+                suggestions["family_connections"] = family_connections(scoped, member_id, names)
+            computed[scope] = suggestions
+
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO materialized_suggestions (scope, suggestions, computed_for, computed_at, stale) "
+            "VALUES (?, ?, ?, ?, 0)",
+            [(scope, json.dumps(suggestions), today.isoformat(), now) for scope, suggestions in computed.items()]
+        )
+        conn.commit()
+        conn.close()
+
+        logger.info(f"Materialized suggestions for {len(computed)} scopes from {len(memories)} memories")
+        return computed
+
+    def refresh_stale(self) -> int:
+        """Recompute only the scopes memory changes have marked stale"""
+        conn = self._connect()
+        scopes = [scope for (scope,) in conn.execute("SELECT scope FROM materialized_suggestions WHERE stale = 1")]
+        conn.close()
+        if scopes:
+            self.refresh(scopes)
+        return len(scopes)
+
+    def start(self) -> bool:
+        """Start the background refresher; False when another process already runs it
+
+        Only that process's thread is woken by its own invalidations; stale rows marked by other
+        workers are picked up within refresh_interval.
+        """
+        if self._thread and self._thread.is_alive():
+            return False
+        if not self._process_lock.acquire():
+            logger.info("Another server process is already refreshing memory suggestions")
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="suggestion-materializer", daemon=True)
+        self._thread.start()
+        logger.info("Suggestion materializer started")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._process_lock.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                now = datetime.now()
+                if self._last_full_refresh is None or (
+                        self._last_full_refresh < now.date() and now.hour >= self.nightly_hour):
+                    self.refresh()
+                    self._last_full_refresh = now.date()
+                else:
+                    self.refresh_stale()
+            except Exception as e:
+                logger.error(f"Error materializing suggestions: {e}")
+
+            self._wake.wait(self.refresh_interval)
+            if self._wake.is_set():
+                # Let a burst of memory changes settle into one refresh
+                self._stop.wait(2)
+                self._wake.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        conn = self._connect()
+        scopes, stale = conn.execute("SELECT COUNT(*), COALESCE(SUM(stale), 0) FROM materialized_suggestions").fetchone()
+        conn.close()
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "scopes": scopes,
+            "stale_scopes": stale,
+            "last_full_refresh": self._last_full_refresh.isoformat() if self._last_full_refresh else None
+        }
+
+# Global materializer over the main platform database
+memory_suggestions = SuggestionMaterializer(os.getenv("SUGGESTION_DB_PATH", "data/elmowafiplatform.db"))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed blob store
+Deduplication, per-owner references, per-family lookups and deletion on last release
+"""
+
+import asyncio
+import hashlib
+import io
+import sqlite3
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiofiles")
+
+from fastapi import HTTPException, UploadFile
+
+from backend.blob_store import BlobStore
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60 + b"photo one"
+OTHER_JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60 + b"photo two"
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class TestBlobStore:
+    """Test BlobStore"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return BlobStore(str(tmp_path / "blobs"), str(tmp_path / "blobs.db"))
+
+    def write(self, tmp_path, name, data):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+
+    def upload(self, store, data, owner_id=None, **kwargs):
+        return asyncio.run(store.put_upload(UploadFile(io.BytesIO(data), filename="photo.jpg"), owner_id=owner_id, **kwargs))
+
+    def leftover_temp_files(self, store):
+        return [path for path in store.root.rglob("*") if path.name.startswith(".")]
+
+    def test_put_file_stores_sharded_by_hash(self, store, tmp_path):
+        source = self.write(tmp_path, "a.jpg", JPEG)
+        sha = sha256(JPEG)
+
+        stored = store.put_file(source, sha, owner_id="memory-1")
+
+        assert stored.path == store.root / sha[:2] / sha[2:4] / f"{sha}.jpeg"
+        assert stored.path.read_bytes() == JPEG
+        assert stored.kind == "jpeg"
+        assert store.ref_count(sha) == 1
+        assert store.get(sha).path == stored.path
+
+    def test_put_file_copies_the_source(self, store, tmp_path):
+        """Editing the watched original afterwards leaves the stored content alone"""
+        source = self.write(tmp_path, "a.jpg", JPEG)
+        stored = store.put_file(source, sha256(JPEG), owner_id="memory-1")
+
+        self.write(tmp_path, "a.jpg", OTHER_JPEG)
+
+        assert stored.path.read_bytes() == JPEG
+
+    def test_duplicate_content_is_stored_once(self, store, tmp_path):
+        first = store.put_file(self.write(tmp_path, "a.jpg", JPEG), sha256(JPEG), owner_id="memory-1")
+        second = store.put_file(self.write(tmp_path, "b.jpg", JPEG), sha256(JPEG), owner_id="memory-2")
+
+        assert second.path == first.path
+        assert store.ref_count(sha256(JPEG)) == 2
+        assert store.get_stats() == {"blobs": 1, "stored_bytes": len(JPEG), "references": 2}
+        assert self.leftover_temp_files(store) == []
+
+    def test_references_are_per_owner(self, store, tmp_path):
+        source = self.write(tmp_path, "a.jpg", JPEG)
+        store.put_file(source, sha256(JPEG), owner_id="memory-1")
+        store.put_file(source, sha256(JPEG), owner_id="memory-1")
+
+        assert store.ref_count(sha256(JPEG)) == 1
+        assert store.has_ref(sha256(JPEG), "memory-1")
+        assert not store.has_ref(sha256(JPEG), "memory-2")
+
+    def test_release_deletes_only_unreferenced_blobs(self, store, tmp_path):
+        shared = store.put_file(self.write(tmp_path, "a.jpg", JPEG), sha256(JPEG), owner_id="memory-1")
+        store.put_file(self.write(tmp_path, "c.jpg", JPEG), sha256(JPEG), owner_id="memory-2")
+        own = store.put_file(self.write(tmp_path, "b.jpg", OTHER_JPEG), sha256(OTHER_JPEG), owner_id="memory-1")
+
+        assert store.release_owner("memory-1") == 1
+
+        assert shared.path.exists()
+        assert not own.path.exists()
+        assert store.get(sha256(OTHER_JPEG)) is None
+        assert store.ref_count(sha256(JPEG)) == 1
+
+        assert store.release_owner("memory-2") == 1
+        assert not shared.path.exists()
+        assert store.get_stats() == {"blobs": 0, "stored_bytes": 0, "references": 0}
+
+    def test_release_unknown_owner(self, store):
+        assert store.release_owner("nobody") == 0
+
+    def test_unknown_blob(self, store):
+        assert store.get(sha256(JPEG)) is None
+        assert store.get("not-a-hash") is None
+        assert not store.has_ref(sha256(JPEG), "memory-1")
+
+    def test_released_blob_is_gone(self, store, tmp_path):
+        store.put_file(self.write(tmp_path, "a.jpg", JPEG), sha256(JPEG), owner_id="memory-1")
+        store.release_owner("memory-1")
+
+        assert store.get(sha256(JPEG)) is None
+        assert not store.has_ref(sha256(JPEG), "memory-1")
+
+    def test_lookups_are_scoped_per_family(self, store):
+        """A family only finds blobs its own memories reference, even when another family stored the content"""
+        stored = self.upload(store, JPEG, owner_id="memory-1", family_id="family-a")
+
+        assert store.get(sha256(JPEG), "family-a").path == stored.path
+        assert store.get(sha256(JPEG), "family-b") is None
+        assert store.get(sha256(JPEG)) is None
+
+        # Sending the bytes is what grants the second family its reference
+        again = self.upload(store, JPEG, owner_id="memory-2", family_id="family-b")
+        assert again.path == stored.path
+        assert store.get(sha256(JPEG), "family-b").path == stored.path
+        assert store.get_stats()["blobs"] == 1
+
+    def test_family_column_is_added_to_old_indexes(self, tmp_path):
+        db_path = str(tmp_path / "blobs.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE blob_refs (sha256 TEXT NOT NULL, owner_id TEXT NOT NULL, "
+                     "created_at TEXT NOT NULL, PRIMARY KEY (sha256, owner_id))")
+        conn.execute("INSERT INTO blob_refs VALUES (?, 'memory-1', '2024-01-01')", (sha256(JPEG),))
+        conn.commit()
+        conn.close()
+
+        store = BlobStore(str(tmp_path / "blobs"), db_path)
+
+        assert store.ref_count(sha256(JPEG)) == 1
+        stored = self.upload(store, JPEG, owner_id="memory-2", family_id="family-a")
+        assert store.get(sha256(JPEG), "family-a").path == stored.path
+
+    def test_missing_file_is_not_served(self, store, tmp_path):
+        stored = store.put_file(self.write(tmp_path, "a.jpg", JPEG), sha256(JPEG), owner_id="memory-1")
+        stored.path.unlink()
+
+        assert store.get(sha256(JPEG)) is None
+
+    def test_put_upload_deduplicates(self, store):
+        first = self.upload(store, JPEG, owner_id="memory-1")
+        second = self.upload(store, JPEG, owner_id="memory-2")
+
+        assert first.sha256 == second.sha256 == sha256(JPEG)
+        assert second.path == first.path
+        assert store.ref_count(sha256(JPEG)) == 2
+        assert self.leftover_temp_files(store) == []
+
+    def test_put_stream_deduplicates_with_uploads(self, store):
+        first = self.upload(store, JPEG, owner_id="memory-1")
+        second = store.put_stream(io.BytesIO(JPEG), owner_id="memory-2")
+
+        assert second.path == first.path
+        assert store.ref_count(sha256(JPEG)) == 2
+        assert self.leftover_temp_files(store) == []
+
+    def test_put_upload_without_owner_takes_no_reference(self, store):
+        stored = self.upload(store, JPEG)
+
+        assert stored.path.exists()
+        assert store.ref_count(sha256(JPEG)) == 0
+
+    def test_rejected_upload_leaves_nothing_behind(self, store):
+        with pytest.raises(HTTPException) as error:
+            self.upload(store, b"plain text, not an image" * 4, owner_id="memory-1")
+
+        assert error.value.status_code == 415
+        assert self.leftover_temp_files(store) == []
+        assert store.get_stats() == {"blobs": 0, "stored_bytes": 0, "references": 0}
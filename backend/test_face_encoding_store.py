@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped face encoding store
+Append growth, tombstones and compaction, and legacy pickle migration
+"""
+
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.face_encoding_store import FaceEncodingStore, REMOVED_LABEL
+
+def encodings(count, value, dim=4):
+    return [np.full(dim, value + i, dtype=np.float32) for i in range(count)]
+
+class TestFaceEncodingStore:
+    """Test FaceEncodingStore"""
+
+    def make_store(self, tmp_path, **kwargs):
+        return FaceEncodingStore(str(tmp_path / "encodings"), dim=4, **kwargs)
+
+    def test_append_grows_capacity_and_keeps_rows(self, tmp_path):
+        """Growing past the initial capacity copies existing rows into the larger files"""
+        store = self.make_store(tmp_path, initial_capacity=2)
+
+        assert store.append("ahmed", encodings(2, 1.0)) == 2
+        assert store.capacity == 2
+        assert store.append("sara", encodings(3, 10.0)) == 3
+
+        assert store.capacity >= 5
+        assert len(store) == 5
+        assert store.member_counts() == {"ahmed": 2, "sara": 3}
+        np.testing.assert_array_equal(store.encodings_for("ahmed"), np.asarray(encodings(2, 1.0)))
+        np.testing.assert_array_equal(store.encodings_for("sara"), np.asarray(encodings(3, 10.0)))
+
+    def test_append_nothing_is_a_no_op(self, tmp_path):
+        store = self.make_store(tmp_path)
+        assert store.append("ahmed", []) == 0
+        assert len(store) == 0
+        assert store.matrix().shape == (0, 4)
+
+    def test_second_instance_sees_appends(self, tmp_path):
+        """Another worker's store picks up new rows through meta.json"""
+        writer = self.make_store(tmp_path)
+        reader = self.make_store(tmp_path)
+
+        writer.append("ahmed", encodings(3, 1.0))
+
+        assert reader.count_for("ahmed") == 3
+        assert reader.members == ["ahmed"]
+
+    def test_remove_member_tombstones_rows(self, tmp_path):
+        """Removed rows stay in the matrix until more than half the store is dead"""
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(1, 1.0))
+        store.append("sara", encodings(3, 10.0))
+
+        assert store.remove_member("ahmed") == 1
+
+        assert store.count == 4
+        assert store.removed_count() == 1
+        assert len(store) == 3
+        assert store.count_for("ahmed") == 0
+        assert int(np.count_nonzero(store.labels() == REMOVED_LABEL)) == 1
+        assert store.member_counts() == {"sara": 3}
+
+    def test_remove_unknown_member(self, tmp_path):
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(1, 1.0))
+        assert store.remove_member("nobody") == 0
+        assert len(store) == 1
+
+    def test_remove_member_compacts_when_mostly_tombstones(self, tmp_path):
+        """Removing most rows rewrites the store and bumps the generation"""
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(3, 1.0))
+        store.append("sara", encodings(1, 10.0))
+        generation = store.generation
+
+        assert store.remove_member("ahmed") == 3
+
+        assert store.count == 1
+        assert store.removed_count() == 0
+        assert store.generation == generation + 1
+        np.testing.assert_array_equal(store.encodings_for("sara"), np.asarray(encodings(1, 10.0)))
+
+    def test_compact_keeps_live_rows_in_order(self, tmp_path):
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(2, 1.0))
+        store.append("sara", encodings(2, 10.0))
+        store.append("omar", encodings(2, 20.0))
+        store.remove_member("sara")
+
+        store.compact()
+
+        assert store.count == 4
+        assert store.member_counts() == {"ahmed": 2, "omar": 2}
+        np.testing.assert_array_equal(
+            store.matrix(), np.asarray(encodings(2, 1.0) + encodings(2, 20.0))
+        )
+
+    def test_training_data_respects_min_samples(self, tmp_path):
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(3, 1.0))
+        store.append("sara", encodings(1, 10.0))
+
+        X, y = store.training_data(min_samples=2)
+
+        assert X.shape == (3, 4)
+        assert list(y) == ["ahmed"] * 3
+
+    def test_import_legacy(self, tmp_path):
+        store = self.make_store(tmp_path)
+        imported = store.import_legacy({"ahmed": encodings(2, 1.0), "sara": encodings(1, 10.0)})
+        assert imported == 3
+        assert store.member_counts() == {"ahmed": 2, "sara": 1}
+
+    def test_trainer_migrates_legacy_pickle(self, tmp_path):
+        """The old face_encodings.pkl is imported once and renamed, skipping members already in the store"""
+        pytest.importorskip("cv2")
+        pytest.importorskip("sklearn")
+        from backend.facial_recognition_trainer import FamilyFaceTrainer
+
+        store = self.make_store(tmp_path)
+        store.append("ahmed", encodings(1, 1.0))
+        legacy_path = tmp_path / "face_encodings.pkl"
+        with open(legacy_path, "wb") as f:
+            pickle.dump({"ahmed": encodings(2, 5.0), "sara": encodings(2, 10.0)}, f)
+
+        FamilyFaceTrainer._migrate_legacy_encodings(SimpleNamespace(encoding_store=store), legacy_path)
+
+        assert not legacy_path.exists()
+        assert legacy_path.with_suffix(".pkl.migrated").exists()
+        assert store.member_counts() == {"ahmed": 1, "sara": 2}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the nearest-neighbour face matcher
+Results are checked against a brute-force distance search over the same encodings
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.face_encoding_store import FaceEncodingStore
+from backend.face_matcher import NearestNeighbourMatcher
+
+DIM = 8
+MEMBERS = ["ahmed", "sara", "omar", "layla", "yusuf"]
+
+def brute_force(store, query, k, threshold):
+    """Reference k-NN: Euclidean distance to every live row, distance-weighted vote within the threshold"""
+    labels = np.asarray(store.labels())
+    live = np.flatnonzero(labels >= 0)
+    if len(live) == 0:
+        return None, None
+
+    distances = np.linalg.norm(np.asarray(store.matrix())[live] - query, axis=1)
+    order = np.argsort(distances)[:k]
+    if distances[order[0]] > threshold:
+        return None, float(distances[order[0]])
+
+    votes, closest = {}, {}
+    for row in order:
+        if distances[row] > threshold:
+            break
+        member = store.members[labels[live[row]]]
+        votes[member] = votes.get(member, 0.0) + 1.0 / (distances[row] + 1e-6)
+        closest.setdefault(member, float(distances[row]))
+
+    winner = max(votes, key=votes.get)
+    return winner, closest[winner]
+
+class TestNearestNeighbourMatcher:
+    """Test NearestNeighbourMatcher"""
+
+    def make_store(self, tmp_path, per_member=6):
+        rng = np.random.default_rng(7)
+        self.centers = {member: rng.normal(0.0, 3.0, DIM).astype(np.float32) for member in MEMBERS}
+        store = FaceEncodingStore(str(tmp_path / "encodings"), dim=DIM)
+        for member, center in self.centers.items():
+            store.append(member, list(center + rng.normal(0.0, 0.05, (per_member, DIM)).astype(np.float32)))
+        self.rng = rng
+        return store
+
+    def queries(self):
+        """One query near each member plus two far from everyone"""
+        near = [center + self.rng.normal(0.0, 0.05, DIM) for center in self.centers.values()]
+        far = [np.full(DIM, 50.0), np.full(DIM, -50.0)]
+        return np.asarray(near + far, dtype=np.float32)
+
+    def assert_matches_brute_force(self, matcher, store, queries):
+        results = matcher.match(queries)
+        assert len(results) == len(queries)
+        for query, result in zip(queries, results):
+            expected_member, expected_distance = brute_force(store, query, matcher.k, matcher.distance_threshold)
+            assert result["family_member_id"] == expected_member
+            if expected_distance is None:
+                assert result["distance"] is None
+            else:
+                assert result["distance"] == pytest.approx(expected_distance, abs=1e-3)
+
+    def test_matches_brute_force(self, tmp_path):
+        store = self.make_store(tmp_path)
+        matcher = NearestNeighbourMatcher(store, k=3)
+        queries = self.queries()
+
+        self.assert_matches_brute_force(matcher, store, queries)
+
+        results = matcher.match(queries)
+        assert [r["family_member_id"] for r in results] == MEMBERS + [None, None]
+        assert all(0.0 < r["confidence"] <= 1.0 for r in results[:len(MEMBERS)])
+
+    def test_centroid_pruning_matches_brute_force(self, tmp_path):
+        """Comparing against the nearest two people only gives the same answers for well-separated faces"""
+        store = self.make_store(tmp_path)
+        matcher = NearestNeighbourMatcher(store, k=3, centroid_candidates=2)
+
+        self.assert_matches_brute_force(matcher, store, self.queries())
+
+    def test_incremental_norms_after_append(self, tmp_path):
+        """Rows appended after the index was built are matched the same as a fresh index would"""
+        store = self.make_store(tmp_path)
+        matcher = NearestNeighbourMatcher(store, k=3)
+        matcher.match(self.queries())
+
+        newcomer = np.full(DIM, 20.0, dtype=np.float32)
+        store.append("noor", [newcomer, newcomer + 0.01])
+        queries = np.vstack([self.queries(), newcomer[None, :]])
+
+        self.assert_matches_brute_force(matcher, store, queries)
+        assert matcher.match(newcomer)[0]["family_member_id"] == "noor"
+
+    def test_removed_members_are_not_matched(self, tmp_path):
+        store = self.make_store(tmp_path)
+        matcher = NearestNeighbourMatcher(store, k=3)
+        matcher.match(self.queries())
+
+        store.remove_member("sara")
+        queries = self.queries()
+
+        self.assert_matches_brute_force(matcher, store, queries)
+        assert matcher.match(queries[1])[0]["family_member_id"] is None
+
+    def test_empty_store_reports_unknown(self, tmp_path):
+        store = FaceEncodingStore(str(tmp_path / "encodings"), dim=DIM)
+        matcher = NearestNeighbourMatcher(store)
+
+        results = matcher.match(np.zeros((2, DIM), dtype=np.float32))
+
+        assert [r["family_member_id"] for r in results] == [None, None]
+        assert all(r["distance"] is None for r in results)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged ingest pipeline
+Stage chaining, retries, failures and backpressure from full queues
+"""
+
+import asyncio
+
+from backend.ingest_pipeline import IngestPipeline, Stage
+
+async def settle(condition, timeout=2.0):
+    """Yield to the workers until condition() holds"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "pipeline did not settle"
+        await asyncio.sleep(0.005)
+
+class TestIngestPipeline:
+    """Test IngestPipeline"""
+
+    def test_job_passes_through_every_stage(self):
+        seen = []
+
+        def record(name):
+            async def handler(job):
+                seen.append((name, job["id"]))
+            return handler
+
+        async def scenario():
+            pipeline = IngestPipeline("test", [
+                Stage("store", record("store")),
+                Stage("analyse", record("analyse"))
+            ])
+            assert await pipeline.submit({"id": "a"})
+            await settle(lambda: pipeline.completed == 1)
+            await pipeline.stop()
+            return pipeline
+
+        pipeline = asyncio.run(scenario())
+
+        assert seen == [("store", "a"), ("analyse", "a")]
+        metrics = pipeline.get_metrics()
+        assert metrics["running"] is False
+        assert metrics["stages"]["store"]["processed"] == 1
+        assert metrics["stages"]["analyse"]["processed"] == 1
+
+    def test_returning_false_ends_the_job(self):
+        analysed = []
+
+        async def skip(job):
+            return False
+
+        async def analyse(job):
+            analysed.append(job["id"])
+
+        async def scenario():
+            pipeline = IngestPipeline("test", [Stage("store", skip), Stage("analyse", analyse)])
+            await pipeline.submit({"id": "a"})
+            await settle(lambda: pipeline.completed == 1)
+            await pipeline.stop()
+
+        asyncio.run(scenario())
+        assert analysed == []
+
+    def test_retries_until_success(self):
+        attempts = []
+
+        async def flaky(job):
+            attempts.append(job["id"])
+            if len(attempts) < 3:
+                raise IOError("disk busy")
+
+        async def scenario():
+            pipeline = IngestPipeline("test", [Stage("store", flaky, max_retries=2, retry_delay=0)])
+            await pipeline.submit({"id": "a"})
+            await settle(lambda: pipeline.completed == 1)
+            await pipeline.stop()
+            return pipeline
+
+        pipeline = asyncio.run(scenario())
+
+        assert attempts == ["a", "a", "a"]
+        stage = pipeline.get_metrics()["stages"]["store"]
+        assert stage["retried"] == 2
+        assert stage["failed"] == 0
+        assert pipeline.failed == 0
+
+    def test_exhausted_retries_fail_the_job(self):
+        analysed = []
+
+        async def broken(job):
+            raise ValueError("unreadable image")
+
+        async def analyse(job):
+            analysed.append(job["id"])
+
+        async def scenario():
+            pipeline = IngestPipeline("test", [
+                Stage("store", broken, max_retries=1, retry_delay=0),
+                Stage("analyse", analyse)
+            ])
+            await pipeline.submit({"id": "a"})
+            await settle(lambda: pipeline.failed == 1)
+            await pipeline.stop()
+            return pipeline
+
+        pipeline = asyncio.run(scenario())
+
+        assert analysed == []
+        assert pipeline.completed == 0
+        assert pipeline.get_metrics()["stages"]["store"]["failed"] == 1
+        failure = pipeline.recent_failures[0]
+        assert failure["job_id"] == "a"
+        assert failure["stage"] == "store"
+        assert failure["error"] == "unreadable image"
+
+    def test_full_downstream_queue_pushes_back_on_submit(self):
+        """A stalled last stage fills every queue in turn until submit times out"""
+        async def scenario():
+            release = asyncio.Event()
+
+            async def store(job):
+                pass
+
+            async def analyse(job):
+                await release.wait()
+
+            pipeline = IngestPipeline("test", [
+                Stage("store", store, queue_size=1),
+                Stage("analyse", analyse, queue_size=1)
+            ])
+            analyse_stage = pipeline.stages[1]
+
+            # Job 1 runs in analyse, job 2 waits in its queue, job 3 holds the store worker
+            # at the full analyse queue and job 4 fills the store queue
+            for job_id in range(1, 5):
+                assert await pipeline.submit({"id": job_id}, timeout=1)
+                await asyncio.sleep(0.01)
+            await settle(lambda: analyse_stage.busy == 1 and analyse_stage.queue.full())
+
+            rejected = await pipeline.submit({"id": 5}, timeout=0.05)
+            depths = {name: stage["queue_depth"] for name, stage in pipeline.get_metrics()["stages"].items()}
+
+            release.set()
+            await pipeline.stop(drain_timeout=2)
+            return pipeline, rejected, depths
+
+        pipeline, rejected, depths = asyncio.run(scenario())
+
+        assert rejected is False
+        assert depths == {"store": 1, "analyse": 1}
+        assert pipeline.completed == 4
+
+    def test_stop_without_start(self):
+        async def handler(job):
+            pass
+
+        pipeline = IngestPipeline("test", [Stage("store", handler)])
+        asyncio.run(pipeline.stop())
+        assert pipeline.get_metrics()["running"] is False
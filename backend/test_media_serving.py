@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Tests for media file responses
+Range parsing, conditional requests (304), unsatisfiable ranges (416) and If-Range
+"""
+
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException, Request
+
+from backend.media_serving import _parse_range, file_response, media_file_response
+
+BODY = bytes(range(256)) * 4  # 1024 bytes
+
+def make_request(headers=None, method="GET"):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "extensions": {}
+    }
+    return Request(scope)
+
+def send_response(response, request):
+    """Run the ASGI response and return (status, headers, body, messages)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(request.scope, receive, send))
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:] if m["type"] == "http.response.body")
+    return start["status"], headers, body, messages
+
+class TestParseRange:
+    """Test _parse_range"""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 1023)),
+        ("bytes=1000-5000", (1000, 1023)),
+        ("bytes=-100", (924, 1023)),
+        ("bytes=-5000", (0, 1023)),
+        (" bytes=5-5 ", (5, 5)),
+    ])
+    def test_satisfiable(self, header, expected):
+        assert _parse_range(header, 1024) == expected
+
+    @pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=-0"])
+    def test_unsatisfiable(self, header):
+        assert _parse_range(header, 1024) is None
+
+    @pytest.mark.parametrize("header", ["bytes=-", "bytes=0-1,5-6", "items=0-5", "bytes=a-b", "bytes=10-5", "bytes=2000-1000", ""])
+    def test_malformed(self, header):
+        with pytest.raises(ValueError):
+            _parse_range(header, 1024)
+
+class TestFileResponse:
+    """Test file_response"""
+
+    @pytest.fixture
+    def media(self, tmp_path):
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(BODY)
+        return path
+
+    def respond(self, path, headers=None, method="GET", **kwargs):
+        request = make_request(headers, method=method)
+        return send_response(file_response(request, path, **kwargs), request)
+
+    def validators(self, path):
+        _, headers, _, _ = self.respond(path)
+        return headers["etag"], headers["last-modified"]
+
+    def test_full_file(self, media):
+        status, headers, body, _ = self.respond(media)
+
+        assert status == 200
+        assert body == BODY
+        assert headers["content-length"] == str(len(BODY))
+        assert headers["accept-ranges"] == "bytes"
+        assert headers["content-type"] == "video/mp4"
+        assert "must-revalidate" in headers["cache-control"]
+
+    def test_immutable_cache_control(self, media):
+        _, headers, _, _ = self.respond(media, immutable=True, etag='"abc"')
+        assert headers["etag"] == '"abc"'
+        assert "immutable" in headers["cache-control"]
+
+    def test_if_none_match_returns_304(self, media):
+        etag, _ = self.validators(media)
+
+        status, headers, body, _ = self.respond(media, {"If-None-Match": f'"other", W/{etag}'})
+
+        assert status == 304
+        assert body == b""
+        assert headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self, media):
+        _, last_modified = self.validators(media)
+        assert self.respond(media, {"If-Modified-Since": last_modified})[0] == 304
+
+    def test_if_none_match_mismatch_ignores_if_modified_since(self, media):
+        """A stale etag wins over a current date"""
+        _, last_modified = self.validators(media)
+        status, _, body, _ = self.respond(media, {"If-None-Match": '"stale"', "If-Modified-Since": last_modified})
+        assert status == 200
+        assert body == BODY
+
+    def test_range_returns_206(self, media):
+        status, headers, body, _ = self.respond(media, {"Range": "bytes=10-19"})
+
+        assert status == 206
+        assert body == BODY[10:20]
+        assert headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+        assert headers["content-length"] == "10"
+
+    def test_suffix_range(self, media):
+        status, _, body, _ = self.respond(media, {"Range": "bytes=-4"})
+        assert status == 206
+        assert body == BODY[-4:]
+
+    def test_unsatisfiable_range_returns_416(self, media):
+        status, headers, body, _ = self.respond(media, {"Range": "bytes=5000-"})
+
+        assert status == 416
+        assert headers["content-range"] == f"bytes */{len(BODY)}"
+        assert body == b""
+
+    @pytest.mark.parametrize("header", ["bytes=0-1,5-6", "bytes=5-2"])
+    def test_malformed_range_sends_whole_file(self, media, header):
+        status, _, body, _ = self.respond(media, {"Range": header})
+        assert status == 200
+        assert body == BODY
+
+    def test_if_range_matching_etag_honours_range(self, media):
+        etag, _ = self.validators(media)
+        status, _, body, _ = self.respond(media, {"Range": "bytes=0-3", "If-Range": etag})
+        assert status == 206
+        assert body == BODY[:4]
+
+    def test_if_range_matching_date_honours_range(self, media):
+        _, last_modified = self.validators(media)
+        assert self.respond(media, {"Range": "bytes=0-3", "If-Range": last_modified})[0] == 206
+
+    def test_if_range_mismatch_sends_whole_file(self, media):
+        """The client's partial copy is stale, so it gets the current file instead of a range of it"""
+        status, headers, body, _ = self.respond(media, {"Range": "bytes=0-3", "If-Range": '"stale"'})
+
+        assert status == 200
+        assert body == BODY
+        assert "content-range" not in headers
+
+    def test_head_sends_no_body(self, media):
+        status, headers, body, _ = self.respond(media, method="HEAD")
+        assert status == 200
+        assert headers["content-length"] == str(len(BODY))
+        assert body == b""
+
+    def test_large_range_is_chunked(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("backend.media_serving.RANGE_CHUNK_SIZE", 100)
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(BODY)
+
+        _, _, body, messages = self.respond(path, {"Range": "bytes=0-249"})
+
+        chunks = [m for m in messages[1:] if m["type"] == "http.response.body"]
+        assert [len(m["body"]) for m in chunks] == [100, 100, 50]
+        assert [m["more_body"] for m in chunks] == [True, True, False]
+        assert body == BODY[:250]
+
+class TestMediaFileResponse:
+    """Test media_file_response"""
+
+    def test_serves_files_below_root(self, tmp_path):
+        (tmp_path / "photos").mkdir()
+        (tmp_path / "photos" / "a.jpg").write_bytes(b"jpeg")
+        request = make_request()
+
+        status, _, body, _ = send_response(media_file_response(request, tmp_path, "photos/a.jpg"), request)
+
+        assert status == 200
+        assert body == b"jpeg"
+
+    @pytest.mark.parametrize("relative_path", ["../secret.txt", "photos", "missing.jpg"])
+    def test_rejects_outside_root_directories_and_missing(self, tmp_path, relative_path):
+        root = tmp_path / "media"
+        (root / "photos").mkdir(parents=True)
+        (tmp_path / "secret.txt").write_text("secret")
+
+        with pytest.raises(HTTPException) as error:
+            media_file_response(make_request(), root, relative_path)
+        assert error.value.status_code == 404
+
+    def test_rejects_symlink_escaping_root(self, tmp_path):
+        root = tmp_path / "media"
+        root.mkdir()
+        (tmp_path / "secret.txt").write_text("secret")
+        os.symlink(tmp_path / "secret.txt", root / "link.txt")
+
+        with pytest.raises(HTTPException):
+            media_file_response(make_request(), root, "link.txt")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the OCR job queue
+Timeouts, cancellation of queued and running jobs, and the queue bound
+"""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from backend import ocr_queue as ocr_queue_module
+from backend.ocr_queue import OCRJobQueue, OCRQueueFull
+
+def wait_for_status(queue, job_id, *statuses, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {queue.get(job_id)['status']}")
+
+class TestOCRJobQueue:
+    """Test OCRJobQueue"""
+
+    @pytest.fixture(autouse=True)
+    def fake_tesseract(self, monkeypatch):
+        monkeypatch.setattr(ocr_queue_module, "TESSERACT_AVAILABLE", True)
+        self.release = threading.Event()
+        self.calls = []
+
+    def make_queue(self, blocking=False, error=None, **kwargs):
+        queue = OCRJobQueue(workers=1, timeout_seconds=0.5, **kwargs)
+
+        def tesseract_text(image_path, timeout=None):
+            self.calls.append((image_path, timeout))
+            if blocking:
+                self.release.wait(5)
+            if error:
+                raise error
+            return f"text from {image_path}"
+
+        queue.tesseract_text = tesseract_text
+        return queue
+
+    def test_completed_job(self):
+        queue = self.make_queue()
+        job_id = queue.submit("a.jpg", precheck=False)
+
+        job = queue.future(job_id).result(timeout=5)
+
+        assert job["status"] == "done"
+        assert job["text"] == "text from a.jpg"
+        assert self.calls == [("a.jpg", 0.5)]
+
+    def test_tesseract_timeout(self):
+        """pytesseract's timeout RuntimeError is reported as a timeout, not a failure"""
+        queue = self.make_queue(error=RuntimeError("Tesseract process timeout"))
+        job_id = queue.submit("a.jpg", precheck=False)
+
+        job = queue.future(job_id).result(timeout=5)
+
+        assert job["status"] == "timeout"
+        assert "timeout" in job["error"]
+        assert job["text"] is None
+
+    def test_other_errors_fail(self):
+        queue = self.make_queue(error=RuntimeError("bad image"))
+        job_id = queue.submit("a.jpg", precheck=False)
+
+        assert queue.future(job_id).result(timeout=5)["status"] == "failed"
+
+    def test_cancel_queued_job_never_runs(self):
+        queue = self.make_queue(blocking=True)
+        running = queue.submit("a.jpg", precheck=False)
+        wait_for_status(queue, running, "running")
+        queued = queue.submit("b.jpg", precheck=False)
+
+        assert queue.cancel(queued)
+        assert queue.get(queued)["status"] == "cancelled"
+        assert queue.future(queued).cancelled()
+
+        self.release.set()
+        queue.future(running).result(timeout=5)
+        queue._queue.join()
+        assert [path for path, _ in self.calls] == ["a.jpg"]
+
+    def test_cancel_running_job_discards_result(self):
+        queue = self.make_queue(blocking=True)
+        job_id = queue.submit("a.jpg", precheck=False)
+        wait_for_status(queue, job_id, "running")
+
+        assert queue.cancel(job_id)
+        assert queue.get(job_id)["status"] == "cancelling"
+
+        self.release.set()
+        job = queue.future(job_id).result(timeout=5)
+        assert job["status"] == "cancelled"
+        assert job["text"] is None
+
+    def test_cancel_finished_or_unknown_job(self):
+        queue = self.make_queue()
+        job_id = queue.submit("a.jpg", precheck=False)
+        queue.future(job_id).result(timeout=5)
+
+        assert not queue.cancel(job_id)
+        assert not queue.cancel("missing")
+
+    def test_full_queue_rejects_submissions(self):
+        queue = self.make_queue(blocking=True, max_queued=1)
+        running = queue.submit("a.jpg", precheck=False)
+        wait_for_status(queue, running, "running")
+        queue.submit("b.jpg", precheck=False)
+
+        with pytest.raises(OCRQueueFull):
+            queue.submit("c.jpg", precheck=False)
+        assert len(queue._jobs) == 2
+
+        self.release.set()
+
+    def test_cleanup_deletes_file(self, tmp_path):
+        photo = tmp_path / "upload.jpg"
+        photo.write_bytes(b"jpeg")
+        queue = self.make_queue()
+
+        queue.submit(str(photo), precheck=False, cleanup=True)
+        queue._queue.join()
+
+        assert not photo.exists()
+
+    def test_expired_jobs_are_pruned(self):
+        queue = self.make_queue(job_ttl_seconds=0.01)
+        job_id = queue.submit("a.jpg", precheck=False)
+        queue.future(job_id).result(timeout=5)
+        time.sleep(0.05)
+
+        queue.submit("b.jpg", precheck=False)
+
+        assert queue.get(job_id) is None
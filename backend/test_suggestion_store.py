@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for materialized memory suggestions
+Per-scope computation, stored reads and invalidation
+"""
+
+from datetime import date
+
+import pytest
+
+from backend.suggestion_store import SuggestionMaterializer, FAMILY_SCOPE, member_scope, on_this_day, similar_memories
+
+class TestSuggestionMaterializer:
+    """Test SuggestionMaterializer"""
+
+    def make_store(self, tmp_path):
+        store = SuggestionMaterializer(str(tmp_path / "platform.db"))
+        self.ahmed = store.database.create_family_member({"name": "Ahmed"})
+        self.sara = store.database.create_family_member({"name": "Sara"})
+        return store
+
+    def add_memory(self, store, title, memory_date, members, tags=None, location=None):
+        return store.database.create_memory({
+            "title": title, "date": memory_date, "familyMembers": members, "tags": tags or [], "location": location
+        })
+
+    def test_on_this_day_only_matches_earlier_years(self):
+        """Same month and day in previous years, newest first"""
+        memories = [
+            {"id": "a", "title": "a", "date": "2020-05-04", "familyMembers": []},
+            {"id": "b", "title": "b", "date": "2023-05-04", "familyMembers": []},
+            {"id": "c", "title": "c", "date": "2025-05-05", "familyMembers": []},
+            {"id": "d", "title": "d", "date": "2025-05-04", "familyMembers": []}
+        ]
+        result = on_this_day(memories, date(2025, 5, 4))
+        assert [m["id"] for m in result] == ["b", "a"]
+        assert result[0]["years_ago"] == 2
+
+    def test_similar_memories_rank_by_shared_features(self):
+        """Older memories sharing more tags and people with the latest rank higher"""
+        memories = [
+            {"id": "latest", "title": "", "date": "2025-01-10", "tags": ["beach", "eid"], "familyMembers": ["m1"]},
+            {"id": "close", "title": "", "date": "2024-01-10", "tags": ["beach", "eid"], "familyMembers": ["m1"]},
+            {"id": "partial", "title": "", "date": "2023-01-10", "tags": ["beach"], "familyMembers": []},
+            {"id": "unrelated", "title": "", "date": "2022-01-10", "tags": ["school"], "familyMembers": []}
+        ]
+        assert [m["id"] for m in similar_memories(memories)] == ["close", "partial"]
+
+    def test_refresh_materializes_family_and_member_scopes(self, tmp_path):
+        """One refresh stores the family scope and one scope per member"""
+        store = self.make_store(tmp_path)
+        self.add_memory(store, "Picnic", "2024-06-01", [self.ahmed])
+
+        computed = store.refresh()
+        assert set(computed) == {FAMILY_SCOPE, member_scope(self.ahmed), member_scope(self.sara)}
+        assert computed[FAMILY_SCOPE]["memory_count"] == 1
+        assert computed[member_scope(self.sara)]["memory_count"] == 0
+
+        suggestions = store.get(family_member=self.ahmed)
+        assert suggestions["memory_count"] == 1
+        assert suggestions["stale"] is False
+
+    def test_invalidation_marks_only_affected_scopes(self, tmp_path):
+        """A memory change marks the family and its members stale; refresh_stale recomputes just those"""
+        store = self.make_store(tmp_path)
+        store.refresh()
+
+        self.add_memory(store, "Trip", "2024-07-01", [self.sara])
+        store.invalidate([self.sara])
+        assert store.get()["stale"] is True
+        assert store.get(family_member=self.ahmed)["stale"] is False
+
+        assert store.refresh_stale() == 2
+        assert store.get(family_member=self.sara)["memory_count"] == 1
+        assert store.get()["stale"] is False
+
+    def test_other_dates_use_the_month_day_lookup(self, tmp_path):
+        """On-this-day for an explicit date comes from the index query, filtered to the member"""
+        store = self.make_store(tmp_path)
+        self.add_memory(store, "Eid 2022", "2022-04-10", [self.ahmed])
+        self.add_memory(store, "Eid 2023", "2023-04-10", [self.sara])
+        self.add_memory(store, "Eid 2025", "2025-04-10", [self.ahmed])
+        store.refresh()
+
+        family = store.get(target_date="2025-04-10")
+        assert [m["title"] for m in family["on_this_day"]] == ["Eid 2023", "Eid 2022"]
+        member = store.get(family_member=self.ahmed, target_date="2025-04-10")
+        assert [m["title"] for m in member["on_this_day"]] == ["Eid 2022"]
+
+    def test_rows_from_an_earlier_day_are_recomputed_on_read(self, tmp_path):
+        """A scope last computed yesterday is refreshed by its first read today"""
+        store = self.make_store(tmp_path)
+        store.refresh([FAMILY_SCOPE])
+        conn = store._connect()
+        conn.execute("UPDATE materialized_suggestions SET computed_for = '2000-01-01'")
+        conn.commit()
+        conn.close()
+
+        store.get()
+        conn = store._connect()
+        computed_for = conn.execute("SELECT computed_for FROM materialized_suggestions WHERE scope = ?",
+                                    (FAMILY_SCOPE,)).fetchone()[0]
+        conn.close()
+        assert computed_for == date.today().isoformat()
+
+    def test_malformed_date_raises_value_error(self, tmp_path):
+        """Callers turn a bad date into a 400"""
+        store = self.make_store(tmp_path)
+        with pytest.raises(ValueError):
+            store.get(target_date="not-a-date")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the timeline manifest
+Change detection bookkeeping and date-ordered streaming
+"""
+
+import os
+
+from backend.timeline_manifest import TimelineManifest
+
+class TestTimelineManifest:
+    """Test TimelineManifest"""
+
+    def setup_method(self, method):
+        self.root = "/photos/family"
+
+    def make_manifest(self, tmp_path):
+        return TimelineManifest(str(tmp_path / "manifest.db"))
+
+    def record(self, manifest, name, date, root=None):
+        path = os.path.join(root or self.root, name)
+        manifest.record(path, 100, 1, "sha-" + name, date, {"file_path": path, "date": date})
+        return path
+
+    def test_entries_are_streamed_by_date(self, tmp_path):
+        """Entries come back newest first regardless of insertion order"""
+        manifest = self.make_manifest(tmp_path)
+        self.record(manifest, "b.jpg", "2023-06-01T10:00:00")
+        self.record(manifest, "a.jpg", "2024-01-01T10:00:00")
+        self.record(manifest, "c.jpg", "2022-12-31T23:59:59")
+
+        dates = [entry["date"] for entry in manifest.entries(self.root)]
+        assert dates == ["2024-01-01T10:00:00", "2023-06-01T10:00:00", "2022-12-31T23:59:59"]
+        assert [e["date"] for e in manifest.entries(self.root, newest_first=False, limit=1)] == ["2022-12-31T23:59:59"]
+
+    def test_entries_are_scoped_to_root(self, tmp_path):
+        """Sibling directories sharing a name prefix are not included"""
+        manifest = self.make_manifest(tmp_path)
+        inside = self.record(manifest, "a.jpg", "2024-01-01T10:00:00")
+        self.record(manifest, "b.jpg", "2024-01-02T10:00:00", root="/photos/family-old")
+
+        assert [entry["file_path"] for entry in manifest.entries(self.root)] == [inside]
+        assert set(manifest.known_files(self.root)) == {inside}
+        assert manifest.count(self.root) == 1
+
+    def test_record_replaces_and_forget_removes(self, tmp_path):
+        """Re-recording a path updates it; forgotten paths disappear"""
+        manifest = self.make_manifest(tmp_path)
+        path = self.record(manifest, "a.jpg", "2024-01-01T10:00:00")
+        manifest.record(path, 200, 2, "sha-new", "2024-02-01T10:00:00", {"file_path": path, "date": "2024-02-01T10:00:00"})
+
+        assert manifest.known_files(self.root) == {path: (200, 2)}
+
+        manifest.forget({path})
+        assert manifest.count(self.root) == 0
+
+    def test_metadata_only_entries_are_pending(self, tmp_path):
+        """Entries recorded without analysis are listed as pending until re-recorded"""
+        manifest = self.make_manifest(tmp_path)
+        old = os.path.join(self.root, "old.jpg")
+        new = os.path.join(self.root, "new.jpg")
+        manifest.record_many([
+            (old, 100, 1, "", "2020-01-01T10:00:00", {"file_path": old}),
+            (new, 100, 1, "", "2024-01-01T10:00:00", {"file_path": new}),
+        ], analyzed=False)
+
+        assert manifest.pending(self.root) == [new, old]
+        assert manifest.count(self.root, pending_only=True) == 2
+
+        manifest.record(new, 100, 1, "sha-new", "2024-01-01T10:00:00", {"file_path": new})
+        assert manifest.pending(self.root) == [old]
+        assert manifest.count(self.root) == 2
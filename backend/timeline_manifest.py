@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Timeline Manifest for Elmowafiplatform
+Remembers every photo the family timeline has seen (path, size, mtime, content hash) together with its
+timeline entry, so unchanged files are never re-analysed, and keeps a date index to stream the timeline in order
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TimelineManifest:
+    """SQLite manifest of analysed timeline photos"""
+
+    def __init__(self, db_path: str = "data/timeline_manifest.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        """Create the manifest table and its date index"""
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS timeline_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                photo_date TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                analyzed INTEGER NOT NULL DEFAULT 1,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_timeline_files_date ON timeline_files(photo_date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_timeline_files_pending ON timeline_files(analyzed) WHERE analyzed = 0")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _under(root: str) -> Tuple[str, str]:
+        """Bounds of the paths inside root; '0' sorts right after the separator"""
+        prefix = os.path.join(os.path.abspath(root), "")
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def known_files(self, root: str) -> Dict[str, Tuple[int, int]]:
+        """path -> (size, mtime_ns) for every photo recorded under root"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT path, size, mtime_ns FROM timeline_files WHERE path >= ? AND path < ?", self._under(root)
+        ).fetchall()
+        conn.close()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def record(self, path: str, size: int, mtime_ns: int, sha256: str, photo_date: str, entry: Dict[str, Any],
+               analyzed: bool = True):
+        """Store or replace a photo's timeline entry; analyzed=False marks a metadata-only entry"""
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO timeline_files (path, size, mtime_ns, sha256, photo_date, entry, analyzed, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (path, size, mtime_ns, sha256, photo_date, json.dumps(entry, default=str), int(analyzed),
+              datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+
+    def record_many(self, rows: List[Tuple[str, int, int, str, str, Dict[str, Any]]], analyzed: bool = True):
+        """record() for many photos in one transaction"""
+        if not rows:
+            return
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        conn.executemany("""
+            INSERT OR REPLACE INTO timeline_files (path, size, mtime_ns, sha256, photo_date, entry, analyzed, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(path, size, mtime_ns, sha256, photo_date, json.dumps(entry, default=str), int(analyzed), now)
+              for path, size, mtime_ns, sha256, photo_date, entry in rows])
+        conn.commit()
+        conn.close()
+
+    def pending(self, root: str, limit: Optional[int] = None) -> List[str]:
+        """Paths under root that only have metadata-only entries, newest first"""
+        query = ("SELECT path FROM timeline_files WHERE analyzed = 0 AND path >= ? AND path < ? "
+                 "ORDER BY photo_date DESC")
+        params = list(self._under(root))
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+        return [path for (path,) in rows]
+
+    def forget(self, paths: Set[str]):
+        """Drop entries for photos that no longer exist"""
+        if not paths:
+            return
+        conn = self._connect()
+        conn.executemany("DELETE FROM timeline_files WHERE path = ?", [(path,) for path in paths])
+        conn.commit()
+        conn.close()
+
+    def entries(self, root: str, newest_first: bool = True, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream timeline entries under root in date order, straight off the date index"""
+        query = (f"SELECT entry FROM timeline_files WHERE path >= ? AND path < ? "
+                 f"ORDER BY photo_date {'DESC' if newest_first else 'ASC'}")
+        params = list(self._under(root))
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            for (entry,) in conn.execute(query, params):
+                yield json.loads(entry)
+        finally:
+            conn.close()
+
+    def count(self, root: str, pending_only: bool = False) -> int:
+        conn = self._connect()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM timeline_files WHERE path >= ? AND path < ?" + (" AND analyzed = 0" if pending_only else ""),
+            self._under(root)
+        ).fetchone()[0]
+        conn.close()
+        return total
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Streaming Uploads for Elmowafiplatform
+Copies an UploadFile to disk chunk by chunk, hashing it and checking its magic bytes and size as it goes,
+then moves it into place atomically; memory per upload stays at one chunk however large the file
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Union
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+# Leading bytes of each accepted format; None skips bytes that vary (RIFF size, ISO box size)
+FILE_SIGNATURES = {
+    "jpeg": [(b"\xff\xd8\xff",)],
+    "png": [(b"\x89PNG\r\n\x1a\n",)],
+    "gif": [(b"GIF87a",), (b"GIF89a",)],
+    "webp": [(b"RIFF", None, b"WEBP")],
+    "bmp": [(b"BM",)],
+    "tiff": [(b"II*\x00",), (b"MM\x00*",)],
+    "heic": [(None, b"ftypheic"), (None, b"ftypheix"), (None, b"ftypmif1")],
+    "mp4": [(None, b"ftypisom"), (None, b"ftypmp42"), (None, b"ftypiso2"), (None, b"ftypavc1")],
+    "mov": [(None, b"ftypqt  ")]
+}
+IMAGE_KINDS = ("jpeg", "png", "gif", "webp", "bmp", "tiff", "heic")
+MEDIA_KINDS = IMAGE_KINDS + ("mp4", "mov")
+
+_HEADER_SIZE = 12
+
+@dataclass
+class StoredUpload:
+    """An upload written to disk"""
+    path: Path
+    sha256: str
+    size: int
+    kind: Optional[str]
+
+def detect_kind(header: bytes) -> Optional[str]:
+    """File format from its first bytes"""
+    for kind, signatures in FILE_SIGNATURES.items():
+        for signature in signatures:
+            offset = 0
+            matched = True
+            for part in signature:
+                if part is None:
+                    offset += 4
+                    continue
+                if header[offset:offset + len(part)] != part:
+                    matched = False
+                    break
+                offset += len(part)
+            if matched:
+                return kind
+    return None
+
+class _ChunkCheck:
+    """Hash, size limit and magic-byte check applied to each chunk as it streams past"""
+
+    def __init__(self, allowed_kinds: Optional[Iterable[str]], max_bytes: int):
+        self.allowed_kinds = allowed_kinds
+        self.max_bytes = max_bytes
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.header = b""
+        self.kind = None
+        self.checked = False
+
+    def update(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds maximum allowed size of {self.max_bytes} bytes")
+
+        if not self.checked and len(self.header) < _HEADER_SIZE:
+            self.header += chunk[:_HEADER_SIZE - len(self.header)]
+            if len(self.header) >= _HEADER_SIZE:
+                self.kind = _check_kind(self.header, self.allowed_kinds)
+                self.checked = True
+
+        self.sha.update(chunk)
+
+    def finish(self, temp_path: str) -> StoredUpload:
+        if not self.checked:
+            # Shorter than a full header
+            self.kind = _check_kind(self.header, self.allowed_kinds)
+        return StoredUpload(path=Path(temp_path), sha256=self.sha.hexdigest(), size=self.size, kind=self.kind)
+
+def _temp_file(directory: Union[str, Path]) -> str:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    os.close(fd)
+    return temp_path
+
+async def stream_to_temp(file: UploadFile, directory: Union[str, Path],
+                         allowed_kinds: Optional[Iterable[str]] = IMAGE_KINDS,
+                         max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE) -> StoredUpload:
+    """Write an upload to a temp file in directory; raises HTTPException 413/415 without leaving it behind
+
+    allowed_kinds=None accepts any content (documents have no signature here); kind is then None when unrecognised.
+    """
+    temp_path = _temp_file(directory)
+    check = _ChunkCheck(allowed_kinds, max_bytes)
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                check.update(chunk)
+                await out.write(chunk)
+        return check.finish(temp_path)
+
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def copy_to_temp(source: BinaryIO, directory: Union[str, Path], allowed_kinds: Optional[Iterable[str]] = IMAGE_KINDS,
+                 max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE) -> StoredUpload:
+    """stream_to_temp for a blocking file object, such as a Flask upload's stream"""
+    temp_path = _temp_file(directory)
+    check = _ChunkCheck(allowed_kinds, max_bytes)
+    try:
+        with open(temp_path, "wb") as out:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                check.update(chunk)
+                out.write(chunk)
+        return check.finish(temp_path)
+
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+async def stream_upload(file: UploadFile, destination: Union[str, Path],
+                        allowed_kinds: Optional[Iterable[str]] = IMAGE_KINDS, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE) -> StoredUpload:
+    """Write an upload to destination; raises HTTPException 413/415 without leaving a partial file behind"""
+    destination = Path(destination)
+
+    # Same directory as the destination so the final rename never crosses filesystems
+    stored = await stream_to_temp(file, destination.parent, allowed_kinds, max_bytes, chunk_size)
+    os.replace(stored.path, destination)
+    stored.path = destination
+
+    logger.info(f"Stored upload {destination} ({stored.size} bytes)")
+    return stored
+
+def _check_kind(header: bytes, allowed_kinds: Optional[Iterable[str]]) -> Optional[str]:
+    kind = detect_kind(header)
+    if allowed_kinds is None:
+        return kind
+    if kind is None or kind not in allowed_kinds:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type{f' ({kind})' if kind else ''}")
+    return kind
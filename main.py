@@ -38,6 +38,8 @@ except ImportError:
             return []
         def upload_photo(self, file_data, filename, uploader_id):
             return str(__import__('uuid').uuid4())
+        async def upload_photo_stream(self, file, uploader_id):
+            return str(__import__('uuid').uuid4())
         def get_photo_analysis(self, photo_id):
             return {"status": "mock", "photo_id": photo_id}
         def search_photos(self, **kwargs):
@@ -613,13 +615,9 @@ async def upload_file(
 ):
     """Upload photo with complete AI analysis pipeline"""
     
-    # Read file content
-    content = await file.read()
-    
-    # Upload through memory pipeline
-    photo_id = memory_engine.upload_photo(
-        file_data=content,
-        filename=file.filename,
+    # Upload through memory pipeline, streamed to disk in chunks
+    photo_id = await memory_engine.upload_photo_stream(
+        file,
         uploader_id=user.get("id", "user_1")
     )
     
@@ -627,7 +625,7 @@ async def upload_file(
         "photo_id": photo_id,
         "filename": file.filename,
         "url": f"/uploads/{photo_id}",
-        "size": len(content),
+        "size": file.size,
         "status": "processing",
         "message": "Photo uploaded and AI analysis started"
     }
@@ -365,6 +365,8 @@ class RateLimiter:
             else:
                 del self.api_requests[ip]
 
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+
 class FileUploadSecurity:
     """Implements secure file upload handling"""
     
@@ -449,11 +451,21 @@ class FileUploadSecurity:
         # Otherwise use the base upload directory
         return self.upload_dir / filename
     
-    async def save_uploaded_file(self, file_content: bytes, original_filename: str, 
-                           content_type: str, user_id: Optional[str] = None) -> Tuple[bool, str, Optional[Path]]:
-        """Save an uploaded file securely"""
-        # Validate file
-        valid, message = self.validate_file(original_filename, content_type, len(file_content))
+    async def save_uploaded_file(self, file, user_id: Optional[str] = None) -> Tuple[bool, str, Optional[Path]]:
+        """Save an uploaded file securely, streaming it to disk rather than reading it into memory
+        
+        The size limit is enforced while streaming, and images must also start with their format's magic bytes.
+        """
+        from fastapi import HTTPException
+        try:
+            from backend.upload_stream import stream_upload, IMAGE_KINDS
+        except ImportError:
+            from upload_stream import stream_upload, IMAGE_KINDS
+        
+        original_filename = file.filename or ""
+        
+        # Validate file; the size is checked again while streaming, since clients can misreport it
+        valid, message = self.validate_file(original_filename, file.content_type, file.size or 0)
         if not valid:
             return False, message, None
         
@@ -463,13 +475,19 @@ class FileUploadSecurity:
         # Get upload path
         upload_path = self.get_upload_path(secure_filename, user_id)
         
+        # Documents have no signature to check; their extension was validated above
+        _, ext = os.path.splitext(original_filename)
+        allowed_kinds = IMAGE_KINDS if ext.lower() in IMAGE_EXTENSIONS else None
+        
         try:
             # Save file
-            with open(upload_path, "wb") as f:
-                f.write(file_content)
+            await stream_upload(file, upload_path, allowed_kinds=allowed_kinds,
+                                max_bytes=self.config.upload_max_size_mb * 1024 * 1024)
             
             return True, "File uploaded successfully", upload_path
             
+        except HTTPException as e:
+            return False, e.detail, None
         except Exception as e:
             logger.error(f"Error saving uploaded file: {e}")
             return False, f"Error saving file: {str(e)}", None
@@ -600,16 +618,8 @@ async def upload_file(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Read file content
-    file_content = await file.read()
-    
-    # Save file securely
-    success, message, file_path = await file_upload_security.save_uploaded_file(
-        file_content,
-        file.filename,
-        file.content_type,
-        user_id
-    )
+    # Save file securely, streamed to disk
+    success, message, file_path = await file_upload_security.save_uploaded_file(file, user_id)
     
     if not success:
         raise HTTPException(